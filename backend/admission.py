@@ -0,0 +1,109 @@
+"""
+Controle de admissão das chamadas ao Google Sheets
+
+Quando o Sheets fica lento, cada requisição do Flask ficaria presa na
+chamada à API e novas requisições se acumulariam até o timeout do cliente.
+O controlador limita as chamadas simultâneas, mantém uma fila de espera
+limitada e recusa de imediato (Overloaded -> HTTP 503 com Retry-After) o que
+não couber na fila ou não conseguir vaga dentro do prazo da requisição.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from . import metrics
+
+# Chamadas simultâneas ao Sheets e requisições aguardando vaga
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_MAX_QUEUE = 16
+
+# Espera máxima (segundos) de uma requisição por vaga e por cota
+DEFAULT_QUEUE_TIMEOUT = 2.0
+
+# Prazo (time.monotonic) da requisição atual para conseguir vaga; None nas
+# threads de segundo plano (gravação assíncrona, snapshot), que esperam
+# o quanto for preciso
+request_deadline: contextvars.ContextVar = contextvars.ContextVar('request_deadline', default=None)
+
+
+class Overloaded(Exception):
+    """Sem vaga para chamar o Sheets: a requisição deve ser repetida depois"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Limita as chamadas simultâneas ao Sheets com uma fila de espera limitada"""
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiting = 0
+        # Média móvel da duração das chamadas, para estimar o Retry-After
+        self._average_duration = 1.0
+        self._condition = threading.Condition()
+
+    def retry_after(self) -> int:
+        """Segundos estimados até a fila atual ser atendida (mínimo 1)"""
+        pending = self._active + self._waiting
+        return max(1, math.ceil(self._average_duration * pending / self.max_concurrent))
+
+    def reject(self, reason: str, message: str, retry_after: Optional[int] = None):
+        """Recusa a requisição atual"""
+        metrics.SHEETS_ADMISSION_REJECTED.inc(reason=reason)
+        raise Overloaded(message, retry_after or self.retry_after())
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Ocupa uma vaga durante a chamada, esperando até o prazo da requisição"""
+        deadline = request_deadline.get()
+        with self._condition:
+            if self._active >= self.max_concurrent:
+                if deadline is not None and self._waiting >= self.max_queue:
+                    self.reject('queue_full', "Google Sheets sobrecarregado: fila de espera cheia")
+                self._waiting += 1
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.reject('timeout', "Google Sheets sobrecarregado: tempo de espera esgotado")
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._average_duration += 0.2 * (time.monotonic() - started - self._average_duration)
+                self._condition.notify()
+
+    def stats(self) -> Dict[str, float]:
+        """Vagas ocupadas, requisições na fila e duração média das chamadas"""
+        return {
+            'active': self._active,
+            'waiting': self._waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'average_duration': round(self._average_duration, 3),
+        }
+
+
+@contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[None]:
+    """Define o prazo de espera por vaga das chamadas feitas dentro do bloco"""
+    token = request_deadline.set(None if timeout is None else time.monotonic() + timeout)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
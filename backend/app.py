@@ -2,42 +2,121 @@
 Aplicação Flask para API do sistema de gerenciamento
 """
 import os
-from flask import Flask, request, jsonify, send_from_directory, send_file
+import time
+import unicodedata
+import uuid
+from datetime import datetime
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import logging
 import os
 try:
-    from .google_sheets import GoogleSheetsManager
+    from .google_sheets import GoogleSheetsManager, VersionConflict
     SHEETS_AVAILABLE = True
 except ImportError:
     from .google_sheets_dev import GoogleSheetsDevManager as GoogleSheetsManager
     SHEETS_AVAILABLE = False
-from .models import User, Product
+from .admission import (Overloaded, request_deadline, DEFAULT_MAX_CONCURRENT,
+                        DEFAULT_MAX_QUEUE, DEFAULT_QUEUE_TIMEOUT)
+# Importado de models, que registra os esquemas de User e Product
+from .models import REGISTRY as SCHEMAS
+from .schema import SchemaError, load_schema_config, row_version
+from .sharding import load_shard_config
+from .history import HistoryConflict, HistoryError
+from .reports import ReportEngine, ReportError, ReportUnavailableError, render_report
+from . import metrics
+from .logging_config import configure_logging, request_id_var
+from .profiling import RequestProfiler
+from .static_assets import StaticAssets
+from .shared_cache import SHARED_CACHE_ENV, SharedSheetsManager
+from .warmup import WarmupScheduler, startup_tasks
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
+# Configuração de logging (JSON por padrão; LOG_FORMAT=text para leitura humana)
+configure_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    fmt=os.getenv('LOG_FORMAT', 'json'),
+    sample_rate=float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+)
 logger = logging.getLogger(__name__)
 
-# Inicializa Flask
-app = Flask(__name__, static_folder='../frontend/build', static_url_path='')
+# Inicializa Flask (o build do React é servido por StaticAssets, não pela rota estática padrão)
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
+FRONTEND_BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'build')
+static_assets = StaticAssets(FRONTEND_BUILD_DIR)
+
 # Configurações
 CREDENTIALS_FILE = os.getenv('GOOGLE_SHEETS_CREDENTIALS_FILE', 'credentials.json')
 TOKEN_FILE = os.getenv('GOOGLE_SHEETS_TOKEN_FILE', 'token.json')
+# Chave de conta de serviço, para servidores sem navegador para autorizar o acesso
+SERVICE_ACCOUNT_FILE = os.getenv('GOOGLE_SHEETS_SERVICE_ACCOUNT_FILE')
 SPREADSHEET_ID = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID')
+CHANGE_PROBE = os.getenv('GOOGLE_SHEETS_CHANGE_PROBE', '1') != '0'
+SHARDS_FILE = os.getenv('GOOGLE_SHEETS_SHARDS_FILE')
+SCHEMA_FILE = os.getenv('GOOGLE_SHEETS_SCHEMA_FILE')
+WRITE_BEHIND = os.getenv('GOOGLE_SHEETS_WRITE_BEHIND', '0') == '1'
+JOURNAL_FILE = os.getenv('GOOGLE_SHEETS_JOURNAL_FILE', 'sheets_journal.jsonl')
+FLUSH_INTERVAL = float(os.getenv('GOOGLE_SHEETS_FLUSH_INTERVAL', '1.0'))
+SNAPSHOT_FILE = os.getenv('GOOGLE_SHEETS_SNAPSHOT_FILE', 'sheets_snapshot.bin')
+SNAPSHOT_INTERVAL = float(os.getenv('GOOGLE_SHEETS_SNAPSHOT_INTERVAL', '60'))
+HISTORY_FILE = os.getenv('GOOGLE_SHEETS_HISTORY_FILE', 'sheets_history.bin')
+PROFILE_MODE = os.getenv('PROFILE_REQUESTS', '')
+PROFILE_FORMAT = os.getenv('PROFILE_FORMAT', 'pstats')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '20'))
+# Controle de admissão: chamadas simultâneas ao Sheets, requisições na fila,
+# espera máxima (segundos) por vaga e tempo máximo de cada chamada HTTP
+SHEETS_MAX_CONCURRENT = int(os.getenv('SHEETS_MAX_CONCURRENT', DEFAULT_MAX_CONCURRENT))
+SHEETS_MAX_QUEUE = int(os.getenv('SHEETS_MAX_QUEUE', DEFAULT_MAX_QUEUE))
+SHEETS_QUEUE_TIMEOUT = float(os.getenv('SHEETS_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT))
+SHEETS_HTTP_TIMEOUT = float(os.getenv('SHEETS_HTTP_TIMEOUT', '10'))
+# Aquecimento na inicialização (token, conexão, dados e relatórios) e espera
+# máxima (segundos) das requisições pela leitura inicial das tabelas
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', '1') != '0'
+STARTUP_WARMUP_WAIT = float(os.getenv('STARTUP_WARMUP_WAIT', '10'))
+# Endereço do coordenador do cache, definido pelo servidor multiprocesso
+# (backend/server.py) nos workers
+SHARED_CACHE = os.getenv(SHARED_CACHE_ENV)
+
+# Há credenciais (OAuth ou conta de serviço) para acessar a planilha real
+CREDENTIALS_CONFIGURED = os.path.exists(CREDENTIALS_FILE) or bool(
+    SERVICE_ACCOUNT_FILE and os.path.exists(SERVICE_ACCOUNT_FILE))
+
+# Tabelas adicionais ou abas renomeadas, definidas em JSON
+if SCHEMA_FILE and os.path.exists(SCHEMA_FILE):
+    logger.info(f"Esquemas carregados de {SCHEMA_FILE}: {', '.join(load_schema_config(SCHEMA_FILE, SCHEMAS))}")
+
+# Distribuição das tabelas entre abas/planilhas (um shard por tabela se ausente)
+SHARDS = None
+if SHEETS_AVAILABLE and SHARDS_FILE and os.path.exists(SHARDS_FILE):
+    SHARDS = load_shard_config(SHARDS_FILE, SCHEMAS.ranges(), SPREADSHEET_ID, SCHEMAS.sheet_names())
+    logger.info(f"Configuração de shards carregada de {SHARDS_FILE}")
 
 # Inicializa gerenciador do Google Sheets
 try:
-    if SHEETS_AVAILABLE and os.path.exists(CREDENTIALS_FILE) and SPREADSHEET_ID:
+    if SHARED_CACHE:
+        # Worker do servidor: dados e alterações passam pelo coordenador
+        sheets_manager = SharedSheetsManager(
+            SHARED_CACHE,
+            spreadsheet_id=SPREADSHEET_ID,
+            shards=SHARDS
+        )
+    elif SHEETS_AVAILABLE and CREDENTIALS_CONFIGURED and SPREADSHEET_ID:
         sheets_manager = GoogleSheetsManager(
             credentials_file=CREDENTIALS_FILE,
             token_file=TOKEN_FILE,
-            spreadsheet_id=SPREADSHEET_ID
+            service_account_file=SERVICE_ACCOUNT_FILE,
+            spreadsheet_id=SPREADSHEET_ID,
+            change_probe=CHANGE_PROBE,
+            shards=SHARDS,
+            max_concurrent=SHEETS_MAX_CONCURRENT,
+            max_queue=SHEETS_MAX_QUEUE,
+            http_timeout=SHEETS_HTTP_TIMEOUT
         )
         logger.info("Google Sheets Manager inicializado com sucesso")
     else:
@@ -45,19 +124,141 @@ try:
         sheets_manager = GoogleSheetsManager(
             credentials_file=CREDENTIALS_FILE,
             token_file=TOKEN_FILE,
-            spreadsheet_id=SPREADSHEET_ID
+            service_account_file=SERVICE_ACCOUNT_FILE,
+            spreadsheet_id=SPREADSHEET_ID,
+            change_probe=CHANGE_PROBE,
+            shards=SHARDS,
+            max_concurrent=SHEETS_MAX_CONCURRENT,
+            max_queue=SHEETS_MAX_QUEUE,
+            http_timeout=SHEETS_HTTP_TIMEOUT
         )
         logger.info("Modo de desenvolvimento ativado - usando dados simulados")
 except Exception as e:
     logger.error(f"Erro ao inicializar Google Sheets Manager: {e}")
+    if SHARED_CACHE:
+        # Um worker nunca acessa a planilha diretamente
+        raise
     # Fallback para modo de desenvolvimento
     sheets_manager = GoogleSheetsManager(
         credentials_file=CREDENTIALS_FILE,
         token_file=TOKEN_FILE,
-        spreadsheet_id=SPREADSHEET_ID
+        service_account_file=SERVICE_ACCOUNT_FILE,
+        spreadsheet_id=SPREADSHEET_ID,
+        change_probe=CHANGE_PROBE,
+        shards=SHARDS,
+        max_concurrent=SHEETS_MAX_CONCURRENT,
+        max_queue=SHEETS_MAX_QUEUE,
+        http_timeout=SHEETS_HTTP_TIMEOUT
     )
     logger.info("Fallback para modo de desenvolvimento")
 
+# Journal local das alterações (reaplica as pendentes de uma execução interrompida)
+if JOURNAL_FILE and not SHARED_CACHE:
+    try:
+        sheets_manager.enable_journal(JOURNAL_FILE)
+    except Exception as e:
+        logger.error(f"Erro ao abrir o journal de alterações: {e}")
+
+# Gravação assíncrona: alterações confirmadas localmente e gravadas em lote
+if WRITE_BEHIND and sheets_manager.journal is not None:
+    sheets_manager.enable_write_behind(FLUSH_INTERVAL)
+
+# Snapshot do cache em disco: dados da execução anterior servidos de imediato
+if SNAPSHOT_FILE and not SHARED_CACHE:
+    try:
+        sheets_manager.enable_snapshot(SNAPSHOT_FILE, SNAPSHOT_INTERVAL)
+    except Exception as e:
+        logger.error(f"Erro ao carregar o snapshot do cache: {e}")
+
+# Histórico das alterações (desfazer, refazer e restaurar um instante)
+if HISTORY_FILE and not SHARED_CACHE:
+    try:
+        sheets_manager.enable_history(HISTORY_FILE)
+    except Exception as e:
+        logger.error(f"Erro ao abrir o histórico de alterações: {e}")
+
+# Motor de relatórios sobre os dados em cache
+report_engine = ReportEngine(sheets_manager)
+
+# Aquecimento em segundo plano, em paralelo com o carregamento da janela. Nos
+# workers do servidor não há o que aquecer: o coordenador já aquece os dados
+warmup = WarmupScheduler(startup_tasks(sheets_manager, report_engine))
+if STARTUP_WARMUP and not SHARED_CACHE:
+    warmup.start()
+
+# Rotas que respondem sem esperar pelo aquecimento
+WARMUP_EXEMPT = {'health_check', 'get_ready', 'get_metrics'}
+
+@app.before_request
+def start_request_timer():
+    """Marca o início da requisição e define o id usado nos logs e o prazo de espera pelo Sheets"""
+    g.request_started = time.perf_counter()
+    g.request_id_token = request_id_var.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])
+    g.request_deadline_token = request_deadline.set(time.monotonic() + SHEETS_QUEUE_TIMEOUT)
+
+@app.before_request
+def wait_for_warmup():
+    """Enquanto as tabelas são lidas no aquecimento, aguarda a leitura em vez de repeti-la
+
+    Assim a primeira tela aberta é atendida da memória, sem uma segunda
+    leitura da planilha disputando a cota com a do aquecimento.
+    """
+    if (request.path.startswith('/api/') and request.endpoint not in WARMUP_EXEMPT
+            and not warmup.ready):
+        warmup.wait('prefetch', STARTUP_WARMUP_WAIT)
+        # O prazo de espera pelo Sheets conta a partir do fim da espera
+        request_deadline.set(time.monotonic() + SHEETS_QUEUE_TIMEOUT)
+
+@app.after_request
+def record_request_duration(response):
+    """Registra a duração da requisição por rota (o padrão da URL, não a URL)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        duration = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'not_found'
+        metrics.HTTP_REQUEST_DURATION.observe(
+            duration, method=request.method, route=route, status=response.status_code
+        )
+        logger.info("%s %s %d em %.1f ms", request.method, route, response.status_code, duration * 1000,
+                    extra={'event': 'request', 'method': request.method, 'route': route,
+                           'status': response.status_code, 'duration_ms': round(duration * 1000, 1),
+                           'sampled': response.status_code < 400})
+    response.headers['X-Request-ID'] = request_id_var.get()
+    # O cliente mantém o próprio cache; o navegador não deve guardar as respostas da API
+    if request.path.startswith('/api/'):
+        response.headers.setdefault('Cache-Control', 'no-store')
+    return response
+
+@app.teardown_request
+def clear_request_id(exc=None):
+    """Remove o id e o prazo da requisição do contexto da thread"""
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+    token = g.pop('request_deadline_token', None)
+    if token is not None:
+        request_deadline.reset(token)
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(error):
+    """Sheets sobrecarregado: 503 imediato, com o tempo sugerido para repetir"""
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def stale_response(payload, stale):
+    """Resposta JSON marcada quando os dados vieram do cache desatualizado"""
+    response = jsonify({**payload, 'stale': stale})
+    if stale:
+        metrics.HTTP_STALE_RESPONSES.inc(route=request.url_rule.rule)
+        response.headers['Warning'] = '110 - "Response is Stale"'
+    return response
+
+# Perfilamento opcional (PROFILE_REQUESTS=all|header); desligado, nada é instalado
+if PROFILE_MODE:
+    RequestProfiler(PROFILE_DIR, mode=PROFILE_MODE, fmt=PROFILE_FORMAT, keep=PROFILE_KEEP).install(app)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Verifica saúde da API"""
@@ -65,252 +266,355 @@ def health_check():
         'status': 'ok',
         'message': 'API funcionando',
         'sheets_connected': sheets_manager is not None,
-        'dev_mode': not SHEETS_AVAILABLE or not os.path.exists(CREDENTIALS_FILE) or not SPREADSHEET_ID,
-        'mode': 'development' if not SHEETS_AVAILABLE or not os.path.exists(CREDENTIALS_FILE) or not SPREADSHEET_ID else 'production'
+        'admission': sheets_manager.admission.stats(),
+        'ready': warmup.ready,
+        'dev_mode': not SHEETS_AVAILABLE or not CREDENTIALS_CONFIGURED or not SPREADSHEET_ID,
+        'mode': 'development' if not SHEETS_AVAILABLE or not CREDENTIALS_CONFIGURED or not SPREADSHEET_ID else 'production'
     })
 
-# ===== ROTAS PARA USUÁRIOS =====
+@app.route('/api/ready', methods=['GET'])
+def get_ready():
+    """Progresso do aquecimento da inicialização"""
+    return jsonify({'success': True, **warmup.status()})
 
-@app.route('/api/users', methods=['GET'])
-def get_users():
-    """Obtém lista de usuários"""
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Confere mudanças na planilha e retorna a revisão atual dos dados"""
     try:
         if not sheets_manager:
             return jsonify({'error': 'Google Sheets não configurado'}), 500
         
-        users = sheets_manager.get_users()
         return jsonify({
             'success': True,
-            'data': users,
-            'count': len(users)
+            'revision': sheets_manager.refresh_changed()
         })
+    except Overloaded:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao obter usuários: {e}")
+        logger.error(f"Erro ao verificar mudanças: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/users', methods=['POST'])
-def create_user():
-    """Cria novo usuário"""
-    try:
-        if not sheets_manager:
-            return jsonify({'error': 'Google Sheets não configurado'}), 500
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Dados não fornecidos'}), 400
-        
-        # Valida dados obrigatórios
-        required_fields = ['name', 'cpf', 'email']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
-        
-        # Cria instância do usuário para validação
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas de desempenho no formato de texto do Prometheus
+
+    Em um worker do servidor, inclui as do coordenador (chamadas ao Sheets)
+    e as dos demais workers.
+    """
+    others = []
+    if SHARED_CACHE:
         try:
-            user = User(name=data['name'], cpf=data['cpf'], email=data['email'])
-        except ValueError as e:
-            return jsonify({'error': str(e)}), 400
-        
-        # Adiciona à planilha
-        success = sheets_manager.add_user(user.to_dict())
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Usuário criado com sucesso',
-                'data': user.to_dict()
-            }), 201
-        else:
-            return jsonify({'error': 'Erro ao criar usuário'}), 500
-            
-    except Exception as e:
-        logger.error(f"Erro ao criar usuário: {e}")
-        return jsonify({'error': str(e)}), 500
+            others = sheets_manager.process_metrics()
+        except Exception as e:
+            logger.warning(f"Métricas do coordenador indisponíveis: {e}")
+    return Response(metrics.REGISTRY.render(others), mimetype='text/plain; version=0.0.4')
 
-@app.route('/api/users/<int:row_index>', methods=['PUT'])
-def update_user(row_index):
-    """Atualiza usuário existente"""
-    try:
-        if not sheets_manager:
-            return jsonify({'error': 'Google Sheets não configurado'}), 500
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Dados não fornecidos'}), 400
-        
-        # Valida dados obrigatórios
-        required_fields = ['name', 'cpf', 'email']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
-        
-        # Cria instância do usuário para validação
+# Limite de registros por página nas listagens paginadas
+MAX_PAGE_SIZE = 1000
+
+def fold_text(text):
+    """Texto em minúsculas e sem acentos, para comparação na busca ("Ação" -> "acao")"""
+    decomposed = unicodedata.normalize('NFD', str(text))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def paginate(records, search_fields):
+    """Aplica a busca (?q=) e a paginação (?offset=&limit=) opcionais da requisição
+    
+    Retorna a página e o total de registros que atendem à busca. Sem
+    `limit`, retorna todos os registros a partir de `offset`.
+    """
+    term = fold_text(request.args.get('q', '').strip())
+    if term:
+        records = [
+            record for record in records
+            if any(term in fold_text(record.get(field, '')) for field in search_fields)
+        ]
+    
+    total = len(records)
+    offset = max(request.args.get('offset', default=0, type=int), 0)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        return records[offset:offset + limit], total
+    return records[offset:], total
+
+def if_match_version():
+    """Versão do registro enviada em If-Match (None se ausente ou "*")"""
+    tags = request.if_match
+    if not tags or tags.star_tag:
+        return None
+    return next(iter(tags.as_set(include_weak=True)), None)
+
+def conflict_response(error):
+    """409 com o registro atual (e sua versão no ETag), para o cliente conferir"""
+    response = jsonify({'error': str(error), 'current': error.current})
+    response.status_code = 409
+    if error.current:
+        response.set_etag(error.current['version'])
+    return response
+
+# ===== ROTAS DAS TABELAS (usuários, produtos e as definidas em esquemas) =====
+
+def register_table_routes(schema):
+    """Registra as rotas de listagem, criação, alteração e remoção de uma tabela
+
+    GET/POST /api/<endpoint> e PUT/DELETE /api/<endpoint>/<row_index>, com
+    validação e conversão feitas pelo esquema da tabela. PUT e DELETE com
+    If-Match (a `version` do registro) respondem 409 se ele mudou.
+    """
+    name = schema.label.lower()
+    
+    def list_records():
         try:
-            user = User(name=data['name'], cpf=data['cpf'], email=data['email'])
-        except ValueError as e:
-            return jsonify({'error': str(e)}), 400
-        
-        # Atualiza na planilha
-        success = sheets_manager.update_user(row_index, user.to_dict())
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Usuário atualizado com sucesso',
-                'data': user.to_dict()
-            })
-        else:
-            return jsonify({'error': 'Erro ao atualizar usuário'}), 500
+            if not sheets_manager:
+                return jsonify({'error': 'Google Sheets não configurado'}), 500
             
-    except Exception as e:
-        logger.error(f"Erro ao atualizar usuário: {e}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/users/<int:row_index>', methods=['DELETE'])
-def delete_user(row_index):
-    """Remove usuário"""
-    try:
-        if not sheets_manager:
-            return jsonify({'error': 'Google Sheets não configurado'}), 500
-        
-        success = sheets_manager.delete_user(row_index)
-        
-        if success:
-            return jsonify({
+            data, stale = sheets_manager.read_tables([schema.name])
+            records, total = paginate(data[schema.name], schema.search_fields)
+            return stale_response({
                 'success': True,
-                'message': 'Usuário removido com sucesso'
-            })
-        else:
-            return jsonify({'error': 'Erro ao remover usuário'}), 500
+                'data': records,
+                'count': len(records),
+                'total': total
+            }, stale)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao obter {schema.plural}: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    def create_record():
+        try:
+            if not sheets_manager:
+                return jsonify({'error': 'Google Sheets não configurado'}), 500
             
-    except Exception as e:
-        logger.error(f"Erro ao remover usuário: {e}")
-        return jsonify({'error': str(e)}), 500
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': 'Dados não fornecidos'}), 400
+            
+            try:
+                record = schema.validate(data)
+            except SchemaError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if sheets_manager.add_record(schema.name, record):
+                return jsonify({
+                    'success': True,
+                    'message': schema.message('criad'),
+                    'data': {**record, 'row_index': None}
+                }), 201
+            return jsonify({'error': f'Erro ao criar {name}'}), 500
+            
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao criar {name}: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    def update_record(row_index):
+        try:
+            if not sheets_manager:
+                return jsonify({'error': 'Google Sheets não configurado'}), 500
+            
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': 'Dados não fornecidos'}), 400
+            
+            try:
+                record = schema.validate(data)
+            except SchemaError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if sheets_manager.update_record(schema.name, row_index, record, if_match_version()):
+                version = row_version(schema.encode(record))
+                response = jsonify({
+                    'success': True,
+                    'message': schema.message('atualizad'),
+                    'data': {**record, 'row_index': row_index, 'version': version}
+                })
+                response.set_etag(version)
+                return response
+            return jsonify({'error': f'Erro ao atualizar {name}'}), 500
+            
+        except VersionConflict as e:
+            return conflict_response(e)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao atualizar {name}: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    def delete_record(row_index):
+        try:
+            if not sheets_manager:
+                return jsonify({'error': 'Google Sheets não configurado'}), 500
+            
+            if sheets_manager.delete_record(schema.name, row_index, if_match_version()):
+                return jsonify({
+                    'success': True,
+                    'message': schema.message('removid')
+                })
+            return jsonify({'error': f'Erro ao remover {name}'}), 500
+            
+        except VersionConflict as e:
+            return conflict_response(e)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao remover {name}: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    list_records.__doc__ = f"Obtém lista de {schema.plural}"
+    create_record.__doc__ = f"Cria {name}"
+    update_record.__doc__ = f"Atualiza {name} existente"
+    delete_record.__doc__ = f"Remove {name}"
+    
+    base = f'/api/{schema.endpoint}'
+    app.add_url_rule(base, f'list_{schema.endpoint}', list_records, methods=['GET'])
+    app.add_url_rule(base, f'create_{schema.endpoint}', create_record, methods=['POST'])
+    app.add_url_rule(f'{base}/<int:row_index>', f'update_{schema.endpoint}', update_record, methods=['PUT'])
+    app.add_url_rule(f'{base}/<int:row_index>', f'delete_{schema.endpoint}', delete_record, methods=['DELETE'])
+
+for table_schema in SCHEMAS:
+    if table_schema.endpoint:
+        register_table_routes(table_schema)
 
-# ===== ROTAS PARA PRODUTOS =====
+# ===== ROTAS COMBINADAS =====
 
-@app.route('/api/products', methods=['GET'])
-def get_products():
-    """Obtém lista de produtos"""
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard_data():
+    """Obtém usuários e produtos em uma única leitura da planilha"""
     try:
         if not sheets_manager:
             return jsonify({'error': 'Google Sheets não configurado'}), 500
         
-        products = sheets_manager.get_products()
-        return jsonify({
+        tables, stale = sheets_manager.read_tables(['User', 'Product'])
+        data = {'users': tables['User'], 'products': tables['Product']}
+        return stale_response({
             'success': True,
-            'data': products,
-            'count': len(products)
-        })
+            'data': data,
+            'count': {
+                'users': len(data['users']),
+                'products': len(data['products'])
+            }
+        }, stale)
+    except Overloaded:
+        raise
     except Exception as e:
-        logger.error(f"Erro ao obter produtos: {e}")
+        logger.error(f"Erro ao obter dados do dashboard: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/products', methods=['POST'])
-def create_product():
-    """Cria novo produto"""
+# ===== ROTAS DO HISTÓRICO DE ALTERAÇÕES =====
+
+def history_response(count, action):
+    """Resposta de desfazer/refazer/restaurar com a nova revisão dos dados"""
+    return jsonify({
+        'success': True,
+        'message': f'{count} alteração(ões) {action}(s)',
+        'count': count,
+        'revision': sheets_manager.data_revision
+    })
+
+def run_history(operation):
+    """Executa uma operação do histórico tratando os erros esperados"""
     try:
         if not sheets_manager:
             return jsonify({'error': 'Google Sheets não configurado'}), 500
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Dados não fornecidos'}), 400
-        
-        # Valida dados obrigatórios
-        required_fields = ['name', 'price', 'description']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
-        
-        # Cria instância do produto para validação
-        try:
-            product = Product(
-                name=data['name'], 
-                price=float(data['price']), 
-                description=data['description']
-            )
-        except ValueError as e:
-            return jsonify({'error': str(e)}), 400
-        
-        # Adiciona à planilha
-        success = sheets_manager.add_product(product.to_dict())
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Produto criado com sucesso',
-                'data': product.to_dict()
-            }), 201
-        else:
-            return jsonify({'error': 'Erro ao criar produto'}), 500
-            
+        return operation()
+    except Overloaded:
+        raise
+    except HistoryConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except HistoryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Erro ao criar produto: {e}")
+        logger.error(f"Erro no histórico de alterações: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/products/<int:row_index>', methods=['PUT'])
-def update_product(row_index):
-    """Atualiza produto existente"""
+def history_steps():
+    """Quantidade de alterações pedida no corpo ({"steps": n}, padrão 1)"""
+    value = (request.get_json(silent=True) or {}).get('steps', 1)
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise HistoryError('"steps" deve ser um número inteiro maior que zero')
+    return value
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """Lista as alterações mais recentes (?limit=)"""
+    limit = min(max(request.args.get('limit', default=50, type=int), 1), MAX_PAGE_SIZE)
+    return run_history(lambda: jsonify({
+        'success': True,
+        'data': sheets_manager.history_entries(limit)
+    }))
+
+@app.route('/api/history/undo', methods=['POST'])
+def undo_changes():
+    """Desfaz as últimas alterações"""
+    return run_history(lambda: history_response(sheets_manager.undo(history_steps()), 'desfeita'))
+
+@app.route('/api/history/redo', methods=['POST'])
+def redo_changes():
+    """Refaz alterações desfeitas"""
+    return run_history(lambda: history_response(sheets_manager.redo(history_steps()), 'refeita'))
+
+@app.route('/api/history/restore', methods=['POST'])
+def restore_changes():
+    """Volta os dados a um instante ({"timestamp": epoch ou data ISO 8601})"""
+    def restore():
+        value = (request.get_json(silent=True) or {}).get('timestamp')
+        try:
+            timestamp = float(value) if isinstance(value, (int, float)) else datetime.fromisoformat(value).timestamp()
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Informe "timestamp" (epoch ou data ISO 8601)'}), 400
+        return history_response(sheets_manager.restore_to(timestamp), 'desfeita')
+    return run_history(restore)
+
+# ===== ROTAS PARA RELATÓRIOS =====
+
+@app.route('/api/reports', methods=['GET'])
+def list_reports():
+    """Lista relatórios disponíveis"""
+    return jsonify({
+        'success': True,
+        'data': report_engine.available_reports()
+    })
+
+@app.route('/api/reports/<report_name>', methods=['GET'])
+def get_report(report_name):
+    """Executa relatório e retorna em JSON, CSV, Excel ou PDF"""
     try:
         if not sheets_manager:
             return jsonify({'error': 'Google Sheets não configurado'}), 500
         
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Dados não fornecidos'}), 400
-        
-        # Valida dados obrigatórios
-        required_fields = ['name', 'price', 'description']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({'error': f'Campo {field} é obrigatório'}), 400
-        
-        # Cria instância do produto para validação
-        try:
-            product = Product(
-                name=data['name'], 
-                price=float(data['price']), 
-                description=data['description']
-            )
-        except ValueError as e:
-            return jsonify({'error': str(e)}), 400
+        if report_name not in report_engine.available_reports():
+            return jsonify({'error': f"Relatório '{report_name}' não encontrado"}), 404
         
-        # Atualiza na planilha
-        success = sheets_manager.update_product(row_index, product.to_dict())
+        params = request.args.to_dict()
+        output_format = params.pop('format', 'json').lower()
         
-        if success:
-            return jsonify({
+        report = report_engine.run(report_name, params)
+        if output_format == 'json':
+            return stale_response({
                 'success': True,
-                'message': 'Produto atualizado com sucesso',
-                'data': product.to_dict()
-            })
-        else:
-            return jsonify({'error': 'Erro ao atualizar produto'}), 500
-            
-    except Exception as e:
-        logger.error(f"Erro ao atualizar produto: {e}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/products/<int:row_index>', methods=['DELETE'])
-def delete_product(row_index):
-    """Remove produto"""
-    try:
-        if not sheets_manager:
-            return jsonify({'error': 'Google Sheets não configurado'}), 500
+                'data': report.to_dict()
+            }, report.stale)
         
-        success = sheets_manager.delete_product(row_index)
+        chunks, mimetype, filename = render_report(report, output_format)
+        headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+        if report.stale:
+            headers['Warning'] = '110 - "Response is Stale"'
+        return Response(chunks, mimetype=mimetype, headers=headers)
         
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Produto removido com sucesso'
-            })
-        else:
-            return jsonify({'error': 'Erro ao remover produto'}), 500
-            
+    except Overloaded:
+        raise
+    except ReportUnavailableError as e:
+        return jsonify({'error': str(e)}), 501
+    except ReportError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Erro ao remover produto: {e}")
+        logger.error(f"Erro ao gerar relatório: {e}")
         return jsonify({'error': str(e)}), 500
 
 # ===== ROTAS PARA SERVIR O REACT =====
@@ -318,16 +622,12 @@ def delete_product(row_index):
 @app.route('/')
 def serve_react():
     """Serve a aplicação React"""
-    return send_file(os.path.join(app.static_folder, 'index.html'))
+    return static_assets.serve('index.html')
 
 @app.route('/<path:path>')
 def serve_react_static(path):
-    """Serve arquivos estáticos do React"""
-    if os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    else:
-        # Para React Router, sempre retorna index.html
-        return send_file(os.path.join(app.static_folder, 'index.html'))
+    """Serve arquivos estáticos do React (rotas desconhecidas recebem index.html)"""
+    return static_assets.serve(path)
 
 if __name__ == '__main__':
     app.run(debug=True, host='127.0.0.1', port=5000)
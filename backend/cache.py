@@ -0,0 +1,166 @@
+"""
+Cache em memória dos dados lidos do Google Sheets
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Tempo (segundos) em que os dados de uma aba são considerados atualizados
+DEFAULT_TTL = 30.0
+
+
+@dataclass
+class CacheEntry:
+    """Dados de uma aba em cache"""
+    rows: List[List[str]]
+    revision: int
+    fetched_at: float = field(default_factory=time.time)
+    # Momento da última leitura completa da aba
+    loaded_at: float = field(default_factory=time.time)
+    # Sinal de mudança observado quando os dados foram lidos
+    signature: Optional[str] = None
+    # Alterações aplicadas localmente e ainda não gravadas no Sheets
+    pending: int = 0
+
+
+class SheetCache:
+    """Cache das abas da planilha, versionado por revisão
+
+    A revisão global aumenta sempre que o conteúdo de alguma aba muda,
+    permitindo que consumidores (ex.: relatórios) memorizem resultados
+    derivados dos dados enquanto a revisão não mudar.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, CacheEntry] = {}
+        self._revision = 0
+        self._lock = threading.RLock()
+
+    @property
+    def revision(self) -> int:
+        """Revisão atual dos dados em cache"""
+        return self._revision
+
+    def get(self, sheet_name: str) -> Optional[CacheEntry]:
+        """Retorna a entrada da aba, atualizada ou não"""
+        return self._entries.get(sheet_name)
+
+    def is_fresh(self, entry: Optional[CacheEntry]) -> bool:
+        """Indica se a entrada ainda está dentro do TTL
+
+        Entradas com alterações pendentes são a versão mais recente dos dados
+        e não devem ser substituídas por uma releitura da planilha.
+        """
+        if entry is None:
+            return False
+        return entry.pending > 0 or time.time() - entry.fetched_at < self.ttl
+
+    def put(self, sheet_name: str, rows: List[List[str]],
+            signature: Optional[str] = None) -> CacheEntry:
+        """Armazena os dados da aba, avançando a revisão se mudaram"""
+        with self._lock:
+            current = self._entries.get(sheet_name)
+            if current is not None and current.pending > 0:
+                return current
+            if current is not None and current.rows == rows:
+                current.fetched_at = current.loaded_at = time.time()
+                current.signature = signature
+                return current
+
+            self._revision += 1
+            entry = CacheEntry(rows=rows, revision=self._revision, signature=signature)
+            self._entries[sheet_name] = entry
+            return entry
+
+    def apply(self, sheet_name: str, mutate: Callable[[List[List[str]]], None]) -> CacheEntry:
+        """Aplica localmente uma alteração que ainda será gravada no Sheets
+
+        `mutate` recebe uma cópia da lista de linhas e pode alterá-la; a
+        entrada fica marcada como pendente até `settle` ser chamado.
+        """
+        with self._lock:
+            current = self._entries[sheet_name]
+            rows = list(current.rows)
+            mutate(rows)
+
+            self._revision += 1
+            entry = CacheEntry(rows=rows, revision=self._revision,
+                               loaded_at=current.loaded_at, pending=current.pending + 1)
+            self._entries[sheet_name] = entry
+            return entry
+
+    def settle(self, sheet_name: str, count: int = 1):
+        """Registra que alterações locais foram gravadas no Sheets"""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is None:
+                return
+            entry.pending = max(0, entry.pending - count)
+            if entry.pending == 0:
+                # Os dados serão conferidos com a planilha na próxima leitura
+                entry.fetched_at = 0.0
+                entry.signature = None
+
+    def touch(self, sheet_name: str):
+        """Marca os dados da aba como conferidos agora, sem relê-los"""
+        entry = self._entries.get(sheet_name)
+        if entry is not None:
+            entry.fetched_at = time.time()
+
+    def expire(self, sheet_name: str):
+        """Força a conferência da aba na próxima leitura, mantendo os dados"""
+        entry = self._entries.get(sheet_name)
+        if entry is not None:
+            entry.fetched_at = 0.0
+
+    def invalidate(self, sheet_name: Optional[str] = None):
+        """Descarta os dados de uma aba (ou de todas)
+
+        Abas com alterações pendentes são mantidas: descartá-las perderia as
+        alterações ainda não gravadas.
+        """
+        with self._lock:
+            names = list(self._entries) if sheet_name is None else [sheet_name]
+            for name in names:
+                entry = self._entries.get(name)
+                if entry is not None and entry.pending == 0:
+                    del self._entries[name]
+            self._revision += 1
+
+    def export(self) -> Dict[str, CacheEntry]:
+        """Cópia do mapa de entradas (as listas de linhas não são alteradas no lugar)"""
+        with self._lock:
+            return dict(self._entries)
+
+    def mirror(self, entries: Dict[str, Optional[CacheEntry]], revision: int):
+        """Replica entradas de outro cache ({aba: entrada}; None remove a aba)
+
+        Usado pelas réplicas dos workers do servidor: as entradas mantêm a
+        revisão da origem e a revisão global passa a ser a dela, para que
+        todos os workers informem a mesma revisão aos clientes.
+        """
+        with self._lock:
+            for name, entry in entries.items():
+                if entry is None:
+                    self._entries.pop(name, None)
+                else:
+                    self._entries[name] = entry
+            self._revision = revision
+
+    def restore(self, sheets: Dict[str, Tuple[List[List[str]], Optional[str], float]],
+                revision: int):
+        """Carrega dados salvos anteriormente ({aba: (linhas, sinal, lido em)})
+
+        As entradas valem como recém-conferidas (são servidas de imediato) e
+        a revisão continua a partir da salva, para que clientes que guardam a
+        revisão percebam mudanças após a reinicialização.
+        """
+        with self._lock:
+            self._revision = max(self._revision, revision)
+            for name, (rows, signature, loaded_at) in sheets.items():
+                if name in self._entries:
+                    continue
+                self._entries[name] = CacheEntry(rows=rows, revision=self._revision,
+                                                 loaded_at=loaded_at, signature=signature)
@@ -0,0 +1,216 @@
+"""
+Credenciais de acesso ao Google Sheets: token salvo em JSON e renovação em segundo plano
+
+O token da conta de usuário (OAuth) é guardado em JSON, que não executa
+código ao ser lido (ao contrário de pickle). Em servidores sem interface, uma
+conta de serviço dispensa a autorização no navegador. Em ambos os casos o
+token de acesso é renovado por uma thread antes de expirar, para que nenhuma
+requisição espere pela renovação.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Escopo necessário para acessar Google Sheets
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+# Antecedência (segundos) com que o token de acesso é renovado
+DEFAULT_REFRESH_MARGIN = 300.0
+
+# Espera (segundos) antes de tentar de novo uma renovação que falhou
+DEFAULT_RETRY_INTERVAL = 30.0
+
+# Intervalo (segundos) entre verificações de tokens sem validade conhecida
+CHECK_INTERVAL = 600.0
+
+# Espera máxima (segundos) pelo fim da thread de renovação ao encerrar
+STOP_TIMEOUT = 5.0
+
+# Primeiro byte de um arquivo gravado com pickle (protocolo 2 ou maior)
+_PICKLE_MARKER = b'\x80'
+
+
+class TokenStore:
+    """Token OAuth da conta de usuário em um arquivo JSON legível só pelo dono"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self):
+        """Lê o token salvo (None se ausente ou inválido)"""
+        try:
+            with open(self.path, 'rb') as token_file:
+                data = token_file.read()
+        except FileNotFoundError:
+            return None
+
+        if data.startswith(_PICKLE_MARKER):
+            # Formato antigo: não é lido, pois carregar pickle pode executar código
+            logger.warning(f"Token {self.path} no formato antigo (pickle) ignorado; "
+                           "autorize o acesso novamente")
+            return None
+        from google.oauth2.credentials import Credentials
+        try:
+            return Credentials.from_authorized_user_info(json.loads(data), SCOPES)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Token {self.path} inválido; ignorado: {e}")
+            return None
+
+    def save(self, credentials):
+        """Grava o token de forma atômica (arquivo temporário + rename)"""
+        temporary = f"{self.path}.tmp"
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as token_file:
+            token_file.write(credentials.to_json())
+        os.replace(temporary, self.path)
+
+
+def is_service_account(credentials) -> bool:
+    """Indica se as credenciais são de uma conta de serviço (sem importar o módulo dela)"""
+    return hasattr(credentials, 'service_account_email')
+
+
+def is_service_account_file(path: str) -> bool:
+    """Indica se o arquivo JSON é a chave de uma conta de serviço"""
+    try:
+        with open(path, encoding='utf-8') as key_file:
+            return json.load(key_file).get('type') == 'service_account'
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def load_credentials(credentials_file: str, store: TokenStore,
+                     service_account_file: Optional[str] = None):
+    """Credenciais da conta de serviço ou da conta de usuário
+
+    A conta de serviço é usada se `service_account_file` for informado ou
+    se o próprio `credentials_file` for uma chave de conta de serviço. Para a
+    conta de usuário, o token salvo é usado mesmo expirado (a renovação fica
+    com o TokenRefresher); só sem token renovável o navegador é aberto para
+    autorizar o acesso.
+    """
+    if service_account_file or is_service_account_file(credentials_file):
+        path = service_account_file or credentials_file
+        logger.info(f"Usando a conta de serviço de {path}")
+        from google.oauth2 import service_account
+        return service_account.Credentials.from_service_account_file(path, scopes=SCOPES)
+
+    creds = store.load()
+    if creds is not None and (creds.valid or creds.refresh_token):
+        return creds
+
+    if not os.path.exists(credentials_file):
+        raise FileNotFoundError(
+            f"Arquivo de credenciais '{credentials_file}' não encontrado. "
+            "Baixe o arquivo JSON do Google Cloud Console."
+        )
+    # O fluxo de autorização é caro de importar e raramente necessário
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    flow = InstalledAppFlow.from_client_secrets_file(credentials_file, SCOPES)
+    creds = flow.run_local_server(port=0)
+    # Salva credenciais para próxima execução
+    store.save(creds)
+    return creds
+
+
+class TokenRefresher:
+    """Renova o token de acesso em segundo plano antes de expirar
+
+    As chamadas à API usam o mesmo objeto de credenciais, que assim já tem
+    um token válido quando a requisição chega.
+    """
+
+    def __init__(self, credentials, store: Optional[TokenStore] = None,
+                 margin: float = DEFAULT_REFRESH_MARGIN,
+                 retry_interval: float = DEFAULT_RETRY_INTERVAL):
+        self.credentials = credentials
+        self.store = store
+        self.margin = margin
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def renewable(self) -> bool:
+        """Contas de serviço sempre; contas de usuário só com refresh token"""
+        if is_service_account(self.credentials):
+            return True
+        return bool(getattr(self.credentials, 'refresh_token', None))
+
+    def seconds_left(self) -> Optional[float]:
+        """Segundos até o token expirar (None se a validade não é conhecida)"""
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return None
+        # O google-auth guarda a validade em UTC sem fuso
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return (expiry - now).total_seconds()
+
+    def due(self) -> bool:
+        """Indica se o token deve ser renovado agora"""
+        if not self.credentials.token:
+            return True
+        left = self.seconds_left()
+        return left is not None and left <= self.margin
+
+    def refresh(self, force: bool = False) -> bool:
+        """Renova o token se estiver perto de expirar; retorna se renovou"""
+        if not self.renewable:
+            return False
+        with self._lock:
+            if not force and not self.due():
+                return False
+            from google.auth.transport.requests import Request
+            self.credentials.refresh(Request())
+            # O token da conta de serviço é obtido a cada início, sem arquivo
+            if self.store is not None and not is_service_account(self.credentials):
+                self.store.save(self.credentials)
+        logger.info("Token de acesso ao Google renovado")
+        return True
+
+    def next_delay(self) -> float:
+        """Segundos até a próxima renovação
+
+        Tokens que já nascem com validade menor que a antecedência são
+        renovados na metade da validade, e não continuamente.
+        """
+        left = self.seconds_left()
+        if left is None:
+            return CHECK_INTERVAL
+        return max(left - self.margin, left / 2, 1.0)
+
+    def start(self):
+        """Inicia a renovação em segundo plano (a primeira é imediata, se devida)"""
+        if self._thread is None and self.renewable:
+            self._thread = threading.Thread(target=self._run, name='google-token-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        """Interrompe a renovação em segundo plano
+
+        Uma renovação presa na rede não impede o encerramento: a thread é
+        daemon e é abandonada após `timeout` segundos.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning(f"Renovação do token não terminou em {timeout:.0f} s; encerrando sem esperar")
+            self._thread = None
+
+    def _run(self):
+        delay = 0.0
+        while not self._stop.wait(delay):
+            try:
+                self.refresh()
+                delay = self.next_delay()
+            except Exception as e:
+                logger.warning(f"Erro ao renovar o token de acesso ao Google; nova tentativa "
+                               f"em {self.retry_interval:.0f} s: {e}")
+                delay = self.retry_interval
@@ -0,0 +1,100 @@
+"""
+Execução concorrente e limitada de requisições ao Google Sheets
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+
+# Cota padrão da API do Sheets: 60 requisições de leitura (e 60 de escrita)
+# por minuto por usuário
+DEFAULT_REQUESTS_PER_MINUTE = 60
+
+# Máximo de requisições simultâneas disparadas pelo executor
+DEFAULT_MAX_WORKERS = 4
+
+
+class RateLimiter:
+    """Limitador por balde de fichas (token bucket)
+
+    Permite rajadas de até `burst` requisições e repõe as fichas a uma taxa
+    constante; quem chega sem ficha espera em vez de receber erro 429.
+    """
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 burst: Optional[int] = None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else requests_per_minute)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Consome uma ficha, aguardando se necessário
+
+        Com `deadline` (time.monotonic), retorna False sem esperar se a
+        ficha só estaria disponível depois do prazo.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class ParallelExecutor:
+    """Pool de threads limitado para disparar requisições em paralelo
+
+    O tempo total de um conjunto de leituras passa a ser o da mais lenta, e
+    não a soma de todas. As threads são criadas sob demanda e reutilizadas.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 thread_name_prefix: str = 'sheets-read'):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Cria o pool na primeira utilização"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix=self.thread_name_prefix)
+            return self._pool
+
+    def map(self, func: Callable[..., Any], items: Iterable[Any]) -> List[Any]:
+        """Aplica `func` a cada item em paralelo, retornando na ordem dos itens
+
+        Com um único item a chamada é feita na própria thread. Exceções são
+        propagadas depois que todas as chamadas terminam.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+
+        # As threads do pool herdam o contexto da chamada (id da requisição
+        # nos logs, prazo do controle de admissão)
+        futures = [self._get_pool().submit(contextvars.copy_context().run, func, item)
+                   for item in items]
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """Encerra as threads do pool"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
@@ -1,67 +1,326 @@
 """
 Integração com Google Sheets API
 """
-import os
-import pickle
-from typing import List, Optional, Dict, Any
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import contextlib
+import math
+import queue
+import re
+import threading
+import time
+from typing import Callable, List, Optional, Dict, Any, Tuple, Union
 import logging
+from .admission import (AdmissionController, Overloaded, request_deadline,
+                        DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_QUEUE)
+from .cache import SheetCache, DEFAULT_TTL
+from .credentials import TokenRefresher, TokenStore, load_credentials
+from .executor import (ParallelExecutor, RateLimiter, DEFAULT_MAX_WORKERS,
+                       DEFAULT_REQUESTS_PER_MINUTE)
+from .sharding import Shard, ShardedTable, default_tables, encode_row_index
+from . import metrics
+from .journal import MutationJournal
+from .history import ChangeHistory, Delta, HistoryConflict, HistoryError
+from .write_behind import Mutation, WriteBehindQueue, DEFAULT_FLUSH_INTERVAL
+from .snapshot import SnapshotSaver, DEFAULT_SAVE_INTERVAL
+from .schema import SchemaRegistry, row_version
+from .models import REGISTRY as SCHEMAS
 
 # Configuração de logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Escopo necessário para acessar Google Sheets
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+# Opções de leitura com payload mínimo: valores brutos (sem formatação de
+# moeda/localidade) organizados por linha
+READ_OPTIONS = {
+    'majorDimension': 'ROWS',
+    'valueRenderOption': 'UNFORMATTED_VALUE',
+    'dateTimeRenderOption': 'FORMATTED_STRING',
+}
+
+# Aba auxiliar (oculta) com os sinais de mudança de cada tabela: um token de
+# revisão gravado pelas nossas atualizações e uma assinatura (linhas,
+# tamanho e posição do conteúdo) calculada pelo próprio Sheets
+CHANGE_PROBE_SHEET = '_meta'
+
+# Releitura completa obrigatória após este tempo (segundos), mesmo sem
+# mudança detectada, para cobrir edições externas que preservam a assinatura
+CHANGE_PROBE_MAX_AGE = 300.0
+
+# Novas tentativas (com espera exponencial) de leituras que falham com 429/5xx
+READ_RETRIES = 2
+
+# Tempo máximo (segundos) de cada chamada HTTP ao Sheets; sem ele uma conexão
+# travada prende a vaga do controle de admissão indefinidamente
+DEFAULT_HTTP_TIMEOUT = 10.0
+
+def upstream_errors() -> Tuple[type, ...]:
+    """Falhas de acesso ao Sheets em que as leituras podem usar os dados antigos do cache
+
+    O httplib2 e o cliente da API são caros de importar: seus tipos de erro só
+    são buscados ao tratar uma falha, quando a chamada já os carregou.
+    """
+    import httplib2
+    from googleapiclient.errors import HttpError
+    return (Overloaded, HttpError, OSError, httplib2.HttpLib2Error)
+
+def _http_error() -> type:
+    """Erro HTTP do cliente da API (importado só ao tratar uma falha)"""
+    from googleapiclient.errors import HttpError
+    return HttpError
+
+
+class VersionConflict(Exception):
+    """O registro mudou (ou foi removido) desde que o cliente o leu
+
+    `current` é o registro atual, com a nova versão, ou None se a linha
+    estiver vazia.
+    """
+
+    def __init__(self, message: str, current: Optional[Dict[str, Any]]):
+        super().__init__(message)
+        self.current = current
+
+def _parse_range(range_name: str) -> Tuple[str, str, str]:
+    """Separa um intervalo como 'A2:C' em (coluna inicial, linha inicial, coluna final)"""
+    return re.match(r'([A-Z]+)(\d+):([A-Z]+)', range_name).groups()
+
+def _sheet_label(sheet_names) -> str:
+    """Rótulo de métrica para uma ou mais abas"""
+    return ','.join(sorted(set(sheet_names)))
+
+def _column_number(letters: str) -> int:
+    """Índice (base 0) de uma coluna como 'A' ou 'AB'"""
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number - 1
+
+def _cell_data(value: Any) -> Dict[str, Any]:
+    """Célula no formato de updateCells, gravada como valor bruto (como RAW)"""
+    if value is None or value == '':
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+def _result_rows(result: Dict[str, Any]) -> int:
+    """Linhas lidas ou gravadas segundo a resposta da API"""
+    if 'values' in result:
+        return len(result['values'])
+    if 'valueRanges' in result:
+        return sum(len(value_range.get('values', [])) for value_range in result['valueRanges'])
+    if 'totalUpdatedRows' in result:
+        return result['totalUpdatedRows']
+    return result.get('updates', {}).get('updatedRows', 0)
+
+class _MeasuredHttp:
+    """Transporte HTTP que conta tentativas e bytes recebidos de cada chamada"""
+    
+    def __init__(self, http):
+        self.http = http
+        self.attempts = 0
+        self.response_bytes = 0
+    
+    def reset(self):
+        """Zera as contagens antes de uma nova chamada"""
+        self.attempts = 0
+        self.response_bytes = 0
+    
+    def request(self, *args, **kwargs):
+        """Encaminha a requisição ao transporte real"""
+        self.attempts += 1
+        response, content = self.http.request(*args, **kwargs)
+        self.response_bytes += len(content or b'')
+        return response, content
+    
+    def __getattr__(self, name):
+        return getattr(self.http, name)
 
 class GoogleSheetsManager:
     """Gerenciador para operações com Google Sheets"""
     
     def __init__(self, credentials_file: str = 'credentials.json', 
                  token_file: str = 'token.json',
-                 spreadsheet_id: str = None):
+                 spreadsheet_id: str = None,
+                 cache_ttl: float = DEFAULT_TTL,
+                 change_probe: bool = True,
+                 shards: Optional[Dict[str, ShardedTable]] = None,
+                 schemas: Optional[SchemaRegistry] = None,
+                 max_parallel_reads: int = DEFAULT_MAX_WORKERS,
+                 requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 max_queue: int = DEFAULT_MAX_QUEUE,
+                 http_timeout: float = DEFAULT_HTTP_TIMEOUT,
+                 service_account_file: Optional[str] = None):
         self.credentials_file = credentials_file
         self.token_file = token_file
+        self.service_account_file = service_account_file
         self.spreadsheet_id = spreadsheet_id
-        self.service = None
+        self._service = None
+        self._service_lock = threading.Lock()
+        self.cache = SheetCache(ttl=cache_ttl)
+        self.schemas = schemas or SCHEMAS
+        self.tables = shards or default_tables(self.schemas.ranges(), self.schemas.sheet_names())
+        self.change_probe = change_probe
+        self._change_probe_ready = False
+        self._sheet_ids: Dict[str, Dict[str, int]] = {}
+        self._credentials = None
+        self.token_refresher: Optional[TokenRefresher] = None
+        self._http_pool: queue.LifoQueue = queue.LifoQueue()
+        # Registros decodificados por shard, junto das linhas de origem
+        self._decoded: Dict[Tuple[str, int], Tuple[List[List[Any]], List[Dict[str, Any]]]] = {}
+        self.executor = ParallelExecutor(max_workers=max_parallel_reads)
+        self.read_limiter = RateLimiter(requests_per_minute)
+        self.write_limiter = RateLimiter(requests_per_minute)
+        self.admission = AdmissionController(max_concurrent, max_queue)
+        self.http_timeout = http_timeout
+        self.journal: Optional[MutationJournal] = None
+        self.write_behind: Optional[WriteBehindQueue] = None
+        self.snapshot: Optional[SnapshotSaver] = None
+        self.history: Optional[ChangeHistory] = None
+        # Um lock por shard (não um global): alterações de shards diferentes
+        # são gravadas em paralelo
+        self._shard_locks: Dict[str, threading.Lock] = {}
+        self._shard_locks_guard = threading.Lock()
         self._authenticate()
     
     def _authenticate(self):
-        """Autentica com Google Sheets API"""
-        creds = None
-        
-        # Carrega token existente se disponível
-        if os.path.exists(self.token_file):
-            with open(self.token_file, 'rb') as token:
-                creds = pickle.load(token)
+        """Autentica com Google Sheets API
+
+        O token salvo é usado mesmo expirado: a renovação é feita pela thread
+        do TokenRefresher, iniciada aqui, sem bloquear a inicialização. O
+        cliente da API é criado só no primeiro uso (ver `service`).
+        """
+        store = TokenStore(self.token_file)
+        creds = load_credentials(self.credentials_file, store, self.service_account_file)
+        self._credentials = creds
+        self.token_refresher = TokenRefresher(creds, store)
+        self.token_refresher.start()
+        logger.info("Autenticação com Google Sheets realizada com sucesso")
+    
+    @property
+    def service(self):
+        """Cliente da API, criado no primeiro uso (normalmente no aquecimento)
+
+        Importar e montar o cliente custa dezenas de milissegundos, que assim
+        ficam fora da abertura da janela. Sem credenciais (workers do
+        servidor), não há cliente.
+        """
+        if self._service is None and self._credentials is not None:
+            with self._service_lock:
+                if self._service is None:
+                    from googleapiclient.discovery import build
+                    self._service = build('sheets', 'v4', credentials=self._credentials)
+        return self._service
+    
+    @service.setter
+    def service(self, value):
+        self._service = value
+    
+    def stale_errors(self) -> Tuple[type, ...]:
+        """Erros de leitura em que os dados antigos do cache são servidos"""
+        return upstream_errors()
+    
+    @contextlib.contextmanager
+    def _pooled_http(self):
+        """Transporte HTTP autenticado emprestado do pool durante uma chamada
+
+        O httplib2 não é seguro entre threads: cada chamada usa um transporte
+        exclusivo, devolvido ao final. O pool é LIFO, então as conexões
+        mantidas abertas (keep-alive) mais recentes são reaproveitadas por
+        qualquer thread, inclusive a aberta no aquecimento.
+        """
+        try:
+            http = self._http_pool.get_nowait()
+        except queue.Empty:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            http = _MeasuredHttp(
+                AuthorizedHttp(self._credentials, http=httplib2.Http(timeout=self.http_timeout)))
+        try:
+            yield http
+        finally:
+            self._http_pool.put(http)
+    
+    def refresh_token(self):
+        """Renova o token de acesso se estiver perto de expirar (aquecimento)"""
+        if self.token_refresher is not None:
+            self.token_refresher.refresh()
+    
+    def warm_connection(self):
+        """Abre a conexão com a API de cada planilha, deixando-a no pool
+
+        Também cria o cliente da API e memoriza os IDs das abas, usados pelas
+        remoções e pelo histórico.
+        """
+        if self.service is None:
+            return
+        spreadsheets = {shard.spreadsheet_id for table in self.tables.values() for shard in table.shards}
+        for spreadsheet_id in spreadsheets:
+            self._get_sheet_ids(spreadsheet_id=spreadsheet_id)
+    
+    def _execute(self, request, write: bool = False, sheet: str = '') -> Dict[str, Any]:
+        """Executa uma requisição à API respeitando a cota de leitura/escrita
         
-        # Se não há credenciais válidas, solicita autorização
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists(self.credentials_file):
-                    raise FileNotFoundError(
-                        f"Arquivo de credenciais '{self.credentials_file}' não encontrado. "
-                        "Baixe o arquivo JSON do Google Cloud Console."
-                    )
-                
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    self.credentials_file, SCOPES)
-                creds = flow.run_local_server(port=0)
+        Registra latência, tamanho do payload, linhas, erros e novas
+        tentativas, rotulados pela operação (ex.: 'values.get') e pela aba.
+        Dentro de uma requisição do Flask, recusa com Overloaded a chamada que
+        não conseguir cota ou vaga até o prazo da requisição.
+        """
+        operation = getattr(request, 'methodId', '').replace('sheets.spreadsheets.', '') or 'unknown'
+        limiter = self.write_limiter if write else self.read_limiter
+        if not limiter.acquire(request_deadline.get()):
+            self.admission.reject('quota', "Cota de requisições do Google Sheets esgotada",
+                                  math.ceil(1 / limiter.rate))
+        with self.admission.slot():
+            return self._execute_admitted(request, operation, write, sheet)
+    
+    def _execute_admitted(self, request, operation: str, write: bool, sheet: str) -> Dict[str, Any]:
+        """Executa a requisição já admitida, registrando as métricas"""
+        transport = contextlib.nullcontext() if self._credentials is None else self._pooled_http()
+        with transport as http:
+            if http is not None:
+                http.reset()
+            body = getattr(request, 'body', None)
+            if body:
+                metrics.SHEETS_REQUEST_BYTES.observe(len(body), operation=operation, sheet=sheet)
             
-            # Salva credenciais para próxima execução
-            with open(self.token_file, 'wb') as token:
-                pickle.dump(creds, token)
-        
-        self.service = build('sheets', 'v4', credentials=creds)
-        logger.info("Autenticação com Google Sheets realizada com sucesso")
+            started = time.perf_counter()
+            try:
+                # Só leituras são repetidas: repetir uma inclusão poderia duplicá-la
+                retries = 0 if write else READ_RETRIES
+                if http is None:
+                    result = request.execute(num_retries=retries)
+                else:
+                    result = request.execute(http=http, num_retries=retries)
+            except Exception as error:
+                status = getattr(getattr(error, 'resp', None), 'status', type(error).__name__)
+                metrics.SHEETS_ERRORS.inc(operation=operation, sheet=sheet, status=status)
+                raise
+            finally:
+                metrics.SHEETS_REQUEST_DURATION.observe(time.perf_counter() - started,
+                                                        operation=operation, sheet=sheet)
+                if http is not None and http.attempts > 1:
+                    metrics.SHEETS_RETRIES.inc(http.attempts - 1, operation=operation, sheet=sheet)
+            
+            duration = time.perf_counter() - started
+            rows = _result_rows(result)
+            if http is not None:
+                metrics.SHEETS_RESPONSE_BYTES.observe(http.response_bytes, operation=operation, sheet=sheet)
+            metrics.SHEETS_ROWS.observe(rows, operation=operation, sheet=sheet)
+            logger.info("Sheets %s %s: %d linhas em %.1f ms", operation, sheet, rows, duration * 1000,
+                        extra={'event': 'sheets_call', 'operation': operation, 'sheet': sheet,
+                               'rows': rows, 'duration_ms': round(duration * 1000, 1), 'sampled': True})
+            return result
     
-    def get_sheet_data(self, sheet_name: str, range_name: str = None) -> List[List[str]]:
+    def _cache_key(self, sheet_name: str, spreadsheet_id: Optional[str] = None) -> str:
+        """Chave de uma aba no cache"""
+        if spreadsheet_id == self.spreadsheet_id:
+            spreadsheet_id = None
+        return Shard(sheet_name=sheet_name, spreadsheet_id=spreadsheet_id).cache_key
+    
+    def get_sheet_data(self, sheet_name: str, range_name: str = None,
+                       spreadsheet_id: str = None) -> List[List[str]]:
         """Obtém dados de uma planilha"""
         try:
             if range_name:
@@ -69,85 +328,333 @@ class GoogleSheetsManager:
             else:
                 range_str = sheet_name
             
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_str
-            ).execute()
+            result = self._execute(self.service.spreadsheets().values().get(
+                spreadsheetId=spreadsheet_id or self.spreadsheet_id,
+                range=range_str,
+                fields='values',
+                **READ_OPTIONS
+            ), sheet=sheet_name)
             
             values = result.get('values', [])
-            logger.info(f"Dados obtidos da planilha {sheet_name}: {len(values)} linhas")
+            logger.debug("Dados obtidos da planilha %s: %d linhas", sheet_name, len(values))
+            return values
+            
+        except _http_error() as error:
+            logger.error(f"Erro ao obter dados da planilha: {error}")
+            raise
+    
+    def batch_get_sheet_data(self, ranges: List[str],
+                             spreadsheet_id: str = None) -> List[List[List[str]]]:
+        """Obtém vários intervalos (ex.: 'User!A2:C') em uma única requisição
+
+        Os resultados seguem a ordem dos intervalos pedidos.
+        """
+        try:
+            result = self._execute(self.service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id or self.spreadsheet_id,
+                ranges=ranges,
+                fields='valueRanges(values)',
+                **READ_OPTIONS
+            ), sheet=_sheet_label(range_name.partition('!')[0] for range_name in ranges))
+            
+            values = [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+            logger.debug("Dados obtidos de %d intervalos: %d linhas", len(ranges), sum(len(v) for v in values))
             return values
             
-        except HttpError as error:
+        except _http_error() as error:
             logger.error(f"Erro ao obter dados da planilha: {error}")
             raise
     
+    def read_ranges(self, ranges: List[Union[str, Tuple[str, str]]]) -> List[List[List[Any]]]:
+        """Lê vários intervalos ou abas concorrentemente, na ordem pedida
+
+        Cada item pode ser um intervalo ('User!A2:C'), o nome de uma aba
+        ('Product') ou uma tupla (spreadsheet_id, intervalo) para outra
+        planilha. Cada item vira uma requisição própria, disparada em paralelo
+        dentro da cota, de modo que o tempo total é o da leitura mais lenta.
+        """
+        def read(item):
+            spreadsheet_id, range_str = item if isinstance(item, tuple) else (None, item)
+            sheet_name, _, range_name = range_str.partition('!')
+            return self.get_sheet_data(sheet_name, range_name or None, spreadsheet_id)
+        
+        return self.executor.map(read, ranges)
+    
+    def get_cached_sheets_data(self, sheets: Dict[str, str],
+                               spreadsheet_id: str = None,
+                               revalidate: bool = False) -> Dict[str, List[List[str]]]:
+        """Obtém dados de várias abas ({aba: intervalo}), reutilizando o cache
+
+        As abas desatualizadas são lidas juntas em uma única requisição. A
+        detecção de mudanças vale apenas para as abas da planilha principal.
+        Com `revalidate`, todas as abas são conferidas, mesmo dentro do TTL.
+        """
+        keys = {name: self._cache_key(name, spreadsheet_id) for name in sheets}
+        entries = {name: self.cache.get(keys[name]) for name in sheets}
+        stale = [
+            name for name, entry in entries.items()
+            if not self.cache.is_fresh(entry) or (revalidate and entry.pending == 0)
+        ]
+        
+        is_primary = spreadsheet_id in (None, self.spreadsheet_id)
+        signatures = self.probe_changes() if stale and is_primary else {}
+        if signatures:
+            # Abas cujo sinal de mudança não mudou são apenas revalidadas
+            now = time.time()
+            unchanged = [
+                name for name in stale
+                if entries[name] is not None
+                and entries[name].signature is not None
+                and entries[name].signature == signatures.get(name)
+                and now - entries[name].loaded_at < CHANGE_PROBE_MAX_AGE
+            ]
+            for name in unchanged:
+                self.cache.touch(keys[name])
+            stale = [name for name in stale if name not in unchanged]
+        
+        if len(stale) == 1:
+            name = stale[0]
+            rows = self.get_sheet_data(name, sheets[name], spreadsheet_id)
+            entries[name] = self.cache.put(keys[name], rows, signature=signatures.get(name))
+        elif stale:
+            ranges = [f"{name}!{sheets[name]}" for name in stale]
+            for name, rows in zip(stale, self.batch_get_sheet_data(ranges, spreadsheet_id)):
+                entries[name] = self.cache.put(keys[name], rows, signature=signatures.get(name))
+        
+        return {name: entry.rows for name, entry in entries.items()}
+    
+    def _read_tables(self, table_names: List[str],
+                     revalidate: bool = False) -> Dict[str, List[Tuple[int, List[List[Any]]]]]:
+        """Lê os shards das tabelas, retornando [(índice do shard, linhas)] por tabela
+
+        Os shards de uma mesma planilha são lidos em uma única requisição e
+        planilhas diferentes são lidas em paralelo.
+        """
+        groups: Dict[Optional[str], Dict[str, str]] = {}
+        for name in table_names:
+            table = self.tables[name]
+            for shard in table.shards:
+                groups.setdefault(shard.spreadsheet_id, {})[shard.sheet_name] = table.range_name
+        
+        results = self.executor.map(
+            lambda item: self.get_cached_sheets_data(item[1], item[0], revalidate),
+            groups.items()
+        )
+        by_spreadsheet = dict(zip(groups, results))
+        
+        return {
+            name: [
+                (i, by_spreadsheet[shard.spreadsheet_id][shard.sheet_name])
+                for i, shard in enumerate(self.tables[name].shards)
+            ]
+            for name in table_names
+        }
+    
+    def is_cache_fresh(self) -> bool:
+        """Indica se todas as abas de todas as tabelas estão atualizadas no cache"""
+        return all(
+            self.cache.is_fresh(self.cache.get(shard.cache_key))
+            for table in self.tables.values() for shard in table.shards
+        )
+    
+    def _get_sheet_ids(self, refresh: bool = False, spreadsheet_id: str = None) -> Dict[str, int]:
+        """Obtém (e memoriza) o ID de cada aba pelo título"""
+        spreadsheet_id = spreadsheet_id or self.spreadsheet_id
+        if spreadsheet_id not in self._sheet_ids or refresh:
+            metadata = self._execute(self.service.spreadsheets().get(
+                spreadsheetId=spreadsheet_id,
+                fields='sheets.properties(sheetId,title)'
+            ))
+            self._sheet_ids[spreadsheet_id] = {
+                sheet['properties']['title']: sheet['properties']['sheetId']
+                for sheet in metadata.get('sheets', [])
+            }
+        return self._sheet_ids[spreadsheet_id]
+    
+    def _probe_sheets(self) -> Dict[str, str]:
+        """Abas da planilha principal monitoradas pela detecção de mudanças"""
+        return {
+            shard.sheet_name: table.range_name
+            for table in self.tables.values() for shard in table.shards
+            if shard.spreadsheet_id is None
+        }
+    
+    @staticmethod
+    def _signature_formula(sheet_name: str, range_name: str) -> str:
+        """Fórmula que resume o conteúdo de um intervalo (ex.: 'A2:C')"""
+        first_col, first_row, last_col = _parse_range(range_name)
+        data = f"'{sheet_name}'!{range_name}"
+        key = f"'{sheet_name}'!{first_col}{first_row}:{first_col}"
+        return (f'=COUNTA({key})&"|"&SUMPRODUCT(LEN({data}))'
+                f'&"|"&SUMPRODUCT(ROW({data})*LEN({data}))')
+    
+    def _setup_change_probe(self):
+        """Cria a aba auxiliar com as fórmulas de assinatura das tabelas"""
+        if CHANGE_PROBE_SHEET not in self._get_sheet_ids():
+            self._execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': [{
+                    'addSheet': {'properties': {'title': CHANGE_PROBE_SHEET, 'hidden': True}}
+                }]}
+            ), write=True, sheet=CHANGE_PROBE_SHEET)
+            self._get_sheet_ids(refresh=True)
+        
+        values = [['Tabela', 'Revisão', 'Assinatura']]
+        for name, range_name in self._probe_sheets().items():
+            values.append([name, '', self._signature_formula(name, range_name)])
+        
+        self._execute(self.service.spreadsheets().values().update(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"{CHANGE_PROBE_SHEET}!A1:C{len(values)}",
+            valueInputOption='USER_ENTERED',
+            body={'values': values}
+        ), write=True, sheet=CHANGE_PROBE_SHEET)
+        logger.info(f"Aba '{CHANGE_PROBE_SHEET}' de detecção de mudanças configurada")
+    
+    def probe_changes(self) -> Dict[str, str]:
+        """Lê os sinais de mudança de todas as tabelas em uma requisição mínima
+
+        Retorna {tabela: sinal}; vazio se a detecção estiver indisponível.
+        """
+        if not self.change_probe:
+            return {}
+        
+        if not self._change_probe_ready:
+            try:
+                self._setup_change_probe()
+                self._change_probe_ready = True
+            except Exception as e:
+                logger.warning(f"Detecção de mudanças desativada: {e}")
+                self.change_probe = False
+                return {}
+        
+        try:
+            result = self._execute(self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{CHANGE_PROBE_SHEET}!A2:C",
+                fields='values',
+                valueRenderOption='FORMATTED_VALUE'
+            ), sheet=CHANGE_PROBE_SHEET)
+        except Exception as e:
+            logger.warning(f"Erro ao verificar mudanças na planilha: {e}")
+            return {}
+        
+        return {
+            row[0]: '|'.join(str(value) for value in row[1:])
+            for row in result.get('values', []) if row
+        }
+    
+    def refresh_changed(self) -> int:
+        """Relê apenas as tabelas cujo sinal de mudança mudou
+
+        Pensado para atualizações em segundo plano e clientes que consultam
+        mudanças a cada poucos segundos. Retorna a revisão dos dados.
+        """
+        for table in self.tables.values():
+            for shard in table.shards:
+                self.cache.expire(shard.cache_key)
+        self._read_tables(list(self.tables))
+        return self.cache.revision
+    
+    def get_cached_sheet_data(self, sheet_name: str, range_name: str = None) -> List[List[str]]:
+        """Obtém dados de uma aba, reutilizando o cache enquanto estiver atualizado"""
+        return self.get_cached_sheets_data({sheet_name: range_name})[sheet_name]
+    
+    @property
+    def data_revision(self) -> int:
+        """Revisão dos dados em cache (muda a cada alteração)"""
+        return self.cache.revision
+    
     def update_sheet_data(self, sheet_name: str, values: List[List[str]], 
-                         range_name: str = None) -> Dict[str, Any]:
+                         range_name: str = None, spreadsheet_id: str = None) -> Dict[str, Any]:
         """Atualiza dados em uma planilha"""
+        result = self.batch_update_sheet_data([(sheet_name, range_name, values)], spreadsheet_id)
+        return result.get('responses', [{}])[0]
+    
+    def batch_update_sheet_data(self, updates: List[Tuple[str, Optional[str], List[List[str]]]],
+                                spreadsheet_id: str = None) -> Dict[str, Any]:
+        """Atualiza vários intervalos [(aba, intervalo, valores)] em uma única requisição"""
         try:
-            if range_name:
-                range_str = f"{sheet_name}!{range_name}"
-            else:
-                range_str = sheet_name
+            data = []
+            for sheet_name, range_name, values in updates:
+                range_str = f"{sheet_name}!{range_name}" if range_name else sheet_name
+                data.append({'range': range_str, 'values': values})
             
-            body = {'values': values}
-            result = self.service.spreadsheets().values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_str,
-                valueInputOption='RAW',
+            # Grava o token de revisão das tabelas na mesma requisição, para que
+            # edições que preservam a assinatura também sejam detectadas
+            sheet_names = {sheet_name for sheet_name, _, _ in updates}
+            probe_sheets = list(self._probe_sheets())
+            is_primary = spreadsheet_id in (None, self.spreadsheet_id)
+            if self._change_probe_ready and is_primary:
+                token = format(time.time_ns(), 'x')
+                for sheet_name in sheet_names.intersection(probe_sheets):
+                    data.append({
+                        'range': f"{CHANGE_PROBE_SHEET}!B{probe_sheets.index(sheet_name) + 2}",
+                        'values': [[token]]
+                    })
+            
+            body = {'valueInputOption': 'RAW', 'data': data}
+            result = self._execute(self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id or self.spreadsheet_id,
                 body=body
-            ).execute()
+            ), write=True, sheet=_sheet_label(sheet_names))
             
-            logger.info(f"Dados atualizados na planilha {sheet_name}")
+            for sheet_name in sheet_names:
+                self.cache.invalidate(self._cache_key(sheet_name, spreadsheet_id))
+            logger.debug("Dados atualizados na planilha %s", _sheet_label(sheet_names))
             return result
             
-        except HttpError as error:
+        except _http_error() as error:
             logger.error(f"Erro ao atualizar dados da planilha: {error}")
             raise
     
-    def append_sheet_data(self, sheet_name: str, values: List[List[str]]) -> Dict[str, Any]:
+    def append_sheet_data(self, sheet_name: str, values: List[List[str]],
+                          spreadsheet_id: str = None) -> Dict[str, Any]:
         """Adiciona dados ao final de uma planilha"""
         try:
             range_str = sheet_name
             
             body = {'values': values}
-            result = self.service.spreadsheets().values().append(
-                spreadsheetId=self.spreadsheet_id,
+            result = self._execute(self.service.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id or self.spreadsheet_id,
                 range=range_str,
                 valueInputOption='RAW',
                 insertDataOption='INSERT_ROWS',
                 body=body
-            ).execute()
+            ), write=True, sheet=sheet_name)
             
-            logger.info(f"Dados adicionados à planilha {sheet_name}")
+            self.cache.invalidate(self._cache_key(sheet_name, spreadsheet_id))
+            logger.debug("Dados adicionados à planilha %s", sheet_name)
             return result
             
-        except HttpError as error:
+        except _http_error() as error:
             logger.error(f"Erro ao adicionar dados à planilha: {error}")
             raise
     
-    def delete_sheet_row(self, sheet_name: str, row_index: int) -> Dict[str, Any]:
+    def delete_sheet_row(self, sheet_name: str, row_index: int,
+                         spreadsheet_id: str = None) -> Dict[str, Any]:
         """Remove uma linha da planilha"""
+        return self.delete_sheet_rows([(sheet_name, row_index)], spreadsheet_id)
+    
+    def delete_sheet_rows(self, rows: List[Tuple[str, int]],
+                          spreadsheet_id: str = None) -> Dict[str, Any]:
+        """Remove várias linhas [(aba, linha)] em uma única requisição
+
+        As remoções são aplicadas na ordem dada; cada índice se refere à
+        planilha já sem as linhas removidas antes dele.
+        """
         try:
-            # Obtém informações da planilha
-            sheet_metadata = self.service.spreadsheets().get(
-                spreadsheetId=self.spreadsheet_id
-            ).execute()
-            
-            # Encontra o ID da aba
-            sheet_id = None
-            for sheet in sheet_metadata['sheets']:
-                if sheet['properties']['title'] == sheet_name:
-                    sheet_id = sheet['properties']['sheetId']
-                    break
-            
-            if sheet_id is None:
-                raise ValueError(f"Aba '{sheet_name}' não encontrada")
-            
-            # Remove a linha
-            request_body = {
-                'requests': [{
+            requests = []
+            for sheet_name, row_index in rows:
+                # Encontra o ID da aba
+                sheet_id = self._get_sheet_ids(spreadsheet_id=spreadsheet_id).get(sheet_name)
+                if sheet_id is None:
+                    sheet_id = self._get_sheet_ids(refresh=True, spreadsheet_id=spreadsheet_id).get(sheet_name)
+                
+                if sheet_id is None:
+                    raise ValueError(f"Aba '{sheet_name}' não encontrada")
+                
+                requests.append({
                     'deleteDimension': {
                         'range': {
                             'sheetId': sheet_id,
@@ -156,127 +663,656 @@ class GoogleSheetsManager:
                             'endIndex': row_index
                         }
                     }
-                }]
-            }
+                })
             
-            result = self.service.spreadsheets().batchUpdate(
-                spreadsheetId=self.spreadsheet_id,
-                body=request_body
-            ).execute()
+            # Remove as linhas
+            result = self._execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id or self.spreadsheet_id,
+                body={'requests': requests}
+            ), write=True, sheet=_sheet_label(sheet_name for sheet_name, _ in rows))
             
-            logger.info(f"Linha {row_index} removida da planilha {sheet_name}")
+            for sheet_name in {sheet_name for sheet_name, _ in rows}:
+                self.cache.invalidate(self._cache_key(sheet_name, spreadsheet_id))
+            logger.debug("%d linha(s) removida(s) da planilha", len(rows))
             return result
             
-        except HttpError as error:
+        except _http_error() as error:
             logger.error(f"Erro ao remover linha da planilha: {error}")
             raise
     
-    def get_users(self) -> List[Dict[str, Any]]:
-        """Obtém lista de usuários da planilha"""
+    def _decode_tables(self, table_names: List[str],
+                       data: Optional[Dict[str, List[Tuple[int, List[List[Any]]]]]] = None
+                       ) -> Dict[str, List[Dict[str, Any]]]:
+        """Lê as tabelas (ou usa `data`) e converte as linhas de todos os shards em registros
+
+        As entradas do cache nunca são alteradas no lugar (cada mudança cria
+        uma nova lista de linhas): enquanto a lista for a mesma, os registros
+        decodificados da leitura anterior são reaproveitados.
+        """
+        if data is None:
+            data = self._read_tables(table_names)
+        records = {}
+        for name in table_names:
+            decode = self.schemas.get(name).decode_rows
+            records[name] = []
+            for shard_index, rows in data[name]:
+                decoded = self._decoded.get((name, shard_index))
+                if decoded is None or decoded[0] is not rows:
+                    decoded = self._decoded[(name, shard_index)] = (rows, decode(rows, shard_index))
+                records[name].extend(decoded[1])
+        return records
+    
+    def _cached_tables(self, table_names: List[str]) -> Optional[Dict[str, List[Tuple[int, List[List[Any]]]]]]:
+        """Linhas em cache dos shards das tabelas, mesmo fora do TTL (None se faltar algum)"""
+        data = {}
+        for name in table_names:
+            data[name] = []
+            for i, shard in enumerate(self.tables[name].shards):
+                entry = self.cache.get(shard.cache_key)
+                if entry is None:
+                    return None
+                data[name].append((i, entry.rows))
+        return data
+    
+    def read_tables(self, table_names: List[str]) -> Tuple[Dict[str, List[Dict[str, Any]]], bool]:
+        """Obtém os registros das tabelas, indicando se vieram desatualizados
+
+        Se o Sheets estiver sobrecarregado ou inacessível, retorna os dados
+        que já estão em cache (mesmo expirados) com o indicador True; o erro
+        só é propagado se alguma aba ainda não tiver sido lida.
+        """
         try:
-            data = self.get_sheet_data('User', 'A2:D')  # Pula cabeçalho
-            users = []
-            
-            for i, row in enumerate(data, start=2):  # Começa na linha 2 (após cabeçalho)
-                if len(row) >= 3:  # name, cpf, email
-                    users.append({
-                        'name': row[0] if len(row) > 0 else '',
-                        'cpf': row[1] if len(row) > 1 else '',
-                        'email': row[2] if len(row) > 2 else '',
-                        'row_index': i
-                    })
-            
-            return users
-            
+            return self._decode_tables(table_names), False
+        except self.stale_errors() as e:
+            data = self._cached_tables(table_names)
+            if data is None:
+                raise
+            logger.warning(f"Servindo {', '.join(table_names)} do cache desatualizado: {e}")
+            return self._decode_tables(table_names, data), True
+    
+    def list_records(self, table_name: str) -> List[Dict[str, Any]]:
+        """Obtém os registros de uma tabela"""
+        try:
+            return self.read_tables([table_name])[0][table_name]
         except Exception as e:
-            logger.error(f"Erro ao obter usuários: {e}")
+            logger.error(f"Erro ao obter {self.schemas.get(table_name).plural}: {e}")
             return []
     
+    def list_tables(self, table_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Obtém os registros de várias tabelas em uma única requisição por planilha"""
+        try:
+            return self.read_tables(table_names)[0]
+        except Exception as e:
+            logger.error(f"Erro ao obter {', '.join(table_names)}: {e}")
+            return {name: [] for name in table_names}
+    
+    def get_users(self) -> List[Dict[str, Any]]:
+        """Obtém lista de usuários da planilha"""
+        return self.list_records('User')
+    
     def get_products(self) -> List[Dict[str, Any]]:
         """Obtém lista de produtos da planilha"""
+        return self.list_records('Product')
+    
+    def get_users_and_products(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Obtém usuários e produtos em uma única requisição por planilha"""
+        data = self.list_tables(['User', 'Product'])
+        return {'users': data['User'], 'products': data['Product']}
+    
+    def enable_journal(self, journal_file: str):
+        """Registra as alterações em um journal local antes de gravá-las
+
+        Alterações que ficaram pendentes (processo encerrado antes da
+        gravação) são reaplicadas agora.
+        """
+        self.journal = MutationJournal(journal_file)
+        self.replay_journal()
+    
+    def enable_write_behind(self, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """Passa a confirmar alterações localmente e gravá-las em lote no Sheets"""
+        if self.journal is None:
+            raise ValueError("A gravação assíncrona exige o journal (enable_journal)")
+        self.write_behind = WriteBehindQueue(self, self.journal, flush_interval)
+        self.write_behind.start()
+        logger.info(f"Gravação assíncrona ativada (journal: {self.journal.path})")
+    
+    def enable_snapshot(self, snapshot_file: str, save_interval: float = DEFAULT_SAVE_INTERVAL):
+        """Carrega o snapshot do cache salvo em disco e passa a gravá-lo periodicamente
+
+        Os dados carregados são servidos de imediato e conferidos com a
+        planilha em segundo plano.
+        """
+        self.snapshot = SnapshotSaver(self, snapshot_file, save_interval)
+        if self.snapshot.load():
+            threading.Thread(target=self._revalidate_snapshot, name='sheets-snapshot-revalidate',
+                             daemon=True).start()
+        self.snapshot.start()
+    
+    def _revalidate_snapshot(self):
+        """Confere com a planilha os dados carregados do snapshot"""
+        started = time.perf_counter()
+        revision = self.cache.revision
         try:
-            data = self.get_sheet_data('Product', 'A2:D')  # Pula cabeçalho
-            products = []
-            
-            for i, row in enumerate(data, start=2):  # Começa na linha 2 (após cabeçalho)
-                if len(row) >= 3:  # name, price, description
-                    # Converte preço de string para float, tratando vírgula como separador decimal
-                    price_str = row[1] if len(row) > 1 and row[1] else '0'
-                    price_str = price_str.replace(',', '.')  # Converte vírgula para ponto
-                    try:
-                        price = float(price_str)
-                    except ValueError:
-                        price = 0.0
-                    
-                    products.append({
-                        'name': row[0] if len(row) > 0 else '',
-                        'price': price,
-                        'description': row[2] if len(row) > 2 else '',
-                        'row_index': i
-                    })
-            
-            return products
-            
+            self._read_tables(list(self.tables), revalidate=True)
         except Exception as e:
-            logger.error(f"Erro ao obter produtos: {e}")
+            logger.warning(f"Erro ao revalidar o snapshot; os dados salvos continuam em uso: {e}")
+            return
+        changed = "dados atualizados" if self.cache.revision != revision else "sem mudanças"
+        logger.info(f"Snapshot revalidado em {(time.perf_counter() - started) * 1000:.0f} ms ({changed})")
+    
+    def enable_history(self, history_file: str):
+        """Registra cada alteração no histórico local (desfazer, refazer, restaurar)"""
+        self.history = ChangeHistory(history_file)
+        logger.info(f"Histórico de alterações ativado ({history_file})")
+    
+    def close(self):
+        """Grava as alterações pendentes, o snapshot do cache e fecha o journal"""
+        if self.token_refresher is not None:
+            self.token_refresher.stop()
+        if self.write_behind is not None:
+            self.write_behind.stop()
+        if self.snapshot is not None:
+            self.snapshot.stop()
+        if self.history is not None:
+            # O próximo início lê só o checkpoint
+            self.history.checkpoint()
+            self.history.close()
+        if self.journal is not None:
+            if not self.journal.pending():
+                self.journal.compact()
+            self.journal.close()
+    
+    @staticmethod
+    def _same_row(row: Optional[List[Any]], expected: Optional[List[Any]]) -> bool:
+        """Compara linhas ignorando tipos (valores lidos vs. gravados) e células vazias finais"""
+        def normalize(values):
+            cells = [str(v) for v in values or []]
+            while cells and cells[-1] == '':
+                cells.pop()
+            return cells
+        return normalize(row) == normalize(expected)
+    
+    def replay_journal(self) -> int:
+        """Reaplica, em ordem, as alterações do journal sem confirmação
+        
+        Cada alteração confere o estado atual da aba antes de ser gravada, de
+        modo que reaplicar o que já chegou ao Sheets não tem efeito: inclusões
+        cuja linha já está na aba, a partir da posição registrada ao gravá-las
+        (registros repetidos são válidos, então uma linha igual acima dela não
+        conta), e remoções de linhas que não têm mais o conteúdo esperado são
+        ignoradas; atualizações sobrescrevem a linha com o mesmo valor. Alterações que o Sheets recusa de vez (4xx)
+        vão para o arquivo de descarte do journal.
+        Retorna o número de alterações reaplicadas.
+        """
+        pending = [Mutation.from_dict(data) for data in self.journal.pending()]
+        if not pending:
+            return 0
+        
+        logger.info(f"Reaplicando {len(pending)} alteração(ões) pendente(s) do journal")
+        replayed = 0
+        for mutation in pending:
+            try:
+                table = self.tables[mutation.table]
+                shard = table.shards[mutation.shard]
+                rows = self.get_sheet_data(shard.sheet_name, table.range_name, shard.spreadsheet_id)
+                index = mutation.sheet_row - 2
+                current = rows[index] if 0 <= index < len(rows) else None
+                
+                if mutation.op == 'append':
+                    # A inclusão foi para a linha registrada ao gravá-la (ou, se outra pessoa
+                    # incluiu linhas antes, mais abaixo): linhas iguais acima dela já existiam
+                    applied = any(self._same_row(row, mutation.values)
+                                  for row in rows[max(index, 0):])
+                elif mutation.op == 'delete':
+                    applied = mutation.expected is None or not self._same_row(current, mutation.expected)
+                else:
+                    applied = False
+                
+                if not applied:
+                    self.write_mutations([mutation])
+                    replayed += 1
+                self.journal.ack([mutation.id])
+            except Exception as e:
+                status = self.write_error_status(e)
+                if status is not None:
+                    # Recusada de vez: tentar de novo a cada início bloquearia as seguintes
+                    logger.error(f"Sheets recusou a alteração {mutation.id} do journal (HTTP {status}); "
+                                 f"guardada em {self.journal.dead_letter_path}: {e}")
+                    self.journal.dead_letter([mutation.to_dict()], str(e))
+                    self.journal.ack([mutation.id])
+                    metrics.SHEETS_WRITE_DEAD_LETTERS.inc(table=mutation.table, op=mutation.op,
+                                                          status=status)
+                    continue
+                # Mantém esta e as seguintes (a ordem importa) para a próxima inicialização
+                logger.error(f"Erro ao reaplicar alteração {mutation.id} do journal: {e}")
+                break
+        
+        self.cache.invalidate()
+        if not self.journal.pending():
+            self.journal.compact()
+        logger.info(f"{replayed} alteração(ões) reaplicada(s) do journal")
+        return replayed
+    
+    @staticmethod
+    def _row_range(table: ShardedTable, sheet_row: int) -> str:
+        """Intervalo de uma linha da tabela, como 'A5:C5'"""
+        first_col, _, last_col = _parse_range(table.range_name)
+        return f"{first_col}{sheet_row}:{last_col}{sheet_row}"
+    
+    def apply_local_mutation(self, mutation: Mutation):
+        """Aplica uma alteração ao cache antes de gravá-la no Sheets
+        
+        Em inclusões, define a linha que o registro passa a ocupar.
+        """
+        table = self.tables[mutation.table]
+        shard = table.shards[mutation.shard]
+        self.get_cached_sheets_data({shard.sheet_name: table.range_name}, shard.spreadsheet_id)
+        
+        def mutate(rows):
+            index = mutation.sheet_row - 2
+            if mutation.op == 'append':
+                mutation.sheet_row = len(rows) + 2
+                rows.append(list(mutation.values))
+            elif mutation.op == 'update':
+                rows.extend([] for _ in range(index + 1 - len(rows)))
+                rows[index] = list(mutation.values)
+            elif index < len(rows):
+                mutation.expected = rows[index]
+                del rows[index]
+        
+        self.cache.apply(shard.cache_key, mutate)
+    
+    def settle_local_mutation(self, mutation: Mutation):
+        """Libera o cache de uma alteração já gravada no Sheets"""
+        shard = self.tables[mutation.table].shards[mutation.shard]
+        self.cache.settle(shard.cache_key)
+    
+    def mutation_batch_key(self, mutation: Mutation) -> Tuple[str, Optional[str], str]:
+        """Alterações com a mesma chave podem ser gravadas em uma só requisição"""
+        shard = self.tables[mutation.table].shards[mutation.shard]
+        # Inclusões são agrupadas por aba; atualizações e remoções, por planilha
+        sheet_name = shard.sheet_name if mutation.op == 'append' else ''
+        return mutation.op, shard.spreadsheet_id, sheet_name
+    
+    @staticmethod
+    def write_error_status(error: Exception) -> Optional[int]:
+        """Status HTTP de uma gravação que o Sheets recusou de vez (None se vale tentar de novo)
+
+        Só 429 e 5xx (e falhas de transporte, sem status) são temporários; os
+        demais 4xx (aba renomeada ou removida, intervalo ou valor inválido)
+        se repetem em toda tentativa.
+        """
+        status = getattr(getattr(error, 'resp', None), 'status', None)
+        try:
+            status = int(status)
+        except (TypeError, ValueError):
+            return None
+        if 400 <= status < 500 and status not in (408, 429):
+            return status
+        return None
+    
+    def write_mutations(self, mutations: List[Mutation]):
+        """Grava no Sheets alterações com a mesma `mutation_batch_key`"""
+        first = mutations[0]
+        spreadsheet_id = self.tables[first.table].shards[first.shard].spreadsheet_id
+        
+        if first.op == 'append':
+            shard = self.tables[first.table].shards[first.shard]
+            self.append_sheet_data(shard.sheet_name, [m.values for m in mutations], spreadsheet_id)
+        elif first.op == 'update':
+            updates = []
+            for m in mutations:
+                table = self.tables[m.table]
+                updates.append((table.shards[m.shard].sheet_name,
+                                self._row_range(table, m.sheet_row), [m.values]))
+            self.batch_update_sheet_data(updates, spreadsheet_id)
+        else:
+            self.delete_sheet_rows(
+                [(self.tables[m.table].shards[m.shard].sheet_name, m.sheet_row) for m in mutations],
+                spreadsheet_id
+            )
+    
+    def _prepare_mutation(self, mutation: Mutation):
+        """Completa, a partir do cache, os dados que tornam a reaplicação segura"""
+        table = self.tables[mutation.table]
+        shard = table.shards[mutation.shard]
+        entry = self.cache.get(shard.cache_key)
+        if mutation.op in ('append', 'delete'):
+            rows = entry.rows if entry is not None else self.get_cached_sheets_data(
+                {shard.sheet_name: table.range_name}, shard.spreadsheet_id)[shard.sheet_name]
+            index = mutation.sheet_row - 2
+            if mutation.op == 'append':
+                # Linha que a inclusão deve ocupar, conferida na reaplicação
+                mutation.sheet_row = len(rows) + 2
+            elif 0 <= index < len(rows):
+                mutation.expected = rows[index]
+    
+    def _shard_lock(self, cache_key: str) -> threading.Lock:
+        """Lock das alterações de um shard"""
+        with self._shard_locks_guard:
+            return self._shard_locks.setdefault(cache_key, threading.Lock())
+    
+    def _read_row(self, table: ShardedTable, shard: Shard, sheet_row: int) -> Optional[List[Any]]:
+        """Lê uma única linha da aba (None se estiver vazia)"""
+        rows = self.get_sheet_data(shard.sheet_name, self._row_range(table, sheet_row),
+                                   shard.spreadsheet_id)
+        return rows[0] if rows and rows[0] else None
+    
+    def _check_version(self, mutation: Mutation, expected_version: str) -> Optional[List[Any]]:
+        """Confere se a linha ainda tem a versão lida pelo cliente; retorna o conteúdo atual
+
+        Usa o cache quando está dentro do TTL (ou tem alterações ainda não
+        gravadas, que são a versão mais recente); senão, ou se a versão não
+        bater, relê apenas aquela linha da planilha.
+        """
+        table = self.tables[mutation.table]
+        shard = table.shards[mutation.shard]
+        entry = self.cache.get(shard.cache_key)
+        index = mutation.sheet_row - 2
+        current = None
+        if entry is not None and 0 <= index < len(entry.rows):
+            current = entry.rows[index] or None
+        
+        matches = current is not None and row_version(current) == expected_version
+        if not self.cache.is_fresh(entry) or (not matches and entry.pending == 0):
+            current = self._read_row(table, shard, mutation.sheet_row)
+            matches = current is not None and row_version(current) == expected_version
+        
+        if not matches:
+            schema = self.schemas.get(mutation.table)
+            record = None
+            if current is not None:
+                decoded = schema.decode_rows([current], mutation.shard)
+                if decoded:
+                    record = {**decoded[0],
+                              'row_index': encode_row_index(mutation.shard, mutation.sheet_row)}
+            raise VersionConflict(
+                f"{schema.label} alterad{'a' if schema.feminine else 'o'} ou removid"
+                f"{'a' if schema.feminine else 'o'} por outra pessoa. Confira os dados atuais.",
+                record
+            )
+        return current
+    
+    def _write_record(self, mutation: Mutation, expected_version: Optional[str] = None):
+        """Grava a alteração de um registro
+
+        As alterações de um mesmo shard são feitas uma de cada vez, para que a
+        conferência da versão (If-Match), a gravação e o registro no histórico
+        de uma requisição não se intercalem com os de outra.
+        """
+        shard = self.tables[mutation.table].shards[mutation.shard]
+        with self._shard_lock(shard.cache_key):
+            before = None
+            if expected_version is not None:
+                before = self._check_version(mutation, expected_version)
+            if self.history is None:
+                self._submit_record(mutation)
+            else:
+                self._submit_with_history(mutation, before)
+    
+    def _submit_with_history(self, mutation: Mutation, before: Optional[List[Any]] = None):
+        """Grava a alteração e a registra no histórico (`before`: linha atual, se já lida)"""
+        table = self.tables[mutation.table]
+        shard = table.shards[mutation.shard]
+        row = mutation.sheet_row
+        if before is None:
+            rows = self.get_cached_sheets_data({shard.sheet_name: table.range_name},
+                                               shard.spreadsheet_id)[shard.sheet_name]
+            index = mutation.sheet_row - 2
+            if mutation.op == 'append':
+                row = len(rows) + 2
+            elif 0 <= index < len(rows):
+                before = rows[index]
+        self._submit_record(mutation)
+        
+        if mutation.op == 'append':
+            # Na gravação assíncrona a linha é definida ao aplicar no cache
+            self.history.record(mutation.table, mutation.shard, mutation.sheet_row or row,
+                                None, mutation.values)
+        elif mutation.op == 'update':
+            self.history.record(mutation.table, mutation.shard, row, before or [], mutation.values)
+        elif before is not None:
+            self.history.record(mutation.table, mutation.shard, row, before, None)
+    
+    def _submit_record(self, mutation: Mutation):
+        """Grava a alteração de um registro, passando pelo journal se ativo"""
+        if self.write_behind is not None:
+            self.write_behind.submit(mutation)
+            return
+        if self.journal is None:
+            self.write_mutations([mutation])
+            return
+        
+        self._prepare_mutation(mutation)
+        self.journal.append(mutation.to_dict())
+        try:
+            self.write_mutations([mutation])
+        finally:
+            # Em caso de erro o usuário é avisado; a alteração não é reaplicada
+            self.journal.ack([mutation.id])
+    
+    def _append_record(self, table_name: str, values: List[Any]):
+        """Grava uma nova linha no shard escolhido pela chave da tabela"""
+        table = self.tables[table_name]
+        self._write_record(Mutation('append', table_name, table.shard_for_row(values), values=values))
+    
+    def _update_record(self, table_name: str, row_index: int, values: List[Any],
+                       expected_version: Optional[str] = None):
+        """Sobrescreve a linha de um registro no seu shard"""
+        shard_index, sheet_row = self.tables[table_name].locate(row_index)
+        self._write_record(Mutation('update', table_name, shard_index, sheet_row, values),
+                           expected_version)
+    
+    def _delete_record(self, table_name: str, row_index: int, expected_version: Optional[str] = None):
+        """Remove a linha de um registro do seu shard"""
+        shard_index, sheet_row = self.tables[table_name].locate(row_index)
+        self._write_record(Mutation('delete', table_name, shard_index, sheet_row), expected_version)
+    
+    def history_entries(self, limit: int = 50) -> Dict[str, Any]:
+        """Alterações mais recentes do histórico"""
+        if self.history is None:
+            raise HistoryError("Histórico de alterações desativado")
+        return self.history.entries(limit)
+    
+    def undo(self, steps: int = 1) -> int:
+        """Desfaz as `steps` últimas alterações; retorna quantas foram desfeitas"""
+        return self._travel(lambda: self.history.undo_plan(steps), undo=True)
+    
+    def redo(self, steps: int = 1) -> int:
+        """Refaz alterações desfeitas; retorna quantas foram refeitas"""
+        return self._travel(lambda: self.history.redo_plan(steps), undo=False)
+    
+    def restore_to(self, timestamp: float) -> int:
+        """Volta os dados ao instante `timestamp` (epoch), desfazendo as alterações posteriores"""
+        def plan():
+            steps = self.history.steps_since(timestamp)
+            return self.history.undo_plan(steps) if steps else []
+        return self._travel(plan, undo=True)
+    
+    def _travel(self, plan: Callable[[], List[Delta]], undo: bool) -> int:
+        """Aplica no Sheets os deltas do plano, desfazendo-os ou refazendo-os"""
+        if self.history is None:
+            raise HistoryError("Histórico de alterações desativado")
+        with contextlib.ExitStack() as stack:
+            # Nenhuma alteração de registro é feita enquanto o histórico é aplicado
+            keys = sorted(shard.cache_key for table in self.tables.values() for shard in table.shards)
+            for key in keys:
+                stack.enter_context(self._shard_lock(key))
+            stack.enter_context(self.history.lock)
+            if self.write_behind is not None:
+                # Os deltas se referem à planilha com todas as alterações gravadas
+                self.write_behind.flush()
+            deltas = plan()
+            if deltas:
+                self._apply_deltas(deltas, undo)
+                self.history.moved(-len(deltas) if undo else len(deltas))
+            return len(deltas)
+    
+    def _apply_deltas(self, deltas: List[Delta], undo: bool):
+        """Grava os deltas em uma única requisição batchUpdate por planilha
+
+        O estado atual das abas é relido e cada delta confere a linha antes de
+        alterá-la: se a planilha foi editada por fora, nada é gravado
+        (HistoryConflict). No Sheets, cada batchUpdate é aplicado por inteiro
+        ou não é aplicado.
+        """
+        table_names = sorted({delta.table for delta in deltas})
+        data = self._read_tables(table_names, revalidate=True)
+        rows = {(name, i): list(shard_rows) for name in table_names for i, shard_rows in data[name]}
+        requests: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        sheet_names: Dict[Optional[str], set] = {}
+        
+        for delta in deltas:
+            current, target = (delta.after, delta.before) if undo else (delta.before, delta.after)
+            table = self.tables[delta.table]
+            shard = table.shards[delta.shard]
+            shard_rows = rows[(delta.table, delta.shard)]
+            sheet_id = self._get_sheet_ids(spreadsheet_id=shard.spreadsheet_id).get(shard.sheet_name)
+            if sheet_id is None:
+                sheet_id = self._get_sheet_ids(refresh=True, spreadsheet_id=shard.spreadsheet_id).get(shard.sheet_name)
+            if sheet_id is None:
+                raise ValueError(f"Aba '{shard.sheet_name}' não encontrada")
+            
+            index = delta.row - 2
+            if current is None:
+                if index > len(shard_rows):
+                    raise HistoryConflict(f"A aba '{shard.sheet_name}' tem menos linhas que o esperado")
+                shard_rows.insert(index, list(target))
+                changes = [{'insertDimension': {
+                    'range': {'sheetId': sheet_id, 'dimension': 'ROWS',
+                              'startIndex': delta.row - 1, 'endIndex': delta.row},
+                    # Herda a formatação das linhas de dados, não a do cabeçalho
+                    'inheritFromBefore': delta.row > 2,
+                }}, self._update_cells(table, sheet_id, delta.row, target)]
+            else:
+                existing = shard_rows[index] if 0 <= index < len(shard_rows) else None
+                if not self._same_row(existing, current):
+                    raise HistoryConflict(
+                        f"A linha {delta.row} da aba '{shard.sheet_name}' foi alterada fora do sistema")
+                if target is None:
+                    del shard_rows[index]
+                    changes = [{'deleteDimension': {
+                        'range': {'sheetId': sheet_id, 'dimension': 'ROWS',
+                                  'startIndex': delta.row - 1, 'endIndex': delta.row}
+                    }}]
+                else:
+                    shard_rows.extend([] for _ in range(index + 1 - len(shard_rows)))
+                    shard_rows[index] = list(target)
+                    changes = [self._update_cells(table, sheet_id, delta.row, target)]
+            requests.setdefault(shard.spreadsheet_id, []).extend(changes)
+            sheet_names.setdefault(shard.spreadsheet_id, set()).add(shard.sheet_name)
+        
+        for spreadsheet_id, changes in requests.items():
+            names = sheet_names[spreadsheet_id]
+            changes.extend(self._probe_token_requests(names, spreadsheet_id))
+            self._execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id or self.spreadsheet_id,
+                body={'requests': changes}
+            ), write=True, sheet=_sheet_label(names))
+            for sheet_name in names:
+                self.cache.invalidate(self._cache_key(sheet_name, spreadsheet_id))
+        logger.info(f"{len(deltas)} alteração(ões) {'desfeita' if undo else 'refeita'}(s) do histórico")
+    
+    @staticmethod
+    def _update_cells(table: ShardedTable, sheet_id: int, sheet_row: int,
+                      values: List[Any]) -> Dict[str, Any]:
+        """Requisição que grava uma linha inteira do intervalo da tabela"""
+        first_col, _, last_col = _parse_range(table.range_name)
+        start, end = _column_number(first_col), _column_number(last_col) + 1
+        cells = list(values[:end - start]) + [''] * (end - start - len(values))
+        return {'updateCells': {
+            'range': {'sheetId': sheet_id, 'startRowIndex': sheet_row - 1, 'endRowIndex': sheet_row,
+                      'startColumnIndex': start, 'endColumnIndex': end},
+            'rows': [{'values': [_cell_data(value) for value in cells]}],
+            'fields': 'userEnteredValue',
+        }}
+    
+    def _probe_token_requests(self, sheet_names, spreadsheet_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Gravação do token de revisão das abas, como em batch_update_sheet_data"""
+        if not self._change_probe_ready or spreadsheet_id not in (None, self.spreadsheet_id):
+            return []
+        probe_id = self._get_sheet_ids().get(CHANGE_PROBE_SHEET)
+        probe_sheets = list(self._probe_sheets())
+        if probe_id is None:
             return []
+        token = format(time.time_ns(), 'x')
+        return [{'updateCells': {
+            'range': {'sheetId': probe_id, 'startRowIndex': probe_sheets.index(name) + 1,
+                      'endRowIndex': probe_sheets.index(name) + 2,
+                      'startColumnIndex': 1, 'endColumnIndex': 2},
+            'rows': [{'values': [_cell_data(token)]}],
+            'fields': 'userEnteredValue',
+        }} for name in sorted(set(sheet_names).intersection(probe_sheets))]
     
-    def add_user(self, user_data: Dict[str, Any]) -> bool:
-        """Adiciona um novo usuário"""
+    def add_record(self, table_name: str, record: Dict[str, Any]) -> bool:
+        """Adiciona um registro (já validado pelo esquema da tabela)"""
+        schema = self.schemas.get(table_name)
         try:
-            values = [[user_data['name'], user_data['cpf'], user_data['email']]]
-            self.append_sheet_data('User', values)
+            self._append_record(table_name, schema.encode(record))
             return True
+        except Overloaded:
+            # Vira 503 com Retry-After: o cliente pode repetir a alteração
+            raise
         except Exception as e:
-            logger.error(f"Erro ao adicionar usuário: {e}")
+            logger.error(f"Erro ao adicionar {schema.label.lower()}: {e}")
             return False
     
-    def add_product(self, product_data: Dict[str, Any]) -> bool:
-        """Adiciona um novo produto"""
+    def update_record(self, table_name: str, row_index: int, record: Dict[str, Any],
+                      expected_version: Optional[str] = None) -> bool:
+        """Atualiza um registro existente
+
+        Com `expected_version` (If-Match), só grava se o registro ainda tiver
+        essa versão; senão levanta VersionConflict com o registro atual.
+        """
+        schema = self.schemas.get(table_name)
         try:
-            values = [[product_data['name'], product_data['price'], product_data['description']]]
-            self.append_sheet_data('Product', values)
+            self._update_record(table_name, row_index, schema.encode(record), expected_version)
             return True
+        except VersionConflict:
+            raise
+        except Overloaded:
+            # Vira 503 com Retry-After: o cliente pode repetir a alteração
+            raise
         except Exception as e:
-            logger.error(f"Erro ao adicionar produto: {e}")
+            logger.error(f"Erro ao atualizar {schema.label.lower()}: {e}")
             return False
     
-    def update_user(self, row_index: int, user_data: Dict[str, Any]) -> bool:
-        """Atualiza um usuário existente"""
+    def delete_record(self, table_name: str, row_index: int,
+                      expected_version: Optional[str] = None) -> bool:
+        """Remove um registro (com `expected_version`, como em update_record)"""
+        schema = self.schemas.get(table_name)
         try:
-            range_name = f"A{row_index}:C{row_index}"
-            values = [[user_data['name'], user_data['cpf'], user_data['email']]]
-            self.update_sheet_data('User', values, range_name)
+            self._delete_record(table_name, row_index, expected_version)
             return True
+        except VersionConflict:
+            raise
+        except Overloaded:
+            # Vira 503 com Retry-After: o cliente pode repetir a alteração
+            raise
         except Exception as e:
-            logger.error(f"Erro ao atualizar usuário: {e}")
+            logger.error(f"Erro ao remover {schema.label.lower()}: {e}")
             return False
     
+    def add_user(self, user_data: Dict[str, Any]) -> bool:
+        """Adiciona um novo usuário"""
+        return self.add_record('User', user_data)
+    
+    def add_product(self, product_data: Dict[str, Any]) -> bool:
+        """Adiciona um novo produto"""
+        return self.add_record('Product', product_data)
+    
+    def update_user(self, row_index: int, user_data: Dict[str, Any]) -> bool:
+        """Atualiza um usuário existente"""
+        return self.update_record('User', row_index, user_data)
+    
     def update_product(self, row_index: int, product_data: Dict[str, Any]) -> bool:
         """Atualiza um produto existente"""
-        try:
-            range_name = f"A{row_index}:C{row_index}"
-            values = [[product_data['name'], product_data['price'], product_data['description']]]
-            self.update_sheet_data('Product', values, range_name)
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao atualizar produto: {e}")
-            return False
+        return self.update_record('Product', row_index, product_data)
     
     def delete_user(self, row_index: int) -> bool:
         """Remove um usuário"""
-        try:
-            self.delete_sheet_row('User', row_index)
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao remover usuário: {e}")
-            return False
+        return self.delete_record('User', row_index)
     
     def delete_product(self, row_index: int) -> bool:
         """Remove um produto"""
-        try:
-            self.delete_sheet_row('Product', row_index)
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao remover produto: {e}")
-            return False
+        return self.delete_record('Product', row_index)
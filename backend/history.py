@@ -0,0 +1,280 @@
+"""
+Histórico local das alterações feitas pelo gerenciador do Google Sheets
+
+Cada inclusão, edição ou remoção é registrada como um delta (conteúdo da
+linha antes e depois), o que permite desfazer, refazer e voltar os dados a
+um instante anterior sem depender do histórico de versões do Google.
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Deltas mantidos no histórico; os mais antigos são descartados nos checkpoints
+DEFAULT_MAX_ENTRIES = 5000
+
+# Registros acrescentados ao arquivo antes de reescrevê-lo como um checkpoint
+DEFAULT_CHECKPOINT_EVERY = 500
+
+# Dicionário inicial da compressão: os registros são pequenos e repetem as
+# mesmas chaves, que assim não ocupam espaço em cada um
+_ZDICT = b'{"type": "delta", "cursor", "checkpoint", "seq": , "ts": , "table": "shard": 0, ' \
+         b'"row": , "before": null, "after": null, "cells": {"0": "1": "2": "width": '
+
+_FRAME_HEADER = struct.Struct('>I')
+
+
+class HistoryError(Exception):
+    """Operação de histórico impossível (nada a desfazer, instante fora do histórico)"""
+
+
+class HistoryConflict(HistoryError):
+    """A planilha não está no estado esperado pelo delta (editada por fora)"""
+
+
+@dataclass
+class Delta:
+    """Alteração de uma linha de um shard: conteúdo antes e depois
+
+    `before` é None em inclusões e `after` é None em remoções; a linha
+    (`row`, numeração da planilha) é a ocupada pelo registro no momento
+    da alteração.
+    """
+    seq: int
+    ts: float
+    table: str
+    shard: int
+    row: int
+    before: Optional[List[Any]]
+    after: Optional[List[Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato gravado: em edições, `after` traz só as células alteradas"""
+        data = {'seq': self.seq, 'ts': round(self.ts, 3), 'table': self.table,
+                'shard': self.shard, 'row': self.row, 'before': self.before}
+        if self.before is not None and self.after is not None:
+            data['cells'] = {
+                str(i): value for i, value in enumerate(self.after)
+                if i >= len(self.before) or self.before[i] != value
+            }
+            data['width'] = len(self.after)
+        else:
+            data['after'] = self.after
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Delta':
+        after = data.get('after')
+        if 'cells' in data:
+            after = list(data['before'][:data['width']])
+            after.extend([''] * (data['width'] - len(after)))
+            for i, value in data['cells'].items():
+                after[int(i)] = value
+        return cls(seq=data['seq'], ts=data['ts'], table=data['table'], shard=data['shard'],
+                   row=data['row'], before=data['before'], after=after)
+
+    @property
+    def op(self) -> str:
+        if self.before is None:
+            return 'append'
+        return 'delete' if self.after is None else 'update'
+
+    def summary(self) -> Dict[str, Any]:
+        """Descrição resumida para a API"""
+        return {'seq': self.seq, 'ts': self.ts, 'table': self.table, 'op': self.op,
+                'before': self.before, 'after': self.after}
+
+
+def _encode_frame(record: Dict[str, Any]) -> bytes:
+    compressor = zlib.compressobj(zdict=_ZDICT)
+    payload = compressor.compress(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+    payload += compressor.flush()
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _decode_frame(payload: bytes) -> Dict[str, Any]:
+    decompressor = zlib.decompressobj(zdict=_ZDICT)
+    return json.loads(decompressor.decompress(payload) + decompressor.flush())
+
+
+class ChangeHistory:
+    """Histórico linear de deltas com cursor, gravado em arquivo append-only
+
+    O arquivo é uma sequência de registros comprimidos (zlib), cada um
+    precedido do seu tamanho: deltas e movimentos do cursor (desfazer e
+    refazer). Uma nova alteração depois de desfazer descarta os deltas que
+    poderiam ser refeitos, como em um editor.
+
+    A cada `checkpoint_every` registros o arquivo é reescrito com um único
+    checkpoint (cursor e deltas mantidos), o que limita o tempo de leitura
+    ao iniciar e descarta os deltas além de `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY):
+        self.path = path
+        self.max_entries = max_entries
+        self.checkpoint_every = checkpoint_every
+        # Mantido por desfazer/refazer durante toda a gravação no Sheets
+        self.lock = threading.RLock()
+        self._entries: List[Delta] = []
+        # Quantidade de deltas aplicados (os seguintes podem ser refeitos)
+        self._head = 0
+        self._next_seq = 1
+        # Instante do delta mais recente já descartado (0 se nenhum)
+        self._horizon = 0.0
+        self._frames = 0
+        if os.path.exists(self.path):
+            self._load()
+        self._file = open(self.path, 'ab')
+
+    def _load(self):
+        """Lê o arquivo, descartando um registro final incompleto"""
+        with open(self.path, 'rb') as history_file:
+            data = history_file.read()
+        offset = 0
+        while offset + _FRAME_HEADER.size <= len(data):
+            (size,) = _FRAME_HEADER.unpack_from(data, offset)
+            end = offset + _FRAME_HEADER.size + size
+            if end > len(data):
+                break
+            try:
+                record = _decode_frame(data[offset + _FRAME_HEADER.size:end])
+            except (zlib.error, ValueError):
+                break
+            self._replay(record)
+            self._frames += 1
+            offset = end
+
+        if offset < len(data):
+            # Gravação interrompida: o resto do arquivo é descartado
+            logger.warning(f"Registro incompleto descartado no histórico {self.path}")
+            with open(self.path, 'r+b') as history_file:
+                history_file.truncate(offset)
+
+    def _replay(self, record: Dict[str, Any]):
+        kind = record['type']
+        if kind == 'checkpoint':
+            self._entries = [Delta.from_dict(data) for data in record['entries']]
+            self._head = self._position(record['cursor'])
+            self._horizon = record.get('horizon', 0.0)
+        elif kind == 'delta':
+            self._push(Delta.from_dict(record))
+        elif kind == 'cursor':
+            self._head = self._position(record['cursor'])
+        if self._entries:
+            self._next_seq = max(self._next_seq, self._entries[-1].seq + 1)
+        self._next_seq = max(self._next_seq, record.get('next_seq', 0))
+
+    def _position(self, cursor: int) -> int:
+        """Índice do cursor a partir do último delta aplicado (seq; 0 se nenhum)"""
+        return sum(1 for delta in self._entries if delta.seq <= cursor)
+
+    def _cursor(self) -> int:
+        return self._entries[self._head - 1].seq if self._head else 0
+
+    def _push(self, delta: Delta):
+        del self._entries[self._head:]
+        self._entries.append(delta)
+        self._head = len(self._entries)
+
+    def _write(self, record: Dict[str, Any]):
+        """Acrescenta um registro ao arquivo
+
+        Sem fsync: o histórico não é necessário para a integridade dos
+        dados (o journal é), e perder o último registro numa queda de
+        energia só reduz o que pode ser desfeito.
+        """
+        self._file.write(_encode_frame(record))
+        self._file.flush()
+        self._frames += 1
+        if self._frames >= self.checkpoint_every:
+            self.checkpoint()
+
+    def record(self, table: str, shard: int, row: int,
+               before: Optional[List[Any]], after: Optional[List[Any]]) -> Optional[Delta]:
+        """Registra a alteração de uma linha (ignorada se nada mudou)"""
+        if before is not None and after is not None and list(before) == list(after):
+            return None
+        with self.lock:
+            delta = Delta(seq=self._next_seq, ts=time.time(), table=table, shard=shard, row=row,
+                          before=None if before is None else list(before),
+                          after=None if after is None else list(after))
+            self._next_seq += 1
+            self._push(delta)
+            self._write({'type': 'delta', **delta.to_dict()})
+            return delta
+
+    def undo_plan(self, steps: int = 1) -> List[Delta]:
+        """Deltas a desfazer, do mais recente para o mais antigo"""
+        if self._head == 0:
+            raise HistoryError("Nada a desfazer")
+        return self._entries[max(0, self._head - steps):self._head][::-1]
+
+    def redo_plan(self, steps: int = 1) -> List[Delta]:
+        """Deltas a refazer, do mais antigo para o mais recente"""
+        if self._head == len(self._entries):
+            raise HistoryError("Nada a refazer")
+        return self._entries[self._head:self._head + steps]
+
+    def steps_since(self, timestamp: float) -> int:
+        """Deltas aplicados depois de `timestamp` (a desfazer para voltar a ele)"""
+        if timestamp < self._horizon:
+            raise HistoryError("O instante pedido é anterior ao histórico mantido")
+        return sum(1 for delta in self._entries[:self._head] if delta.ts > timestamp)
+
+    def moved(self, steps: int):
+        """Registra que `steps` deltas foram refeitos (positivo) ou desfeitos (negativo)"""
+        with self.lock:
+            self._head = min(max(self._head + steps, 0), len(self._entries))
+            self._write({'type': 'cursor', 'cursor': self._cursor(), 'next_seq': self._next_seq})
+
+    def entries(self, limit: int = 50) -> Dict[str, Any]:
+        """Deltas mais recentes (os desfeitos marcados) e quantos podem ser desfeitos/refeitos"""
+        with self.lock:
+            recent = []
+            for index in range(len(self._entries) - 1, max(len(self._entries) - limit, 0) - 1, -1):
+                recent.append({**self._entries[index].summary(), 'undone': index >= self._head})
+            return {'entries': recent, 'can_undo': self._head,
+                    'can_redo': len(self._entries) - self._head}
+
+    def checkpoint(self):
+        """Reescreve o arquivo com o estado atual (descartando deltas além do limite)
+
+        O conteúdo é gravado em um arquivo temporário que substitui o
+        atual atomicamente, como na compactação do journal.
+        """
+        with self.lock:
+            excess = max(0, len(self._entries) - self.max_entries)
+            excess = min(excess, self._head)
+            if excess:
+                self._horizon = self._entries[excess - 1].ts
+            del self._entries[:excess]
+            self._head -= excess
+
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'wb') as temp_file:
+                temp_file.write(_encode_frame({
+                    'type': 'checkpoint', 'cursor': self._cursor(), 'next_seq': self._next_seq,
+                    'horizon': self._horizon,
+                    'entries': [delta.to_dict() for delta in self._entries],
+                }))
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            self._file.close()
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'ab')
+            self._frames = 1
+
+    def close(self):
+        """Fecha o arquivo"""
+        with self.lock:
+            if not self._file.closed:
+                self._file.close()
@@ -0,0 +1,154 @@
+"""
+Diário (journal) local das alterações pendentes de gravação no Google Sheets
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Confirmações acumuladas antes de reescrever o arquivo só com as pendentes
+COMPACT_AFTER_ACKS = 1000
+
+
+class MutationJournal:
+    """Arquivo JSON Lines (append-only) onde cada alteração é registrada antes de ser gravada
+
+    Cada linha é uma alteração (`{"type": "mutation", ...}`) ou a confirmação
+    de que alterações já chegaram ao Sheets (`{"type": "ack", "ids": [...]}`).
+    Ao abrir, as alterações sem confirmação são recuperadas.
+
+    O fsync é feito em grupo: quem registra uma alteração espera até que ela
+    esteja em disco, mas um único fsync cobre todas as linhas escritas até o
+    momento, inclusive as de outras threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Alterações que o Sheets recusou de vez ficam ao lado do journal
+        self.dead_letter_path = f"{os.path.splitext(path)[0]}.dead-letter.jsonl"
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # Número de linhas escritas e de linhas já gravadas em disco
+        self._written = 0
+        self._synced = 0
+        self._acks_since_compact = 0
+        self._pending: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        if os.path.exists(self.path):
+            self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """Lê o arquivo e guarda as alterações sem confirmação"""
+        with open(self.path, 'r', encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Linha incompleta de uma gravação interrompida
+                    logger.warning(f"Registro inválido ignorado no journal {self.path}")
+                    continue
+                if record.get('type') == 'ack':
+                    for mutation_id in record['ids']:
+                        self._pending.pop(mutation_id, None)
+                elif record.get('type') == 'mutation':
+                    record.pop('type')
+                    self._pending[record['id']] = record
+
+    def _write(self, record: Dict[str, Any], sync: bool = True):
+        """Acrescenta um registro; com `sync`, aguarda até estar em disco"""
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._written += 1
+            sequence = self._written
+        if sync:
+            self._sync(sequence)
+
+    def _sync(self, sequence: int):
+        """Garante em disco todas as linhas até `sequence` (group commit)"""
+        with self._sync_lock:
+            if self._synced >= sequence:
+                # Outra thread já fez o fsync que cobre esta linha
+                return
+            with self._lock:
+                written = self._written
+                fileno = self._file.fileno()
+            os.fsync(fileno)
+            self._synced = written
+
+    def append(self, mutation: Dict[str, Any]):
+        """Registra uma alteração pendente (retorna depois de gravada em disco)"""
+        with self._lock:
+            self._pending[mutation['id']] = mutation
+        self._write({'type': 'mutation', **mutation})
+
+    def ack(self, ids: List[str]):
+        """Registra alterações já gravadas no Sheets
+
+        Não espera o fsync: se a confirmação se perder, a alteração é
+        reaplicada ao iniciar, o que é seguro porque a reaplicação é idempotente.
+        """
+        if not ids:
+            return
+        with self._lock:
+            for mutation_id in ids:
+                self._pending.pop(mutation_id, None)
+            self._acks_since_compact += len(ids)
+        self._write({'type': 'ack', 'ids': ids}, sync=False)
+        if self._acks_since_compact >= COMPACT_AFTER_ACKS:
+            self.compact()
+
+    def dead_letter(self, mutations: List[Dict[str, Any]], error: str):
+        """Guarda no arquivo de descarte alterações que nunca poderão ser gravadas
+
+        O arquivo (JSON Lines, com o erro e o horário) permite conferir e
+        refazer à mão o que foi perdido. Quem descarta confirma as alterações
+        com `ack` em seguida, para que não sejam reaplicadas ao iniciar.
+        """
+        if not mutations:
+            return
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as dead_letter_file:
+            for mutation in mutations:
+                record = {'failed_at': time.time(), 'error': error, **mutation}
+                dead_letter_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            dead_letter_file.flush()
+            os.fsync(dead_letter_file.fileno())
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Alterações registradas e ainda não confirmadas, na ordem original"""
+        with self._lock:
+            return list(self._pending.values())
+
+    def compact(self):
+        """Reescreve o arquivo apenas com as alterações pendentes
+
+        O novo conteúdo é gravado em um arquivo temporário e substitui o
+        journal atomicamente, então uma falha no meio preserva o original.
+        """
+        with self._sync_lock, self._lock:
+            if not self._pending and self._file.tell() == 0:
+                return
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as temp_file:
+                for mutation in self._pending.values():
+                    temp_file.write(json.dumps({'type': 'mutation', **mutation}, ensure_ascii=False) + '\n')
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            self._file.close()
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._written = self._synced = len(self._pending)
+            self._acks_since_compact = 0
+
+    def close(self):
+        """Grava em disco o que falta e fecha o arquivo"""
+        with self._sync_lock, self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
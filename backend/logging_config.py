@@ -0,0 +1,116 @@
+"""
+Configuração de logs estruturados (JSON), assíncronos e com amostragem
+"""
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Identificador da requisição HTTP em andamento (vazio fora de requisições)
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar('request_id', default='')
+
+# Campos estruturados aceitos em `extra=` e copiados para a saída JSON
+STRUCTURED_FIELDS = ('event', 'operation', 'sheet', 'rows', 'duration_ms',
+                     'method', 'route', 'status')
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos estruturados presentes"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', ''):
+            data['request_id'] = record.request_id
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Anota o registro com o id da requisição e aplica a amostragem
+
+    Roda na thread que gerou o log (antes da fila), onde o contexto da
+    requisição ainda existe. Registros marcados com `extra={'sampled': True}`
+    (eventos de sucesso frequentes) são mantidos com probabilidade
+    `sample_rate`; avisos e erros nunca são descartados.
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if (getattr(record, 'sampled', False) and record.levelno < logging.WARNING
+                and self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _AsyncHandler(QueueHandler):
+    """Enfileira o registro sem formatá-lo
+
+    A formatação (mensagem, JSON, traceback) acontece na thread do
+    QueueListener, fora do caminho da requisição.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(level: str = 'INFO', fmt: str = 'json', sample_rate: float = 1.0):
+    """Configura o logger raiz com saída assíncrona em stderr
+
+    `fmt` é 'json' (um objeto por linha) ou 'text'. Pode ser chamada mais de
+    uma vez; a configuração anterior é substituída.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _AsyncHandler(log_queue)
+    handler.addFilter(ContextFilter(sample_rate))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Descarrega os registros pendentes na fila"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
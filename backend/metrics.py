@@ -0,0 +1,199 @@
+"""
+Métricas de desempenho (latência, tamanho de payload, erros) no formato Prometheus
+"""
+import bisect
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Limites (segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Limites (bytes) dos histogramas de tamanho de payload
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(9))  # 256 B .. 16 MB
+
+# Limites dos histogramas de quantidade de linhas
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def _format_labels(labelnames: Sequence[str], labels: Tuple[str, ...], extra: str = '') -> str:
+    """Monta `{a="x",b="y"}` escapando os valores"""
+    parts = []
+    for name, value in zip(labelnames, labels):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    """Número no formato do Prometheus"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Contador monotônico com rótulos"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """Incrementa o contador da combinação de rótulos"""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        """Valores atuais por combinação de rótulos"""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self, others: Sequence[Dict[Tuple[str, ...], float]] = ()) -> List[str]:
+        """Linhas no formato de texto do Prometheus, somando os `others` (outros processos)"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        values = self.snapshot()
+        for other in others:
+            for labels, value in other.items():
+                values[labels] = values.get(labels, 0) + value
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histograma com limites fixos e rótulos
+
+    Cada observação custa uma busca binária e um incremento; os acumulados
+    exigidos pelo formato do Prometheus são calculados só na exportação.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por rótulos: [contagem por faixa (+ faixa infinita), soma]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Registra uma observação"""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float]]:
+        """Contagens por faixa e soma atuais por combinação de rótulos"""
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+
+    def render(self, others: Sequence[Dict[Tuple[str, ...], Tuple[List[int], float]]] = ()) -> List[str]:
+        """Linhas no formato de texto do Prometheus, somando os `others` (outros processos)"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        values = self.snapshot()
+        for other in others:
+            for labels, (counts, total) in other.items():
+                mine = values.get(labels)
+                values[labels] = ((list(counts), total) if mine is None else
+                                  ([a + b for a, b in zip(mine[0], counts)], mine[1] + total))
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas exportadas juntas"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Cria e registra um contador"""
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Cria e registra um histograma"""
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """Valores atuais de todas as métricas, para somar em outro processo"""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def render(self, others: Sequence[Dict[str, Dict[Tuple[str, ...], Any]]] = ()) -> str:
+        """Todas as métricas no formato de texto do Prometheus
+
+        `others` traz os valores (snapshot) de outros processos, somados aos
+        deste (ex.: coordenador e workers do servidor multiprocesso).
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render([other.get(metric.name, {}) for other in others]))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Requisições atendidas pelo Flask
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Duração das requisições HTTP',
+    ('method', 'route', 'status'))
+
+# Chamadas à API do Google Sheets
+SHEETS_REQUEST_DURATION = REGISTRY.histogram(
+    'sheets_request_duration_seconds', 'Duração das chamadas à API do Google Sheets',
+    ('operation', 'sheet'))
+SHEETS_REQUEST_BYTES = REGISTRY.histogram(
+    'sheets_request_bytes', 'Tamanho do corpo enviado à API do Google Sheets',
+    ('operation', 'sheet'), SIZE_BUCKETS)
+SHEETS_RESPONSE_BYTES = REGISTRY.histogram(
+    'sheets_response_bytes', 'Tamanho da resposta da API do Google Sheets',
+    ('operation', 'sheet'), SIZE_BUCKETS)
+SHEETS_ROWS = REGISTRY.histogram(
+    'sheets_rows', 'Linhas lidas ou gravadas por chamada à API do Google Sheets',
+    ('operation', 'sheet'), ROW_BUCKETS)
+SHEETS_ERRORS = REGISTRY.counter(
+    'sheets_errors_total', 'Chamadas à API do Google Sheets que falharam',
+    ('operation', 'sheet', 'status'))
+SHEETS_RETRIES = REGISTRY.counter(
+    'sheets_retries_total', 'Novas tentativas de chamadas à API do Google Sheets',
+    ('operation', 'sheet'))
+SHEETS_ADMISSION_REJECTED = REGISTRY.counter(
+    'sheets_admission_rejected_total', 'Requisições recusadas pelo controle de admissão do Sheets',
+    ('reason',))
+SHEETS_WRITE_DEAD_LETTERS = REGISTRY.counter(
+    'sheets_write_dead_letters_total', 'Alterações recusadas de vez pelo Google Sheets e descartadas',
+    ('table', 'op', 'status'))
+
+# Listagens servidas com dados antigos do cache (Sheets indisponível ou sobrecarregado)
+HTTP_STALE_RESPONSES = REGISTRY.counter(
+    'http_stale_responses_total', 'Respostas com dados desatualizados do cache',
+    ('route',))
+
+# Tarefas de aquecimento executadas na inicialização
+STARTUP_TASK_DURATION = REGISTRY.histogram(
+    'startup_task_duration_seconds', 'Duração das tarefas de aquecimento na inicialização',
+    ('task', 'status'))
@@ -3,7 +3,37 @@ Modelos de dados para o sistema de gerenciamento
 """
 from dataclasses import dataclass
 from typing import List, Optional
-import re
+from .schema import REGISTRY, Column, TableSchema
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+# Esquemas das abas (colunas na ordem da planilha); novas tabelas podem ser
+# registradas aqui ou no arquivo GOOGLE_SHEETS_SCHEMA_FILE
+USER_SCHEMA = REGISTRY.register(TableSchema(
+    name='User',
+    endpoint='users',
+    label='Usuário',
+    plural='usuários',
+    search_fields=('name', 'email', 'cpf'),
+    columns=(
+        Column('name', label='Nome', min_length=2),
+        Column('cpf', label='CPF', validator='cpf', message='CPF inválido'),
+        Column('email', label='Email', pattern=EMAIL_PATTERN, message='Email inválido'),
+    ),
+))
+
+PRODUCT_SCHEMA = REGISTRY.register(TableSchema(
+    name='Product',
+    endpoint='products',
+    label='Produto',
+    plural='produtos',
+    search_fields=('name', 'description'),
+    columns=(
+        Column('name', label='Nome do produto', min_length=2),
+        Column('price', type='number', label='Preço', minimum=0),
+        Column('description', label='Descrição', min_length=5),
+    ),
+))
 
 @dataclass
 class User:
@@ -14,25 +44,8 @@ class User:
     row_index: Optional[int] = None
     
     def __post_init__(self):
-        """Validação básica dos dados"""
-        if not self.name or len(self.name.strip()) < 2:
-            raise ValueError("Nome deve ter pelo menos 2 caracteres")
-        
-        if not self._is_valid_cpf(self.cpf):
-            raise ValueError("CPF inválido")
-        
-        if not self._is_valid_email(self.email):
-            raise ValueError("Email inválido")
-    
-    def _is_valid_cpf(self, cpf: str) -> bool:
-        """Valida CPF básico"""
-        cpf = re.sub(r'[^0-9]', '', cpf)
-        return len(cpf) == 11
-    
-    def _is_valid_email(self, email: str) -> bool:
-        """Valida email básico"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        """Validação básica dos dados (regras do USER_SCHEMA)"""
+        USER_SCHEMA.check(self.to_dict())
     
     def to_dict(self) -> dict:
         """Converte para dicionário"""
@@ -62,15 +75,8 @@ class Product:
     row_index: Optional[int] = None
     
     def __post_init__(self):
-        """Validação básica dos dados"""
-        if not self.name or len(self.name.strip()) < 2:
-            raise ValueError("Nome do produto deve ter pelo menos 2 caracteres")
-        
-        if self.price < 0:
-            raise ValueError("Preço não pode ser negativo")
-        
-        if not self.description or len(self.description.strip()) < 5:
-            raise ValueError("Descrição deve ter pelo menos 5 caracteres")
+        """Validação básica dos dados (regras do PRODUCT_SCHEMA)"""
+        PRODUCT_SCHEMA.check(self.to_dict())
     
     def to_dict(self) -> dict:
         """Converte para dicionário"""
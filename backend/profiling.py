@@ -0,0 +1,178 @@
+"""
+Perfilador opcional de requisições Flask
+"""
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Modos: todas as requisições ou só as que trazem o cabeçalho PROFILE_HEADER
+MODES = ('all', 'header')
+PROFILE_HEADER = 'X-Profile'
+
+# Formatos: pstats (cProfile, determinístico) ou pilhas colapsadas por
+# amostragem (entrada do flamegraph.pl / speedscope)
+FORMATS = ('pstats', 'collapsed')
+
+# Arquivos mantidos por rota; os mais antigos são removidos
+DEFAULT_KEEP = 20
+
+# Intervalo (segundos) entre amostras no formato 'collapsed'
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class _StackSampler:
+    """Amostra periodicamente a pilha de uma thread em outra thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+
+    def start(self):
+        """Inicia a amostragem"""
+        self._thread.start()
+
+    def stop(self):
+        """Encerra a amostragem"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        """Conta as pilhas observadas (da raiz para a folha)"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def dump(self, path: str):
+        """Grava as pilhas no formato colapsado: `a;b;c <amostras>`"""
+        with open(path, 'w', encoding='utf-8') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """Perfila requisições e grava um arquivo por requisição, agrupado por rota
+
+    Só é instalado no app quando ativado; desligado, não há nenhum custo.
+    """
+
+    def __init__(self, output_dir: str, mode: str = 'all', fmt: str = 'pstats',
+                 keep: int = DEFAULT_KEEP, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"Modo de perfilamento '{mode}' inválido (use {', '.join(MODES)})")
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato de perfilamento '{fmt}' inválido (use {', '.join(FORMATS)})")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.fmt = fmt
+        self.keep = keep
+        self.sample_interval = sample_interval
+        # Só um cProfile pode estar ativo por vez (no Python 3.12+ o segundo
+        # falha com ValueError): requisições simultâneas usam a amostragem
+        self._cprofile_lock = threading.Lock()
+
+    def install(self, app):
+        """Registra os ganchos de início e fim de requisição"""
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._discard)
+        logger.info(f"Perfilamento de requisições ativo ({self.mode}, {self.fmt}) em {self.output_dir}")
+
+    def _start(self):
+        """Inicia o perfilamento da requisição, se aplicável"""
+        if self.mode == 'header' and request.headers.get(PROFILE_HEADER) != '1':
+            return
+        profiler = self._start_cprofile() if self.fmt == 'pstats' else None
+        if profiler is None:
+            profiler = _StackSampler(threading.get_ident(), self.sample_interval)
+            profiler.start()
+        g.request_profiler = (profiler, time.time())
+
+    def _start_cprofile(self) -> Optional[cProfile.Profile]:
+        """Ativa o cProfile, se nenhuma outra requisição o estiver usando (None se não der)"""
+        if not self._cprofile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Outra ferramenta de perfilamento ativa no processo
+            self._cprofile_lock.release()
+            logger.debug(f"cProfile indisponível, usando amostragem: {e}")
+            return None
+        return profiler
+
+    def _stop(self):
+        """Para o perfilamento em andamento e o retorna"""
+        state = g.pop('request_profiler', None)
+        if state is None:
+            return None
+        profiler, started = state
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            self._cprofile_lock.release()
+        else:
+            profiler.stop()
+        return profiler, started
+
+    def _finish(self, response):
+        """Grava o resultado do perfilamento da requisição"""
+        state = self._stop()
+        if state is None:
+            return response
+        profiler, started = state
+
+        try:
+            pstats = isinstance(profiler, cProfile.Profile)
+            path = self._output_path(started, 'prof' if pstats else 'collapsed')
+            if pstats:
+                profiler.dump_stats(path)
+            else:
+                profiler.dump(path)
+            self._prune(os.path.dirname(path))
+            response.headers['X-Profile-File'] = os.path.basename(path)
+        except OSError as e:
+            logger.error(f"Erro ao gravar perfil da requisição: {e}")
+        return response
+
+    def _discard(self, exc: Optional[BaseException] = None):
+        """Garante que o perfilamento pare mesmo quando a requisição falha"""
+        self._stop()
+
+    def _output_path(self, started: float, ext: str) -> str:
+        """Arquivo do perfil: <diretório>/<método>_<rota>/<horário>.<ext>"""
+        rule = request.url_rule.rule if request.url_rule else 'not_found'
+        route = re.sub(r'[^A-Za-z0-9]+', '_', rule).strip('_') or 'root'
+        route_dir = os.path.join(self.output_dir, f"{request.method}_{route}")
+        os.makedirs(route_dir, exist_ok=True)
+
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(started))
+        millis = int(started * 1000) % 1000
+        return os.path.join(route_dir, f"{stamp}-{millis:03d}-{threading.get_ident()}.{ext}")
+
+    def _prune(self, route_dir: str):
+        """Mantém apenas os `keep` perfis mais recentes da rota"""
+        entries = sorted(os.scandir(route_dir), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:-max(self.keep, 1)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
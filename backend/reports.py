@@ -0,0 +1,321 @@
+"""
+Motor de relatórios sobre os dados de usuários e produtos
+
+O numpy só é importado ao montar as colunas ou executar um relatório (no
+aquecimento, em segundo plano), não ao iniciar a aplicação.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Limites inferiores padrão das faixas de preço
+DEFAULT_PRICE_BANDS = [0, 10, 50, 100, 500, 1000]
+
+# Tamanho dos blocos enviados ao transmitir arquivos gerados
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Formatos de saída suportados: extensão e mimetype
+OUTPUT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+
+class ReportError(ValueError):
+    """Erro de parâmetros ou de formato de relatório"""
+
+
+class ReportUnavailableError(ReportError):
+    """Formato de saída cuja dependência opcional não está instalada"""
+
+
+@dataclass
+class Report:
+    """Resultado tabular de um relatório"""
+    name: str
+    title: str
+    columns: List[str]
+    rows: List[List[Any]]
+    revision: int
+    # Montado a partir do cache desatualizado (Sheets indisponível)
+    stale: bool = False
+
+    def to_dict(self) -> dict:
+        """Converte para dicionário"""
+        return {
+            'name': self.name,
+            'title': self.title,
+            'columns': self.columns,
+            'rows': self.rows,
+            'revision': self.revision
+        }
+
+
+def _build_columns(users: List[Dict[str, Any]], products: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Monta os vetores colunares usados pelas agregações"""
+    import numpy as np
+
+    emails = np.array([user['email'] for user in users], dtype=str)
+    if emails.size:
+        domains = np.char.lower(np.char.partition(emails, '@')[:, 2])
+    else:
+        domains = emails
+
+    return {
+        'user_domain': domains,
+        'product_price': np.fromiter((product['price'] for product in products),
+                                     dtype=np.float64, count=len(products)),
+    }
+
+
+def _parse_bands(value: str) -> List[float]:
+    """Converte '0,10,50' em limites de faixa ordenados"""
+    try:
+        bands = sorted({float(part) for part in value.split(',') if part.strip()})
+    except ValueError:
+        raise ReportError("Parâmetro 'bands' deve ser uma lista de números separados por vírgula")
+    if not bands:
+        raise ReportError("Parâmetro 'bands' não pode ser vazio")
+    return bands
+
+
+def _products_by_price_band(columns: Dict[str, np.ndarray], params: Dict[str, str]) -> Tuple[str, List[str], List[List[Any]]]:
+    """Quantidade e valores de produtos por faixa de preço"""
+    import numpy as np
+
+    bands = _parse_bands(params['bands']) if 'bands' in params else DEFAULT_PRICE_BANDS
+    edges = np.asarray(bands, dtype=np.float64)
+    prices = columns['product_price']
+
+    # Preços abaixo do primeiro limite entram na primeira faixa
+    index = np.clip(np.searchsorted(edges, prices, side='right') - 1, 0, len(edges) - 1)
+    counts = np.bincount(index, minlength=len(edges))
+    totals = np.bincount(index, weights=prices, minlength=len(edges))
+    minimums = np.full(len(edges), np.inf)
+    maximums = np.full(len(edges), -np.inf)
+    np.minimum.at(minimums, index, prices)
+    np.maximum.at(maximums, index, prices)
+
+    rows = []
+    for i, lower in enumerate(edges):
+        label = f"{lower:g}+" if i == len(edges) - 1 else f"{lower:g} - {edges[i + 1]:g}"
+        count = int(counts[i])
+        rows.append([
+            label,
+            count,
+            round(float(totals[i]), 2),
+            round(float(totals[i] / count), 2) if count else 0.0,
+            float(minimums[i]) if count else 0.0,
+            float(maximums[i]) if count else 0.0,
+        ])
+
+    return ('Produtos por faixa de preço',
+            ['Faixa', 'Quantidade', 'Total', 'Média', 'Mínimo', 'Máximo'],
+            rows)
+
+
+def _products_summary(columns: Dict[str, np.ndarray], params: Dict[str, str]) -> Tuple[str, List[str], List[List[Any]]]:
+    """Estatísticas gerais de preço do catálogo"""
+    import numpy as np
+
+    prices = columns['product_price']
+    if prices.size:
+        stats = [
+            ['Quantidade', int(prices.size)],
+            ['Total', round(float(prices.sum()), 2)],
+            ['Média', round(float(prices.mean()), 2)],
+            ['Mediana', round(float(np.median(prices)), 2)],
+            ['Desvio padrão', round(float(prices.std()), 2)],
+            ['Mínimo', float(prices.min())],
+            ['Máximo', float(prices.max())],
+        ]
+    else:
+        stats = [['Quantidade', 0]]
+
+    return 'Resumo de produtos', ['Métrica', 'Valor'], stats
+
+
+def _users_by_email_domain(columns: Dict[str, np.ndarray], params: Dict[str, str]) -> Tuple[str, List[str], List[List[Any]]]:
+    """Quantidade de usuários por domínio de email"""
+    import numpy as np
+
+    try:
+        limit = int(params.get('limit', 0))
+    except ValueError:
+        raise ReportError("Parâmetro 'limit' deve ser um número inteiro")
+
+    domains, counts = np.unique(columns['user_domain'], return_counts=True)
+    # Ordena por quantidade (decrescente) e depois por domínio
+    order = np.lexsort((domains, -counts))
+    if limit > 0:
+        order = order[:limit]
+
+    total = int(counts.sum())
+    rows = [
+        [str(domains[i]), int(counts[i]), round(100.0 * counts[i] / total, 2)]
+        for i in order
+    ]
+    return 'Usuários por domínio de email', ['Domínio', 'Quantidade', 'Percentual'], rows
+
+
+# Relatórios disponíveis
+REPORTS: Dict[str, Callable[[Dict[str, np.ndarray], Dict[str, str]], Tuple[str, List[str], List[List[Any]]]]] = {
+    'products_by_price_band': _products_by_price_band,
+    'products_summary': _products_summary,
+    'users_by_email_domain': _users_by_email_domain,
+}
+
+
+class ReportEngine:
+    """Executa relatórios sobre os dados em cache, memorizando por revisão"""
+
+    def __init__(self, sheets_manager):
+        self.sheets_manager = sheets_manager
+        self._lock = threading.Lock()
+        self._revision = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._results: Dict[Tuple, Report] = {}
+
+    def available_reports(self) -> List[str]:
+        """Lista os relatórios disponíveis"""
+        return sorted(REPORTS)
+
+    def _load_columns(self) -> Tuple[int, Dict[str, np.ndarray], bool]:
+        """Obtém as colunas da revisão atual, reconstruindo se os dados mudaram
+
+        Retorna também se os dados vieram do cache desatualizado. Erros de
+        leitura sem dados em cache são propagados, e não viram um relatório vazio.
+        """
+        with self._lock:
+            if (self._revision == self.sheets_manager.data_revision and
+                    self.sheets_manager.is_cache_fresh()):
+                return self._revision, self._columns, False
+
+        tables, stale = self.sheets_manager.read_tables(['User', 'Product'])
+        users, products = tables['User'], tables['Product']
+        revision = self.sheets_manager.data_revision
+
+        with self._lock:
+            if revision != self._revision:
+                self._columns = _build_columns(users, products)
+                self._results = {}
+                self._revision = revision
+                logger.info(f"Colunas de relatório reconstruídas (revisão {revision})")
+            return self._revision, self._columns, stale
+
+    def prepare(self):
+        """Monta as colunas da revisão atual antes do primeiro relatório (aquecimento)"""
+        self._load_columns()
+
+    def run(self, name: str, params: Dict[str, str] = None) -> Report:
+        """Executa um relatório, reutilizando o resultado da mesma revisão"""
+        if name not in REPORTS:
+            raise ReportError(f"Relatório '{name}' não encontrado")
+
+        params = dict(params or {})
+        revision, columns, stale = self._load_columns()
+        key = (name, tuple(sorted(params.items())))
+
+        with self._lock:
+            report = self._results.get(key)
+        if report is not None and report.revision == revision:
+            return replace(report, stale=True) if stale else report
+
+        title, headers, rows = REPORTS[name](columns, params)
+        report = Report(name=name, title=title, columns=headers, rows=rows, revision=revision)
+
+        with self._lock:
+            if self._revision == revision:
+                self._results[key] = report
+        return replace(report, stale=True) if stale else report
+
+
+def _iter_buffer(buffer: io.BytesIO) -> Iterator[bytes]:
+    """Transmite um buffer em blocos"""
+    buffer.seek(0)
+    return iter(lambda: buffer.read(STREAM_CHUNK_SIZE), b'')
+
+
+def _render_csv(report: Report) -> Iterator[bytes]:
+    """Gera o CSV linha a linha"""
+    line = io.StringIO()
+    writer = csv.writer(line)
+    # BOM para o Excel reconhecer UTF-8
+    yield '\ufeff'.encode('utf-8')
+    for row in [report.columns] + report.rows:
+        writer.writerow(row)
+        yield line.getvalue().encode('utf-8')
+        line.seek(0)
+        line.truncate()
+
+
+def _render_xlsx(report: Report) -> Iterator[bytes]:
+    """Gera a planilha Excel"""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ReportUnavailableError("Exportação para Excel requer o pacote 'openpyxl'")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=report.title[:31])
+    sheet.append(report.columns)
+    for row in report.rows:
+        sheet.append(row)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return _iter_buffer(buffer)
+
+
+def _render_pdf(report: Report) -> Iterator[bytes]:
+    """Gera o relatório em PDF"""
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+    except ImportError:
+        raise ReportUnavailableError("Exportação para PDF requer o pacote 'reportlab'")
+
+    buffer = io.BytesIO()
+    document = SimpleDocTemplate(buffer, pagesize=A4, title=report.title)
+    table = Table([report.columns] + report.rows, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e5e7eb')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')]),
+    ]))
+    document.build([Paragraph(report.title, getSampleStyleSheet()['Title']), table])
+    return _iter_buffer(buffer)
+
+
+_RENDERERS = {
+    'csv': _render_csv,
+    'xlsx': _render_xlsx,
+    'pdf': _render_pdf,
+}
+
+
+def render_report(report: Report, output_format: str) -> Tuple[Iterator[bytes], str, str]:
+    """Renderiza o relatório no formato pedido
+
+    Retorna o iterador de bytes, o mimetype e o nome do arquivo.
+    """
+    if output_format not in _RENDERERS:
+        raise ReportError(f"Formato '{output_format}' não suportado")
+
+    chunks = _RENDERERS[output_format](report)
+    filename = f"{report.name}.{output_format}"
+    return chunks, OUTPUT_FORMATS[output_format], filename
@@ -0,0 +1,395 @@
+"""
+Esquemas declarativos das tabelas da planilha
+
+Cada tabela é descrita por um TableSchema (aba, colunas, tipos, regras de
+validação e localidade dos números e datas). Na criação, o esquema é
+compilado em funções geradas com o código específico das suas colunas:
+linhas -> registros (leitura), registro -> linha (gravação) e validação.
+O laço de leitura não testa tipos nem posições de coluna a cada linha.
+"""
+import json
+import re
+import zlib
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .sharding import encode_row_index
+
+# Tipos de coluna suportados
+COLUMN_TYPES = ('text', 'number', 'integer', 'date')
+
+# Valor usado na leitura quando a célula está vazia ou não pode ser convertida
+TYPE_DEFAULTS = {'text': '', 'number': 0.0, 'integer': 0, 'date': ''}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def row_version(row: List[Any]) -> str:
+    """Versão do conteúdo de uma linha (ETag/If-Match das alterações)
+
+    Números inteiros gravados como float (10.0) e lidos da API como int (10)
+    e células vazias no fim da linha não mudam a versão.
+    """
+    cells = [str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+             for value in row]
+    while cells and cells[-1] == '':
+        cells.pop()
+    return format(zlib.crc32('\x1f'.join(cells).encode('utf-8')), '08x')
+
+
+class SchemaError(ValueError):
+    """Dados que não atendem ao esquema da tabela (mensagem para o usuário)"""
+
+
+def _is_valid_cpf(value: str) -> bool:
+    """CPF com 11 dígitos (pontuação ignorada)"""
+    return len(re.sub(r'[^0-9]', '', value)) == 11
+
+
+# Validadores nomeados, referenciados pelas colunas (inclusive em JSON)
+VALIDATORS: Dict[str, Callable[[Any], bool]] = {
+    'cpf': _is_valid_cpf,
+}
+
+
+@dataclass(frozen=True)
+class Locale:
+    """Formato de números e datas escritos como texto na planilha"""
+    decimal: str = ','
+    thousands: str = '.'
+    # O primeiro formato é usado na gravação
+    date_formats: Tuple[str, ...] = ('%d/%m/%Y', '%Y-%m-%d')
+
+    def parse_number(self, value: Any) -> float:
+        """Número a partir de um valor da planilha ou da API ("1.234,5" -> 1234.5)
+
+        Sem o separador decimal da localidade, o texto é lido como número
+        simples ("10.5" -> 10.5), como os valores gravados pela própria API.
+        """
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        text = str(value).strip().replace(' ', '').replace('\u00a0', '')
+        if self.decimal in text:
+            text = text.replace(self.thousands, '').replace(self.decimal, '.')
+        return float(text)
+
+    def parse_date(self, value: Any) -> str:
+        """Data ISO (AAAA-MM-DD) a partir de um texto em um dos formatos aceitos"""
+        text = str(value).strip()
+        for date_format in self.date_formats:
+            try:
+                return datetime.strptime(text, date_format).date().isoformat()
+            except ValueError:
+                continue
+        raise ValueError(f"Data inválida: {text}")
+
+    def format_date(self, value: str) -> str:
+        """Texto da data (ISO ou já formatada) no formato de gravação"""
+        return datetime.strptime(self.parse_date(value), '%Y-%m-%d').strftime(self.date_formats[0])
+
+
+PT_BR = Locale()
+LOCALES = {
+    'pt_BR': PT_BR,
+    'en_US': Locale(decimal='.', thousands=',', date_formats=('%m/%d/%Y', '%Y-%m-%d')),
+}
+
+
+@dataclass(frozen=True)
+class Column:
+    """Coluna de uma tabela, na ordem em que aparece na aba"""
+    name: str
+    type: str = 'text'
+    # Nome usado nas mensagens de validação
+    label: Optional[str] = None
+    required: bool = True
+    min_length: int = 0
+    minimum: Optional[float] = None
+    pattern: Optional[str] = None
+    # Nome de um validador em VALIDATORS
+    validator: Optional[str] = None
+    # Mensagem quando `pattern` ou `validator` rejeitam o valor
+    message: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        return self.label or self.name
+
+
+def _column_letter(index: int) -> str:
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA'"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """Tabela lógica: aba padrão, colunas e textos usados pela API"""
+    name: str
+    columns: Tuple[Column, ...]
+    # Aba com os dados (padrão: o nome da tabela)
+    sheet_name: Optional[str] = None
+    # Caminho da API (/api/<endpoint>); sem ele, a tabela não ganha rotas
+    endpoint: Optional[str] = None
+    label: str = 'Registro'
+    plural: str = 'registros'
+    feminine: bool = False
+    search_fields: Tuple[str, ...] = ()
+    locale: Locale = PT_BR
+    # Primeira linha de dados (a linha 1 é o cabeçalho)
+    first_row: int = 2
+    _compiled: Dict[str, Callable] = field(default_factory=dict, init=False,
+                                           repr=False, compare=False)
+
+    def __post_init__(self):
+        """Validação da definição e compilação das funções de conversão"""
+        if not self.columns:
+            raise ValueError(f"Tabela '{self.name}' precisa de pelo menos uma coluna")
+        names = [column.name for column in self.columns]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Tabela '{self.name}' tem colunas repetidas")
+        for column in self.columns:
+            if not _IDENTIFIER.match(column.name) or column.name == 'row_index':
+                raise ValueError(f"Nome de coluna inválido na tabela '{self.name}': {column.name}")
+            if column.type not in COLUMN_TYPES:
+                raise ValueError(f"Tipo '{column.type}' inválido na coluna '{column.name}'")
+            if column.validator and column.validator not in VALIDATORS:
+                raise ValueError(f"Validador '{column.validator}' desconhecido na coluna '{column.name}'")
+        self._compiled.update(_compile(self))
+
+    @property
+    def sheet(self) -> str:
+        """Aba padrão da tabela"""
+        return self.sheet_name or self.name
+
+    @property
+    def range_name(self) -> str:
+        """Intervalo lido da aba, sem cabeçalho (ex.: 'A2:C')"""
+        return f"A{self.first_row}:{_column_letter(len(self.columns) - 1)}"
+
+    @property
+    def field_names(self) -> Tuple[str, ...]:
+        return tuple(column.name for column in self.columns)
+
+    def message(self, action: str) -> str:
+        """Mensagem de sucesso: 'Usuário criado com sucesso'"""
+        return f"{self.label} {action}{'a' if self.feminine else 'o'} com sucesso"
+
+    def decode_rows(self, rows: List[List[Any]], shard_index: int = 0) -> List[Dict[str, Any]]:
+        """Linhas de uma aba -> registros (com row_index); linhas incompletas são ignoradas"""
+        return self._compiled['decode'](rows, shard_index)
+
+    def encode(self, record: Dict[str, Any]) -> List[Any]:
+        """Registro validado -> valores da linha, na ordem das colunas"""
+        return self._compiled['encode'](record)
+
+    def check(self, record: Dict[str, Any]):
+        """Aplica as regras das colunas a um registro já convertido"""
+        for column in self.columns:
+            value = record.get(column.name)
+            if value in (None, '') and not column.required:
+                continue
+            text = '' if value is None else str(value)
+            if column.min_length and len(text.strip()) < column.min_length:
+                raise SchemaError(f"{column.title} deve ter pelo menos {column.min_length} caracteres")
+            if (column.minimum is not None and isinstance(value, (int, float))
+                    and value < column.minimum):
+                raise SchemaError(f"{column.title} não pode ser negativo" if column.minimum == 0
+                                  else f"{column.title} deve ser no mínimo {column.minimum:g}")
+            if column.pattern and not re.match(column.pattern, text):
+                raise SchemaError(column.message or f"{column.title} inválido")
+            if column.validator and not VALIDATORS[column.validator](text):
+                raise SchemaError(column.message or f"{column.title} inválido")
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Valida e converte os dados recebidos pela API em um registro
+
+        Levanta SchemaError com uma mensagem para o usuário.
+        """
+        for column in self.columns:
+            if column.required and data.get(column.name) in (None, ''):
+                raise SchemaError(f"Campo {column.name} é obrigatório")
+        record = self._compiled['convert'](data)
+        self.check(record)
+        return record
+
+
+def _compile(schema: TableSchema) -> Dict[str, Callable]:
+    """Gera as funções de conversão da tabela
+
+    Cada coluna vira uma expressão fixa no código gerado (como faz o módulo
+    dataclasses), sem consultar o tipo ou a posição durante o laço.
+    """
+    locale = schema.locale
+    namespace: Dict[str, Any] = {
+        'encode_row_index': encode_row_index,
+        '_version': row_version,
+        'SchemaError': SchemaError,
+    }
+
+    def lenient(parse, default):
+        """Conversão da leitura: células inválidas viram o valor padrão"""
+        def convert(value):
+            try:
+                return parse(value)
+            except (TypeError, ValueError):
+                return default
+        return convert
+
+    def read_date(value):
+        """Datas em formato desconhecido são mantidas como texto"""
+        if value == '':
+            return ''
+        try:
+            return locale.parse_date(value)
+        except ValueError:
+            return str(value)
+
+    read_converters = {
+        'text': str,
+        'number': lenient(locale.parse_number, 0.0),
+        'integer': lenient(lambda value: int(locale.parse_number(value)), 0),
+        'date': read_date,
+    }
+    write_converters = {
+        'text': str,
+        'number': float,
+        'integer': int,
+        'date': lambda value: locale.format_date(value) if value else '',
+    }
+    input_converters = {
+        'text': lambda value: str(value).strip(),
+        'number': locale.parse_number,
+        'integer': lambda value: int(locale.parse_number(value)),
+        'date': locale.parse_date,
+    }
+
+    # Linhas mais curtas que a última coluna obrigatória são ignoradas
+    required_width = max((i + 1 for i, column in enumerate(schema.columns) if column.required),
+                         default=0)
+
+    decode_fields, encode_fields, convert_lines = [], [], []
+    for i, column in enumerate(schema.columns):
+        namespace[f'_read{i}'] = read_converters[column.type]
+        namespace[f'_write{i}'] = write_converters[column.type]
+        namespace[f'_input{i}'] = input_converters[column.type]
+        default = TYPE_DEFAULTS[column.type]
+        key = repr(column.name)
+        if i < required_width:
+            decode_fields.append(f"{key}: _read{i}(row[{i}])")
+        else:
+            decode_fields.append(f"{key}: _read{i}(row[{i}]) if len(row) > {i} else {default!r}")
+        encode_fields.append(f"_write{i}(record.get({key}, {default!r}))")
+        convert_lines += [
+            f"    value = data.get({key})",
+            "    if value is None or value == '':",
+            f"        record[{key}] = {default!r}",
+            "    else:",
+            "        try:",
+            f"            record[{key}] = _input{i}(value)",
+            "        except (TypeError, ValueError):",
+            f"            raise SchemaError({column.title + ' inválido'!r}) from None",
+        ]
+
+    source = "\n".join([
+        "def decode(rows, shard_index):",
+        "    records = []",
+        "    append = records.append",
+        f"    for sheet_row, row in enumerate(rows, {schema.first_row}):",
+        f"        if len(row) >= {required_width}:",
+        "            append({" + ", ".join(decode_fields)
+        + ", 'row_index': encode_row_index(shard_index, sheet_row), 'version': _version(row)})",
+        "    return records",
+        "",
+        "def encode(record):",
+        "    return [" + ", ".join(encode_fields) + "]",
+        "",
+        "def convert(data):",
+        "    record = {}",
+        *convert_lines,
+        "    return record",
+    ])
+    exec(compile(source, f"<schema {schema.name}>", 'exec'), namespace)
+    return {name: namespace[name] for name in ('decode', 'encode', 'convert')}
+
+
+class SchemaRegistry:
+    """Tabelas conhecidas pela aplicação, por nome"""
+
+    def __init__(self):
+        self._schemas: Dict[str, TableSchema] = {}
+
+    def register(self, schema: TableSchema) -> TableSchema:
+        """Registra (ou substitui) o esquema de uma tabela"""
+        self._schemas[schema.name] = schema
+        return schema
+
+    def get(self, name: str) -> TableSchema:
+        """Esquema da tabela; KeyError se não existir"""
+        return self._schemas[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._schemas
+
+    def __iter__(self) -> Iterator[TableSchema]:
+        return iter(list(self._schemas.values()))
+
+    def ranges(self) -> Dict[str, str]:
+        """Intervalo lido de cada tabela"""
+        return {schema.name: schema.range_name for schema in self}
+
+    def sheet_names(self) -> Dict[str, str]:
+        """Aba padrão de cada tabela"""
+        return {schema.name: schema.sheet for schema in self}
+
+
+# Registro global; os esquemas de User e Product são definidos em models.py
+REGISTRY = SchemaRegistry()
+
+# Campos aceitos na definição de uma tabela em JSON
+_TABLE_FIELDS = ('sheet_name', 'endpoint', 'label', 'plural', 'feminine', 'first_row')
+
+
+def load_schema_config(path: str, registry: SchemaRegistry = REGISTRY) -> List[str]:
+    """Carrega definições de tabelas de um arquivo JSON
+
+    Formato:
+        {"User": {"sheet_name": "Usuarios"},
+         "Supplier": {"endpoint": "suppliers", "label": "Fornecedor",
+                      "plural": "fornecedores", "locale": "pt_BR",
+                      "search_fields": ["name"],
+                      "columns": [{"name": "name", "label": "Nome", "min_length": 2},
+                                  {"name": "since", "type": "date", "required": false}]}}
+
+    Tabelas já registradas sem "columns" só têm os campos informados
+    alterados. Retorna os nomes das tabelas carregadas.
+    """
+    with open(path, 'r', encoding='utf-8') as config_file:
+        config = json.load(config_file)
+
+    loaded = []
+    for name, table_config in config.items():
+        options = {key: table_config[key] for key in _TABLE_FIELDS if key in table_config}
+        if 'search_fields' in table_config:
+            options['search_fields'] = tuple(table_config['search_fields'])
+        if 'locale' in table_config:
+            if table_config['locale'] not in LOCALES:
+                raise ValueError(f"Localidade '{table_config['locale']}' desconhecida na tabela '{name}'")
+            options['locale'] = LOCALES[table_config['locale']]
+        if 'columns' in table_config:
+            options['columns'] = tuple(Column(**column) for column in table_config['columns'])
+
+        if name in registry and 'columns' not in options:
+            schema = replace(registry.get(name), **options)
+        elif 'columns' in options:
+            schema = TableSchema(name=name, **options)
+        else:
+            raise ValueError(f"Tabela '{name}' precisa da lista de colunas")
+        registry.register(schema)
+        loaded.append(name)
+    return loaded
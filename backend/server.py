@@ -0,0 +1,120 @@
+"""
+Servidor da API sem interface, para vários clientes na rede local
+
+Uso (na raiz do projeto):
+    python -m backend.server --host 0.0.0.0 --port 5001 --workers 4
+
+O processo principal é o coordenador: cria o gerenciador do Google Sheets
+como na aplicação de desktop e é o único que acessa a planilha (ver
+backend/shared_cache.py). Os workers atendem as requisições HTTP em
+paralelo, todos no mesmo socket, com a réplica dos dados sincronizada com
+o coordenador. Workers que terminam inesperadamente são reiniciados.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5001
+
+# Intervalo (segundos) entre as verificações dos workers
+MONITOR_INTERVAL = 1.0
+
+# Tempo (segundos) que cada worker tem para terminar ao encerrar o servidor
+STOP_TIMEOUT = 5.0
+
+
+def run_worker(listener: socket.socket, host: str, port: int):
+    """Processo worker: atende requisições HTTP no socket compartilhado"""
+    from werkzeug.serving import make_server
+    from .app import app
+
+    server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+    listener.close()
+    # Os workers disputam as conexões do mesmo socket: quem perde a disputa
+    # não pode ficar bloqueado em accept()
+    server.socket.setblocking(False)
+    server.serve_forever()
+
+
+def serve(sheets_manager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          workers: int = 1):
+    """Atende a API com `workers` processos até Ctrl+C ou SIGTERM
+
+    `sheets_manager` é o gerenciador completo do processo atual, que passa
+    a ser o coordenador do cache compartilhado.
+    """
+    from .shared_cache import SHARED_CACHE_ENV, CacheCoordinator, CoordinatorServer
+
+    coordinator = CoordinatorServer(CacheCoordinator(sheets_manager))
+    coordinator.start()
+    # Os workers herdam o ambiente e, com ele, o endereço do coordenador
+    os.environ[SHARED_CACHE_ENV] = coordinator.address
+
+    listener = socket.create_server((host, port), backlog=128)
+    context = multiprocessing.get_context('spawn')
+    processes = []
+
+    def start_worker(number):
+        process = context.Process(target=run_worker, args=(listener, host, port),
+                                  name=f'api-worker-{number}', daemon=True)
+        process.start()
+        return process
+
+    # SIGTERM (ex.: serviço do sistema) encerra como Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for number in range(workers):
+            processes.append(start_worker(number))
+        logger.info(f"Servidor em http://{host}:{port} com {workers} worker(s)")
+
+        while True:
+            time.sleep(MONITOR_INTERVAL)
+            for number, process in enumerate(processes):
+                if not process.is_alive():
+                    logger.warning(f"Worker {process.name} terminou (código {process.exitcode}); reiniciando")
+                    processes[number] = start_worker(number)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Encerrando servidor...")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(STOP_TIMEOUT)
+        listener.close()
+        coordinator.stop()
+        # Grava as alterações pendentes e o snapshot do cache
+        sheets_manager.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Servidor da API para vários clientes')
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', DEFAULT_HOST),
+                        help=f'endereço de escuta (padrão: {DEFAULT_HOST}, toda a rede local)')
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', DEFAULT_PORT)),
+                        help=f'porta (padrão: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', '0')),
+                        help='processos que atendem requisições (padrão: um por núcleo)')
+    args = parser.parse_args(argv)
+
+    # Cria o gerenciador completo (journal, gravação assíncrona, snapshot)
+    # e configura o logging, como na aplicação de desktop
+    from .app import sheets_manager
+    from .logging_config import shutdown_logging
+
+    try:
+        serve(sheets_manager, args.host, args.port, args.workers or os.cpu_count() or 1)
+    finally:
+        shutdown_logging()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
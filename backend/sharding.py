@@ -0,0 +1,130 @@
+"""
+Particionamento (sharding) de tabelas lógicas entre várias abas e planilhas
+"""
+import bisect
+import json
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Faixa de linhas reservada a cada shard no índice global dos registros.
+# O Google Sheets limita uma planilha a 10 milhões de células, então nenhuma
+# aba passa desse número de linhas; o shard 0 mantém o número da linha.
+SHARD_ROW_STRIDE = 10_000_000
+
+# Estratégias de particionamento suportadas
+STRATEGIES = ('hash', 'range')
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Aba que guarda parte de uma tabela lógica"""
+    sheet_name: str
+    # None indica a planilha principal (GOOGLE_SHEETS_SPREADSHEET_ID)
+    spreadsheet_id: Optional[str] = None
+
+    @property
+    def cache_key(self) -> str:
+        """Chave da aba no cache (o nome, se estiver na planilha principal)"""
+        if self.spreadsheet_id is None:
+            return self.sheet_name
+        return f"{self.spreadsheet_id}/{self.sheet_name}"
+
+
+@dataclass
+class ShardedTable:
+    """Tabela lógica distribuída entre um ou mais shards
+
+    Novas linhas vão para o shard escolhido pela coluna-chave: por hash
+    (distribuição uniforme) ou por faixa de valores, onde `boundaries` traz
+    o menor valor de cada shard a partir do segundo.
+    """
+    name: str
+    range_name: str
+    shards: List[Shard]
+    key_column: int = 0
+    strategy: str = 'hash'
+    boundaries: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        """Validação da configuração"""
+        if not self.shards:
+            raise ValueError(f"Tabela '{self.name}' precisa de pelo menos um shard")
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Estratégia '{self.strategy}' inválida para a tabela '{self.name}'")
+        if self.strategy == 'range' and len(self.boundaries) != len(self.shards) - 1:
+            raise ValueError(
+                f"Tabela '{self.name}' precisa de {len(self.shards) - 1} limites de faixa"
+            )
+
+    def shard_for_row(self, row: List[Any]) -> int:
+        """Índice do shard onde uma nova linha deve ser gravada"""
+        if len(self.shards) == 1:
+            return 0
+
+        key = str(row[self.key_column]).strip().lower()
+        if self.strategy == 'range':
+            return bisect.bisect_right(self.boundaries, key)
+        return zlib.crc32(key.encode('utf-8')) % len(self.shards)
+
+    def locate(self, row_index: int) -> Tuple[int, int]:
+        """Converte o índice global de um registro em (shard, linha na aba)"""
+        shard_index, sheet_row = divmod(row_index, SHARD_ROW_STRIDE)
+        if shard_index >= len(self.shards):
+            raise ValueError(f"Registro {row_index} fora dos shards da tabela '{self.name}'")
+        return shard_index, sheet_row
+
+
+def encode_row_index(shard_index: int, sheet_row: int) -> int:
+    """Índice global de um registro a partir do shard e da linha na aba"""
+    return shard_index * SHARD_ROW_STRIDE + sheet_row
+
+
+def default_tables(table_ranges: Dict[str, str],
+                   sheet_names: Optional[Dict[str, str]] = None) -> Dict[str, ShardedTable]:
+    """Uma aba por tabela na planilha principal (por padrão, com o nome da tabela)"""
+    sheet_names = sheet_names or {}
+    return {
+        name: ShardedTable(name=name, range_name=range_name,
+                           shards=[Shard(sheet_name=sheet_names.get(name, name))])
+        for name, range_name in table_ranges.items()
+    }
+
+
+def load_shard_config(path: str, table_ranges: Dict[str, str],
+                      primary_spreadsheet_id: Optional[str] = None,
+                      sheet_names: Optional[Dict[str, str]] = None) -> Dict[str, ShardedTable]:
+    """Carrega a distribuição das tabelas de um arquivo JSON
+
+    Formato:
+        {"Product": {"strategy": "hash", "key_column": 0,
+                     "shards": [{"sheet_name": "Product"},
+                                {"sheet_name": "Product", "spreadsheet_id": "..."}]}}
+
+    Tabelas ausentes do arquivo continuam com um único shard.
+    """
+    with open(path, 'r', encoding='utf-8') as config_file:
+        config = json.load(config_file)
+
+    tables = default_tables(table_ranges, sheet_names)
+    for name, table_config in config.items():
+        if name not in table_ranges:
+            raise ValueError(f"Tabela '{name}' desconhecida na configuração de shards")
+
+        shards = []
+        for shard_config in table_config.get('shards', []):
+            spreadsheet_id = shard_config.get('spreadsheet_id')
+            if spreadsheet_id == primary_spreadsheet_id:
+                spreadsheet_id = None
+            shards.append(Shard(sheet_name=shard_config['sheet_name'], spreadsheet_id=spreadsheet_id))
+
+        tables[name] = ShardedTable(
+            name=name,
+            range_name=table_ranges[name],
+            shards=shards,
+            key_column=table_config.get('key_column', 0),
+            strategy=table_config.get('strategy', 'hash'),
+            boundaries=[str(b).strip().lower() for b in table_config.get('boundaries', [])]
+        )
+
+    return tables
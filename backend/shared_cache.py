@@ -0,0 +1,382 @@
+"""
+Cache compartilhado entre os processos do servidor (backend/server.py)
+
+Só o processo coordenador acessa o Google Sheets: ele mantém o
+GoogleSheetsManager completo (cache, detecção de mudanças, journal, gravação
+assíncrona e snapshot) e o atende por um socket local autenticado. Cada
+worker guarda uma réplica das abas e, a cada leitura, recebe do coordenador
+apenas as abas cuja revisão mudou. As releituras da planilha acontecem uma
+de cada vez no coordenador, então a cota do Sheets não cresce com o número
+de workers.
+"""
+import logging
+import marshal
+import multiprocessing
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import metrics
+from .admission import Overloaded, deadline, request_deadline
+from .cache import CacheEntry
+from .google_sheets import GoogleSheetsManager, VersionConflict, upstream_errors
+from .history import HistoryConflict, HistoryError
+from .snapshot import MARSHAL_VERSION, from_columns, to_columns
+
+logger = logging.getLogger(__name__)
+
+# Variável de ambiente com o endereço do coordenador ("host:porta"), definida
+# pelo servidor para os workers
+SHARED_CACHE_ENV = 'SHEETS_SHARED_CACHE'
+
+# Conexões pendentes aceitas pelo coordenador. O padrão do Listener (1)
+# descarta conexões quando vários workers conectam ao mesmo tempo, e o
+# worker fica esperando para sempre pela autenticação
+COORDINATOR_BACKLOG = 64
+
+# Intervalo (segundos) com que cada worker envia suas métricas ao coordenador
+METRICS_PUSH_INTERVAL = 10.0
+
+
+class CoordinatorError(Exception):
+    """Erro ocorrido no coordenador ao atender um worker"""
+
+
+# Erros recriados no worker com o mesmo tipo (as rotas os tratam à parte)
+_FORWARDED_ERRORS = {'conflict': HistoryConflict, 'history': HistoryError}
+
+
+def _error_reply(error: Exception) -> tuple:
+    """Resposta de erro enviada ao worker (Overloaded mantém o Retry-After)"""
+    if isinstance(error, Overloaded):
+        return ('overloaded', str(error), error.retry_after)
+    if isinstance(error, VersionConflict):
+        return ('version_conflict', str(error), error.current)
+    for kind, error_type in _FORWARDED_ERRORS.items():
+        if isinstance(error, error_type):
+            return (kind, str(error))
+    return ('error', f"{type(error).__name__}: {error}")
+
+
+def _raise_reply(reply: tuple):
+    """Recria no worker o erro ocorrido no coordenador"""
+    if reply[0] == 'overloaded':
+        raise Overloaded(reply[1], reply[2])
+    if reply[0] == 'version_conflict':
+        raise VersionConflict(reply[1], reply[2])
+    raise _FORWARDED_ERRORS.get(reply[0], CoordinatorError)(reply[1])
+
+
+class CacheCoordinator:
+    """Operações que o coordenador executa a pedido dos workers"""
+
+    # Únicos métodos que os workers podem chamar
+    METHODS = ('sync', 'refresh_changed', 'add_record', 'update_record', 'delete_record',
+               'history_entries', 'undo', 'redo', 'restore_to', 'metrics')
+
+    def __init__(self, sheets_manager: GoogleSheetsManager):
+        self.sheets_manager = sheets_manager
+        # Uma releitura da planilha por vez: workers que pedem a mesma aba
+        # expirada esperam a leitura em andamento em vez de repeti-la
+        self._refresh_lock = threading.Lock()
+        # Últimas métricas recebidas de cada worker (pelo nome do processo)
+        self._worker_metrics: Dict[str, Dict[str, Any]] = {}
+        self._metrics_lock = threading.Lock()
+
+    def sync(self, table_names: List[str], known: Dict[str, int]) -> bytes:
+        """Atualiza as tabelas se necessário e retorna as abas que mudaram
+
+        `known` traz a revisão de cada aba na réplica do worker. A resposta
+        (marshal) traz a revisão global e, por aba, (revisão, colunas); as
+        colunas vêm como None quando o worker já tem aquela revisão.
+        """
+        # Com o Sheets indisponível, o worker recebe o que há em cache e o erro
+        error = None
+        try:
+            with self._refreshing():
+                self.sheets_manager._read_tables(table_names)
+        except upstream_errors() as e:
+            error = _error_reply(e)
+
+        cache = self.sheets_manager.cache
+        entries = cache.export()
+        sheets = {}
+        for name in table_names:
+            for shard in self.sheets_manager.tables[name].shards:
+                entry = entries.get(shard.cache_key)
+                if entry is None:
+                    continue
+                unchanged = known.get(shard.cache_key) == entry.revision
+                sheets[shard.cache_key] = (entry.revision, None if unchanged else to_columns(entry.rows))
+        return marshal.dumps({'revision': cache.revision, 'sheets': sheets, 'error': error},
+                             MARSHAL_VERSION)
+
+    @contextmanager
+    def _refreshing(self) -> Iterator[None]:
+        """Ocupa a vez de reler a planilha, esperando no máximo até o prazo da requisição"""
+        limit = request_deadline.get()
+        timeout = -1 if limit is None else max(0.0, limit - time.monotonic())
+        if not self._refresh_lock.acquire(timeout=timeout):
+            self.sheets_manager.admission.reject(
+                'timeout', "Google Sheets sobrecarregado: leitura da planilha em andamento")
+        try:
+            yield
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_changed(self) -> int:
+        """Relê as tabelas que mudaram na planilha (ver GoogleSheetsManager.refresh_changed)"""
+        with self._refreshing():
+            return self.sheets_manager.refresh_changed()
+
+    def add_record(self, table_name: str, record: Dict[str, Any]) -> bool:
+        return self.sheets_manager.add_record(table_name, record)
+
+    def update_record(self, table_name: str, row_index: int, record: Dict[str, Any],
+                      expected_version: Optional[str] = None) -> bool:
+        return self.sheets_manager.update_record(table_name, row_index, record, expected_version)
+
+    def delete_record(self, table_name: str, row_index: int,
+                      expected_version: Optional[str] = None) -> bool:
+        return self.sheets_manager.delete_record(table_name, row_index, expected_version)
+
+    def history_entries(self, limit: int) -> Dict[str, Any]:
+        return self.sheets_manager.history_entries(limit)
+
+    def undo(self, steps: int) -> int:
+        return self.sheets_manager.undo(steps)
+
+    def redo(self, steps: int) -> int:
+        return self.sheets_manager.redo(steps)
+
+    def restore_to(self, timestamp: float) -> int:
+        return self.sheets_manager.restore_to(timestamp)
+
+    def metrics(self, worker: str, snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Guarda as métricas do worker e retorna as do coordenador e dos demais workers
+
+        O coordenador é o único que chama o Sheets, então as métricas
+        `sheets_*` só existem aqui. Um worker reiniciado recomeça do zero.
+        """
+        with self._metrics_lock:
+            self._worker_metrics[worker] = snapshot
+            others = [values for name, values in self._worker_metrics.items() if name != worker]
+        return [metrics.REGISTRY.snapshot()] + others
+
+
+class CoordinatorServer:
+    """Atende os workers: uma thread por conexão, chamadas (método, argumentos)
+
+    A conexão é autenticada com a chave do processo (herdada pelos workers
+    criados com multiprocessing) e só aceita conexões locais.
+    """
+
+    def __init__(self, coordinator: CacheCoordinator, host: str = '127.0.0.1', port: int = 0):
+        self.coordinator = coordinator
+        self.listener = Listener((host, port), backlog=COORDINATOR_BACKLOG,
+                                 authkey=multiprocessing.current_process().authkey)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        """Endereço no formato "host:porta" (valor de SHARED_CACHE_ENV)"""
+        host, port = self.listener.address
+        return f"{host}:{port}"
+
+    def start(self):
+        """Passa a aceitar conexões em segundo plano"""
+        self._thread = threading.Thread(target=self._accept, name='cache-coordinator', daemon=True)
+        self._thread.start()
+        logger.info(f"Coordenador do cache compartilhado em {self.address}")
+
+    def stop(self):
+        """Deixa de aceitar conexões"""
+        self._stopped.set()
+        self.listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except (multiprocessing.AuthenticationError, EOFError, OSError) as e:
+                if self._stopped.is_set():
+                    return
+                # Falha na autenticação ou conexão encerrada durante ela
+                logger.warning(f"Conexão recusada no coordenador: {e!r}")
+                continue
+            threading.Thread(target=self._serve, args=(connection,),
+                             name='cache-coordinator-conn', daemon=True).start()
+
+    def _serve(self, connection):
+        with connection:
+            while True:
+                try:
+                    method, args, timeout = connection.recv()
+                except (EOFError, OSError):
+                    return
+                if method not in CacheCoordinator.METHODS:
+                    connection.send(('error', f"Método '{method}' não permitido"))
+                    continue
+                try:
+                    # O prazo da requisição do worker vale para as chamadas ao Sheets
+                    with deadline(timeout):
+                        reply = ('ok', getattr(self.coordinator, method)(*args))
+                except (Overloaded, VersionConflict, HistoryError) as e:
+                    reply = _error_reply(e)
+                except Exception as e:
+                    logger.error(f"Erro no coordenador ao executar {method}: {e}")
+                    reply = _error_reply(e)
+                connection.send(reply)
+
+
+class CoordinatorClient:
+    """Chamadas ao coordenador a partir de um worker
+
+    As conexões são reaproveitadas entre requisições (cada thread usa uma
+    conexão por vez), evitando a autenticação a cada chamada.
+    """
+
+    def __init__(self, address: str):
+        host, _, port = address.rpartition(':')
+        self.address = (host, int(port))
+        self._connections: 'queue.LifoQueue' = queue.LifoQueue()
+
+    def call(self, method: str, *args):
+        """Executa o método no coordenador com o prazo restante da requisição atual"""
+        limit = request_deadline.get()
+        timeout = None if limit is None else max(0.0, limit - time.monotonic())
+        try:
+            connection = self._connections.get_nowait()
+        except queue.Empty:
+            connection = Client(self.address, authkey=multiprocessing.current_process().authkey)
+        try:
+            connection.send((method, args, timeout))
+            reply = connection.recv()
+        except (EOFError, OSError):
+            connection.close()
+            raise
+        self._connections.put(connection)
+        if reply[0] != 'ok':
+            _raise_reply(reply)
+        return reply[1]
+
+    def close(self):
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SharedSheetsManager(GoogleSheetsManager):
+    """Gerenciador dos workers: réplica local do cache sincronizada com o coordenador
+
+    Não acessa o Google Sheets. As leituras sincronizam a réplica (só as
+    abas que mudaram são transferidas) e as alterações são executadas pelo
+    coordenador, que as registra no journal e as grava na planilha.
+    """
+
+    def __init__(self, address: str, **kwargs):
+        self.address = address
+        self.coordinator: Optional[CoordinatorClient] = None
+        super().__init__(**kwargs)
+        self._stop_metrics = threading.Event()
+        threading.Thread(target=self._push_metrics, name='worker-metrics', daemon=True).start()
+
+    def _authenticate(self):
+        self.coordinator = CoordinatorClient(self.address)
+        # Falha já na inicialização se o coordenador não estiver acessível
+        self._sync([])
+        logger.info(f"Worker conectado ao coordenador do cache em {self.address}")
+
+    def _sync(self, table_names: List[str]):
+        """Atualiza a réplica local das abas das tabelas"""
+        keys = [shard.cache_key for name in table_names for shard in self.tables[name].shards]
+        known = {}
+        for key in keys:
+            entry = self.cache.get(key)
+            if entry is not None:
+                known[key] = entry.revision
+
+        payload = marshal.loads(self.coordinator.call('sync', table_names, known))
+        now = time.time()
+        entries: Dict[str, Optional[CacheEntry]] = {}
+        for key in keys:
+            sheet = payload['sheets'].get(key)
+            if sheet is None:
+                entries[key] = None
+                continue
+            revision, columns = sheet
+            if columns is None:
+                self.cache.touch(key)
+            else:
+                entries[key] = CacheEntry(rows=from_columns(columns), revision=revision,
+                                          fetched_at=now, loaded_at=now)
+        self.cache.mirror(entries, payload['revision'])
+        if payload['error'] is not None:
+            # A réplica já recebeu os dados antigos do coordenador
+            _raise_reply(payload['error'])
+
+    def _read_tables(self, table_names: List[str], revalidate: bool = False):
+        self._sync(table_names)
+        data = {}
+        for name in table_names:
+            data[name] = []
+            for i, shard in enumerate(self.tables[name].shards):
+                entry = self.cache.get(shard.cache_key)
+                data[name].append((i, entry.rows if entry is not None else []))
+        return data
+
+    def process_metrics(self) -> List[Dict[str, Any]]:
+        """Envia as métricas deste worker e recebe as do coordenador e dos demais"""
+        return self.coordinator.call('metrics', multiprocessing.current_process().name,
+                                     metrics.REGISTRY.snapshot())
+
+    def _push_metrics(self):
+        """Mantém as métricas deste worker atualizadas no coordenador"""
+        while not self._stop_metrics.wait(METRICS_PUSH_INTERVAL):
+            try:
+                self.process_metrics()
+            except Exception as e:
+                logger.debug(f"Erro ao enviar métricas ao coordenador: {e}")
+
+    def stale_errors(self):
+        # Com o coordenador inacessível, as leituras usam a réplica local
+        return upstream_errors() + (CoordinatorError, EOFError)
+
+    def refresh_changed(self) -> int:
+        self.coordinator.call('refresh_changed')
+        self._sync(list(self.tables))
+        return self.cache.revision
+
+    def add_record(self, table_name: str, record: Dict[str, Any]) -> bool:
+        return self.coordinator.call('add_record', table_name, record)
+
+    def update_record(self, table_name: str, row_index: int, record: Dict[str, Any],
+                      expected_version: Optional[str] = None) -> bool:
+        return self.coordinator.call('update_record', table_name, row_index, record, expected_version)
+
+    def delete_record(self, table_name: str, row_index: int,
+                      expected_version: Optional[str] = None) -> bool:
+        return self.coordinator.call('delete_record', table_name, row_index, expected_version)
+
+    def history_entries(self, limit: int = 50) -> Dict[str, Any]:
+        return self.coordinator.call('history_entries', limit)
+
+    def undo(self, steps: int = 1) -> int:
+        return self.coordinator.call('undo', steps)
+
+    def redo(self, steps: int = 1) -> int:
+        return self.coordinator.call('redo', steps)
+
+    def restore_to(self, timestamp: float) -> int:
+        return self.coordinator.call('restore_to', timestamp)
+
+    def close(self):
+        self._stop_metrics.set()
+        if self.coordinator is not None:
+            self.coordinator.close()
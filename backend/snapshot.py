@@ -0,0 +1,193 @@
+"""
+Snapshot em disco do cache das abas, para inicialização com dados prontos
+
+O arquivo guarda, por aba, as linhas em formato colunar (uma lista por
+coluna) serializadas com `marshal`, além da revisão dos dados e do sinal de
+mudança de cada aba. Colunas carregam bem mais rápido que listas de linhas
+e o formato não executa código ao ser lido (ao contrário de pickle).
+"""
+import gc
+import logging
+import marshal
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .cache import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Intervalo padrão (segundos) entre gravações periódicas do snapshot
+DEFAULT_SAVE_INTERVAL = 60.0
+
+MAGIC = b'SHEETSNAP'
+FORMAT_VERSION = 1
+# Versão do formato do marshal (estável desde o Python 3.4)
+MARSHAL_VERSION = 4
+
+
+def to_columns(rows: List[List[Any]]) -> Dict[str, Any]:
+    """Linhas -> colunas; linhas mais curtas são completadas e anotadas"""
+    width = max((len(row) for row in rows), default=0)
+    short = {index: len(row) for index, row in enumerate(rows) if len(row) < width}
+    padded = ([list(row) + [''] * (width - len(row)) for row in rows] if short else rows)
+    return {
+        'count': len(rows),
+        'columns': [list(column) for column in zip(*padded)],
+        'short': short,
+    }
+
+
+def from_columns(data: Dict[str, Any]) -> List[List[Any]]:
+    """Colunas -> linhas, restaurando o tamanho original das linhas curtas"""
+    if not data['columns']:
+        return [[] for _ in range(data['count'])]
+    rows = list(map(list, zip(*data['columns'])))
+    for index, length in data['short'].items():
+        rows[index] = rows[index][:length]
+    return rows
+
+
+def write_snapshot(path: str, spreadsheet_id: Optional[str], revision: int,
+                   entries: Dict[str, CacheEntry]):
+    """Grava o snapshot de forma atômica (arquivo temporário + rename)"""
+    payload = {
+        'format': FORMAT_VERSION,
+        'spreadsheet_id': spreadsheet_id,
+        'revision': revision,
+        'saved_at': time.time(),
+        'sheets': {
+            key: {
+                'signature': entry.signature,
+                'loaded_at': entry.loaded_at,
+                **to_columns(entry.rows),
+            }
+            for key, entry in entries.items()
+        },
+    }
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(MAGIC)
+        file.write(marshal.dumps(payload, MARSHAL_VERSION))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def read_snapshot(path: str, spreadsheet_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Lê o snapshot, retornando {'revision', 'saved_at', 'sheets': {aba: (linhas, sinal, lido em)}}
+
+    Retorna None se o arquivo não existe, é inválido ou pertence a outra
+    planilha.
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+
+    if not data.startswith(MAGIC):
+        logger.warning(f"Snapshot {path} inválido; ignorado")
+        return None
+
+    # A coleta de lixo durante a criação de milhares de listas dobra o tempo de carga
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        payload = marshal.loads(data[len(MAGIC):])
+        if payload.get('format') != FORMAT_VERSION:
+            logger.warning(f"Snapshot {path} em formato incompatível; ignorado")
+            return None
+        if payload.get('spreadsheet_id') != spreadsheet_id:
+            logger.info(f"Snapshot {path} é de outra planilha; ignorado")
+            return None
+        sheets = {
+            key: (from_columns(sheet), sheet['signature'], sheet['loaded_at'])
+            for key, sheet in payload['sheets'].items()
+        }
+    except (EOFError, ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Snapshot {path} corrompido; ignorado: {e}")
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {'revision': payload['revision'], 'saved_at': payload['saved_at'], 'sheets': sheets}
+
+
+class SnapshotSaver:
+    """Grava o snapshot do cache periodicamente e no encerramento
+
+    Só grava quando a revisão dos dados mudou desde a última gravação (ou
+    carga).
+    """
+
+    def __init__(self, sheets_manager, path: str, save_interval: float = DEFAULT_SAVE_INTERVAL):
+        self.sheets_manager = sheets_manager
+        self.path = path
+        self.save_interval = save_interval
+        self._saved_revision: Optional[int] = None
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self) -> bool:
+        """Carrega o snapshot no cache; retorna se havia dados para carregar"""
+        started = time.perf_counter()
+        snapshot = read_snapshot(self.path, self.sheets_manager.spreadsheet_id)
+        if not snapshot:
+            return False
+
+        known = {shard.cache_key for table in self.sheets_manager.tables.values()
+                 for shard in table.shards}
+        sheets = {key: value for key, value in snapshot['sheets'].items() if key in known}
+        if not sheets:
+            return False
+
+        self.sheets_manager.cache.restore(sheets, snapshot['revision'])
+        self._saved_revision = self.sheets_manager.cache.revision
+        logger.info(f"Snapshot carregado de {self.path}: {len(sheets)} aba(s), "
+                    f"revisão {snapshot['revision']}, salvo há "
+                    f"{time.time() - snapshot['saved_at']:.0f} s, "
+                    f"em {(time.perf_counter() - started) * 1000:.1f} ms")
+        return True
+
+    def save(self, force: bool = False) -> bool:
+        """Grava o snapshot se os dados mudaram; retorna se gravou"""
+        with self._save_lock:
+            cache = self.sheets_manager.cache
+            revision = cache.revision
+            if not force and revision == self._saved_revision:
+                return False
+            entries = cache.export()
+            if not entries:
+                return False
+            write_snapshot(self.path, self.sheets_manager.spreadsheet_id, revision, entries)
+            self._saved_revision = revision
+            logger.debug("Snapshot gravado em %s (revisão %d)", self.path, revision)
+            return True
+
+    def start(self):
+        """Inicia a gravação periódica em segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sheets-snapshot', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Interrompe a gravação periódica e grava uma última vez"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.save()
+        except OSError as e:
+            logger.error(f"Erro ao gravar o snapshot em {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.save_interval):
+            try:
+                self.save()
+            except OSError as e:
+                logger.error(f"Erro ao gravar o snapshot em {self.path}: {e}")
@@ -0,0 +1,166 @@
+"""
+Medição do tempo de inicialização: fases e importações
+
+No executável empacotado o custo das importações domina a inicialização.
+O StartupTimer registra a duração de cada fase (importações, backend,
+servidor, janela, aquecimento) e de cada módulo importado, sem depender de
+`python -X importtime`, que não está disponível no executável. O relatório
+pode ser conferido contra um orçamento de tempo (ver `main.py --startup-check`).
+
+Este módulo só usa a biblioteca padrão: é importado antes de todo o resto.
+"""
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Módulos listados no relatório, dos mais demorados para os mais rápidos
+DEFAULT_TOP_IMPORTS = 15
+
+
+class ImportTimer:
+    """Mede a execução de cada módulo importado (tempo total e próprio)
+
+    Instalado no início de `sys.meta_path`, delega a busca aos demais
+    finders e envolve o `exec_module` do loader encontrado. O tempo próprio
+    desconta os módulos importados durante a execução do módulo.
+    """
+
+    def __init__(self):
+        # módulo -> (tempo total, tempo próprio), em segundos
+        self.modules: Dict[str, Tuple[float, float]] = {}
+        self.active = False
+        self._local = threading.local()
+
+    def install(self):
+        """Passa a medir as importações seguintes"""
+        if not self.active:
+            sys.meta_path.insert(0, self)
+            self.active = True
+
+    def uninstall(self):
+        """Para de medir (os loaders já envolvidos deixam de registrar)"""
+        if self.active:
+            sys.meta_path.remove(self)
+            self.active = False
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            spec = find_spec(name, path, target) if find_spec is not None else None
+            if spec is not None:
+                self._wrap(spec.loader)
+                return spec
+        return None
+
+    def _wrap(self, loader):
+        """Envolve o exec_module do loader (uma vez; loaders podem ser compartilhados)"""
+        if loader is None or isinstance(loader, type) or getattr(loader, '_startup_timed', False):
+            return
+        exec_module = getattr(loader, 'exec_module', None)
+        if exec_module is None:
+            return
+
+        def timed_exec_module(module):
+            if not self.active:
+                return exec_module(module)
+            with self._measure(module.__name__):
+                return exec_module(module)
+
+        try:
+            loader.exec_module = timed_exec_module
+            loader._startup_timed = True
+        except AttributeError:
+            pass
+
+    @contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        # [início, tempo dos módulos importados por este]
+        frame = [time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            total = time.perf_counter() - frame[0]
+            if stack:
+                stack[-1][1] += total
+            self.modules[name] = (total, total - frame[1])
+
+    def top(self, count: int = DEFAULT_TOP_IMPORTS) -> List[Dict[str, Any]]:
+        """Módulos de maior tempo total"""
+        ranked = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            {'module': name, 'total_ms': round(total * 1000, 1), 'self_ms': round(own * 1000, 1)}
+            for name, (total, own) in ranked[:count]
+        ]
+
+
+class StartupTimer:
+    """Fases da inicialização, medidas a partir de `started` (time.perf_counter)"""
+
+    def __init__(self, started: Optional[float] = None, measure_imports: bool = True):
+        self.started = time.perf_counter() if started is None else started
+        self.phases: List[Tuple[str, float, float]] = []
+        self.imports = ImportTimer()
+        if measure_imports:
+            self.imports.install()
+
+    def elapsed(self) -> float:
+        """Segundos desde o início"""
+        return time.perf_counter() - self.started
+
+    def add_phase(self, name: str, start: float, end: float):
+        """Registra uma fase medida por fora (valores de time.perf_counter)"""
+        self.phases.append((name, start, end))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Mede a fase executada dentro do bloco"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, start, time.perf_counter())
+
+    def finish(self):
+        """Encerra a medição das importações"""
+        self.imports.uninstall()
+
+    def report(self, top: int = DEFAULT_TOP_IMPORTS) -> Dict[str, Any]:
+        """Tempo total, fases (início e duração) e módulos mais lentos, em ms"""
+        return {
+            'total_ms': round(self.elapsed() * 1000, 1),
+            'phases': [
+                {'name': name, 'start_ms': round((start - self.started) * 1000, 1),
+                 'duration_ms': round((end - start) * 1000, 1)}
+                for name, start, end in self.phases
+            ],
+            'imports': self.imports.top(top),
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Relatório em texto, para o terminal"""
+    lines = [f"Inicialização em {report['total_ms']:.0f} ms", "", "Fases:"]
+    for phase in report['phases']:
+        lines.append(f"  {phase['name']:<16} {phase['duration_ms']:>9.1f} ms"
+                     f"  (início em {phase['start_ms']:.1f} ms)")
+    if report['imports']:
+        lines.extend(["", "Importações mais lentas (total / próprio):"])
+        for item in report['imports']:
+            lines.append(f"  {item['module']:<40} {item['total_ms']:>9.1f} / {item['self_ms']:.1f} ms")
+    return '\n'.join(lines)
+
+
+def write_report(report: Dict[str, Any], path: str):
+    """Grava o relatório em JSON (ex.: artefato do CI)"""
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
@@ -0,0 +1,181 @@
+"""
+Arquivos estáticos do build do React: pré-compressão e entrega
+
+Uso após o `npm run build` (na raiz do projeto):
+    python -m backend.static_assets frontend/build
+
+Grava ao lado de cada arquivo compressível uma versão `.br` (se o pacote
+'brotli' estiver instalado) e uma `.gz`. Em execução, `StaticAssets` lista
+o build uma única vez e entrega a variante aceita pelo cliente
+(Accept-Encoding), com cache imutável para arquivos com hash no nome.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, Optional, Tuple
+
+from flask import Response, request, send_file
+
+logger = logging.getLogger(__name__)
+
+# Extensões que valem a pena comprimir (imagens e fontes já são comprimidas)
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.ico')
+
+# Arquivos menores que isso não são comprimidos
+MIN_COMPRESS_SIZE = 1024
+
+# Codificações na ordem de preferência: (nome no Accept-Encoding, sufixo)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Nomes gerados pelo build com hash do conteúdo (ex.: main.3f2a1b9c.js,
+# 787.d2c1a0f4.chunk.js): podem ficar em cache indefinidamente
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?[a-z0-9]+$")
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# index.html e demais arquivos: sempre revalidados
+REVALIDATE_CACHE = 'no-cache'
+
+
+def _compress_brotli(data: bytes) -> Optional[bytes]:
+    """Comprime com brotli, ou None se o pacote não estiver instalado"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def precompress(build_dir: str) -> Dict[str, int]:
+    """Grava as variantes .br e .gz dos arquivos compressíveis do build
+
+    Retorna quantos arquivos de cada codificação foram gravados.
+    """
+    written = {'br': 0, 'gzip': 0}
+    brotli_missing = False
+    for root, _, files in os.walk(build_dir):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as source:
+                data = source.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+
+            variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+            compressed = _compress_brotli(data)
+            if compressed is None:
+                brotli_missing = True
+            else:
+                variants['br'] = compressed
+
+            for encoding, suffix in ENCODINGS:
+                # Só mantém a variante se ela for de fato menor
+                if encoding in variants and len(variants[encoding]) < len(data):
+                    with open(path + suffix, 'wb') as output:
+                        output.write(variants[encoding])
+                    written[encoding] += 1
+
+    if brotli_missing:
+        logger.warning("Pacote 'brotli' não instalado; apenas variantes gzip foram geradas")
+    return written
+
+
+class StaticAssets:
+    """Entrega os arquivos do build a partir de um índice montado na criação
+
+    O diretório é percorrido uma vez; as requisições consultam só o índice,
+    sem acessar o sistema de arquivos para decidir o que servir. Um novo
+    build exige reiniciar o servidor.
+    """
+
+    def __init__(self, build_dir: str):
+        self.build_dir = os.path.abspath(build_dir)
+        # caminho relativo -> {codificação: caminho absoluto do arquivo}
+        self.files: Dict[str, Dict[str, str]] = {}
+        self._scan()
+
+    def _scan(self):
+        if not os.path.isdir(self.build_dir):
+            logger.warning("Build do frontend não encontrado em %s", self.build_dir)
+            return
+        suffixes = {suffix: encoding for encoding, suffix in ENCODINGS}
+        for root, _, files in os.walk(self.build_dir):
+            for name in files:
+                absolute = os.path.join(root, name)
+                relative = os.path.relpath(absolute, self.build_dir).replace(os.sep, '/')
+                base, suffix = os.path.splitext(relative)
+                if suffix in suffixes and base.endswith(COMPRESSIBLE_EXTENSIONS):
+                    self.files.setdefault(base, {})[suffixes[suffix]] = absolute
+                else:
+                    self.files.setdefault(relative, {})['identity'] = absolute
+        # Variantes sem o arquivo original não são servidas
+        self.files = {path: variants for path, variants in self.files.items()
+                      if 'identity' in variants}
+        logger.info("Build do frontend: %d arquivos em %s", len(self.files), self.build_dir)
+
+    @staticmethod
+    def _accepted_encodings() -> Dict[str, float]:
+        """Codificações do Accept-Encoding com seus pesos (q)"""
+        accepted = {}
+        for part in request.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = part.strip().partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                accepted[name.lower()] = quality
+        return accepted
+
+    def _choose(self, variants: Dict[str, str]) -> Tuple[str, str]:
+        """Variante a enviar: (codificação, caminho)"""
+        accepted = self._accepted_encodings()
+        for encoding, _ in ENCODINGS:
+            if encoding in variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding, variants[encoding]
+        return 'identity', variants['identity']
+
+    def serve(self, path: str) -> Response:
+        """Responde com o arquivo do build, ou index.html (rotas do React)"""
+        variants = self.files.get(path)
+        if variants is None:
+            path = 'index.html'
+            variants = self.files.get(path)
+            if variants is None:
+                return Response("Build do frontend não encontrado. Execute 'npm run build'.",
+                                status=404, mimetype='text/plain')
+
+        encoding, file_path = self._choose(variants)
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = send_file(file_path, mimetype=mimetype, conditional=True)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        if len(variants) > 1:
+            response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = (
+            IMMUTABLE_CACHE if HASHED_NAME.search(path) else REVALIDATE_CACHE
+        )
+        return response
+
+
+def main():
+    """Pré-comprime o diretório de build indicado (padrão: frontend/build)"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    build_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join('frontend', 'build')
+    if not os.path.isdir(build_dir):
+        print(f"Diretório de build não encontrado: {build_dir}", file=sys.stderr)
+        return 1
+    written = precompress(build_dir)
+    print(f"Variantes geradas em {build_dir}: {written['br']} brotli, {written['gzip']} gzip")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Aquecimento da aplicação na inicialização
+
+Enquanto a janela carrega, tarefas em segundo plano renovam o token, abrem
+a conexão com a API, leem as tabelas e montam os índices em memória, para
+que a primeira tela aberta seja atendida sem esperar pelo Google Sheets.
+As tarefas rodam em paralelo, por prioridade, respeitando as dependências
+entre elas; a falha de uma só cancela as que dependem dela.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tarefas de aquecimento executadas ao mesmo tempo
+DEFAULT_MAX_WORKERS = 3
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+_FINISHED = (DONE, FAILED, SKIPPED)
+
+
+@dataclass
+class WarmupTask:
+    """Tarefa de aquecimento: menor `priority` começa antes entre as liberadas"""
+    name: str
+    label: str
+    func: Callable[[], Any]
+    priority: int = 0
+    after: Tuple[str, ...] = ()
+    status: str = PENDING
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'label': self.label, 'status': self.status,
+                'duration_ms': self.duration_ms, 'error': self.error}
+
+
+class WarmupScheduler:
+    """Executa as tarefas de aquecimento em segundo plano e expõe o progresso"""
+
+    def __init__(self, tasks: Sequence[WarmupTask], max_workers: int = DEFAULT_MAX_WORKERS):
+        self.tasks = {task.name: task for task in tasks}
+        self.max_workers = max_workers
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # Início do aquecimento (time.perf_counter); None antes de start()
+        self.started: Optional[float] = None
+        self._elapsed: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """Indica se não há aquecimento em andamento
+
+        Pronto quando todas as tarefas terminaram (com ou sem sucesso) ou
+        quando o aquecimento não foi iniciado (desligado ou em um worker).
+        """
+        return self._thread is None or all(task.status in _FINISHED for task in self.tasks.values())
+
+    def start(self):
+        """Inicia o aquecimento sem bloquear quem chamou"""
+        if self._thread is not None:
+            return
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='startup-warmup', daemon=True)
+        self._thread.start()
+
+    def _release(self) -> List[WarmupTask]:
+        """Tarefas pendentes cujas dependências terminaram, por prioridade
+
+        As que dependem de uma tarefa que falhou são marcadas como puladas.
+        """
+        released = []
+        with self._condition:
+            changed = True
+            while changed:
+                changed = False
+                for task in self.tasks.values():
+                    if task.status != PENDING:
+                        continue
+                    states = [self.tasks[name].status for name in task.after if name in self.tasks]
+                    if any(state in (FAILED, SKIPPED) for state in states):
+                        task.status = SKIPPED
+                        changed = True
+                    elif all(state == DONE for state in states):
+                        task.status = RUNNING
+                        released.append(task)
+            self._condition.notify_all()
+        return sorted(released, key=lambda task: task.priority)
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='startup-warmup') as pool:
+            running = set()
+            while True:
+                running.update(pool.submit(self._execute, task) for task in self._release())
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+
+        with self._condition:
+            self._elapsed = time.perf_counter() - self.started
+            self._condition.notify_all()
+        failed = [task.name for task in self.tasks.values() if task.status != DONE]
+        logger.info("Aquecimento concluído em %.0f ms%s", self._elapsed * 1000,
+                    f" (não concluídas: {', '.join(failed)})" if failed else "",
+                    extra={'event': 'warmup', 'duration_ms': round(self._elapsed * 1000, 1)})
+
+    def _execute(self, task: WarmupTask):
+        started = time.perf_counter()
+        try:
+            task.func()
+            status, error = DONE, None
+        except Exception as e:
+            logger.warning(f"Aquecimento: tarefa '{task.name}' falhou: {e}")
+            status, error = FAILED, str(e)
+        duration = time.perf_counter() - started
+        metrics.STARTUP_TASK_DURATION.observe(duration, task=task.name, status=status)
+        with self._condition:
+            task.status, task.error = status, error
+            task.duration_ms = round(duration * 1000, 1)
+            self._condition.notify_all()
+
+    def wait(self, name: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Aguarda uma tarefa (ou todas) terminar; False se o prazo acabar antes
+
+        Sem o aquecimento iniciado não há o que aguardar.
+        """
+        if self._thread is None:
+            return True
+        tasks = [self.tasks[name]] if name in self.tasks else list(self.tasks.values())
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: all(task.status in _FINISHED for task in tasks), timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Progresso para a interface: pronto, tarefas e tempo decorrido"""
+        with self._condition:
+            if self._elapsed is not None:
+                elapsed = self._elapsed
+            elif self.started is not None:
+                elapsed = time.perf_counter() - self.started
+            else:
+                elapsed = 0.0
+            return {
+                'ready': self.ready,
+                'elapsed_ms': round(elapsed * 1000, 1),
+                'tasks': [task.to_dict() for task in self.tasks.values()],
+            }
+
+
+def startup_tasks(sheets_manager, report_engine) -> List[WarmupTask]:
+    """Tarefas de aquecimento do gerenciador do Sheets e dos relatórios
+
+    O token e a conexão vêm primeiro; a leitura das tabelas roda em paralelo
+    com a abertura da conexão e, terminada, libera a montagem dos índices.
+    """
+    tables = list(sheets_manager.tables)
+    return [
+        WarmupTask('token', 'Renovando acesso ao Google', sheets_manager.refresh_token,
+                   priority=0),
+        WarmupTask('connection', 'Conectando ao Google Sheets', sheets_manager.warm_connection,
+                   priority=1, after=('token',)),
+        WarmupTask('prefetch', 'Carregando dados', lambda: sheets_manager.read_tables(tables),
+                   priority=0, after=('token',)),
+        WarmupTask('reports', 'Preparando relatórios', report_engine.prepare,
+                   priority=2, after=('prefetch',)),
+    ]
@@ -0,0 +1,256 @@
+"""
+Gravação assíncrona (write-behind) das alterações no Google Sheets
+"""
+import atexit
+import dataclasses
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+from .journal import MutationJournal
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (segundos) entre gravações em lote no Sheets
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Espera (segundos) antes de tentar de novo um lote que falhou; dobra a cada falha
+RETRY_BASE_DELAY = 1.0
+
+# Espera máxima (segundos) entre tentativas de um lote
+RETRY_MAX_DELAY = 300.0
+
+
+@dataclass
+class Mutation:
+    """Alteração de um registro, na linha que ele ocupa no seu shard"""
+    op: str  # 'append', 'update' ou 'delete'
+    table: str
+    shard: int
+    sheet_row: int = 0
+    values: Optional[List[Any]] = None
+    # Conteúdo da linha antes da alteração (remoções), para reaplicação segura
+    expected: Optional[List[Any]] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def to_dict(self) -> dict:
+        """Converte para dicionário (formato do journal)"""
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Mutation':
+        """Cria instância a partir de um registro do journal"""
+        return cls(
+            op=data['op'],
+            table=data['table'],
+            shard=data['shard'],
+            sheet_row=data['sheet_row'],
+            values=data.get('values'),
+            expected=data.get('expected'),
+            id=data['id']
+        )
+
+
+def coalesce(mutations: List[Mutation]) -> Tuple[List[Tuple[Mutation, List[str]]], List[str]]:
+    """Mescla alterações repetidas do mesmo registro
+
+    Atualizações seguidas de uma mesma linha viram uma só (e uma atualização
+    de uma linha recém-incluída é mesclada à inclusão). Uma remoção descarta
+    as alterações anteriores da linha removida e encerra a mesclagem no seu
+    shard, já que desloca as linhas seguintes.
+
+    Retorna [(alteração efetiva, ids cobertos)] na ordem original e os ids
+    das alterações que se anularam.
+    """
+    effective: List[Optional[Tuple[Mutation, List[str]]]] = []
+    latest: Dict[Tuple[str, int, int], int] = {}
+    cancelled: List[str] = []
+
+    for mutation in mutations:
+        key = (mutation.table, mutation.shard, mutation.sheet_row)
+        position = latest.get(key)
+
+        if mutation.op == 'update' and position is not None:
+            previous, ids = effective[position]
+            effective[position] = (dataclasses.replace(previous, values=mutation.values),
+                                   ids + [mutation.id])
+            continue
+
+        if mutation.op == 'delete':
+            if position is not None:
+                previous, ids = effective[position]
+                effective[position] = None
+                if previous.op == 'append':
+                    # Linha incluída e removida na mesma janela: nada a gravar
+                    cancelled.extend(ids + [mutation.id])
+                    mutation = None
+                else:
+                    cancelled.extend(ids)
+            for other in [k for k in latest if k[:2] == key[:2]]:
+                del latest[other]
+            if mutation is None:
+                continue
+
+        effective.append((mutation, [mutation.id]))
+        if mutation.op != 'delete':
+            latest[key] = len(effective) - 1
+
+    return [item for item in effective if item is not None], cancelled
+
+
+class WriteBehindQueue:
+    """Fila de alterações confirmadas localmente e gravadas em lote no Sheets
+
+    Cada alteração é aplicada ao cache e registrada no journal antes de ser
+    confirmada (alterações não gravadas são reaplicadas pelo gerenciador ao
+    iniciar); uma thread em segundo plano grava as pendentes a cada
+    `flush_interval` segundos, agrupando as do mesmo tipo em uma requisição.
+    Lotes que falham por indisponibilidade do Sheets (429, 5xx, rede)
+    continuam no journal e são tentados de novo com espera exponencial; os
+    recusados de vez (demais 4xx) vão para o arquivo de descarte do journal,
+    para não bloquear as alterações seguintes.
+    """
+
+    def __init__(self, sheets_manager, journal: MutationJournal,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.sheets_manager = sheets_manager
+        self.journal = journal
+        self.flush_interval = flush_interval
+        self._pending: List[Mutation] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Primeira alteração do lote -> (falhas seguidas, próxima tentativa em time.monotonic)
+        self._failures: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def pending_count(self) -> int:
+        """Quantidade de alterações ainda não gravadas"""
+        return len(self._pending)
+
+    def start(self):
+        """Inicia a gravação em segundo plano"""
+        self._thread = threading.Thread(target=self._run, name='sheets-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Grava as alterações restantes e encerra a thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Erro ao gravar alterações pendentes ao encerrar (mantidas no journal "
+                         f"e reaplicadas ao iniciar): {e}")
+
+    def submit(self, mutation: Mutation):
+        """Aplica a alteração ao cache, registra no journal e agenda a gravação"""
+        with self._lock:
+            self.sheets_manager.apply_local_mutation(mutation)
+            self.journal.append(mutation.to_dict())
+            self._pending.append(mutation)
+
+    def _run(self):
+        """Laço da thread de gravação"""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush(respect_backoff=True)
+            except Exception as e:
+                logger.error(f"Erro ao gravar alterações no Sheets: {e}")
+
+    def _finish(self, mutations: List[Mutation]):
+        """Confirma alterações gravadas (ou anuladas) e libera o cache"""
+        finished = {mutation.id for mutation in mutations}
+        self.journal.ack(list(finished))
+        with self._lock:
+            self._pending = [m for m in self._pending if m.id not in finished]
+        for mutation in mutations:
+            self.sheets_manager.settle_local_mutation(mutation)
+
+    def _discard(self, mutations: List[Mutation], status: int, error: Exception):
+        """Tira da fila alterações que o Sheets recusou de vez, guardando-as no arquivo de descarte
+
+        O cache deixa de mantê-las: a próxima leitura mostra a planilha como está.
+        """
+        logger.error(f"Sheets recusou {len(mutations)} alteração(ões) (HTTP {status}); descartadas "
+                     f"e guardadas em {self.journal.dead_letter_path}: {error}")
+        self.journal.dead_letter([mutation.to_dict() for mutation in mutations], str(error))
+        for mutation in mutations:
+            metrics.SHEETS_WRITE_DEAD_LETTERS.inc(table=mutation.table, op=mutation.op, status=status)
+        self._finish(mutations)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Espera antes da próxima tentativa de um lote que falhou `attempts` vezes"""
+        return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+    def flush(self, respect_backoff: bool = False):
+        """Grava agora as alterações pendentes, em lotes por tipo
+
+        Os lotes são gravados na ordem e o primeiro que falha por
+        indisponibilidade interrompe a gravação (os seguintes podem depender
+        dele); um lote recusado de vez é descartado e a gravação segue com os
+        seguintes. Com `respect_backoff` (thread de gravação), um lote ainda
+        em espera não é tentado e a falha só é registrada no log; sem ele, a
+        gravação é tentada na hora e a falha é propagada.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return
+
+            by_id = {mutation.id: mutation for mutation in batch}
+            self._failures = {head: state for head, state in self._failures.items() if head in by_id}
+            effective, cancelled = coalesce(batch)
+            self._finish([by_id[mutation_id] for mutation_id in cancelled])
+
+            for run in self._runs(effective):
+                covered = [by_id[mutation_id] for _, ids in run for mutation_id in ids]
+                # O lote é identificado pela sua primeira alteração, que a mesclagem preserva
+                head = run[0][0].id
+                attempts, retry_at = self._failures.get(head, (0, 0.0))
+                if respect_backoff and time.monotonic() < retry_at:
+                    return
+                try:
+                    self.sheets_manager.write_mutations([mutation for mutation, _ in run])
+                except Exception as e:
+                    status = self.sheets_manager.write_error_status(e)
+                    if status is not None:
+                        self._failures.pop(head, None)
+                        self._discard(covered, status, e)
+                        continue
+                    attempts += 1
+                    delay = self.retry_delay(attempts)
+                    self._failures[head] = (attempts, time.monotonic() + delay)
+                    if not respect_backoff:
+                        raise
+                    logger.warning(f"Falha ao gravar {len(covered)} alteração(ões) (tentativa "
+                                   f"{attempts}); mantidas no journal, nova tentativa em "
+                                   f"{delay:.0f} s: {e}")
+                    return
+                self._failures.pop(head, None)
+                self._finish(covered)
+
+            logger.info("%d alteração(ões) gravada(s) em %d escrita(s)", len(batch), len(effective),
+                        extra={'event': 'write_behind_flush', 'rows': len(batch), 'sampled': True})
+            if not self.journal.pending():
+                self.journal.compact()
+
+    def _runs(self, effective: List[Tuple[Mutation, List[str]]]) -> List[List[Tuple[Mutation, List[str]]]]:
+        """Agrupa alterações consecutivas gravadas na mesma requisição"""
+        runs = []
+        for item in effective:
+            key = self.sheets_manager.mutation_batch_key(item[0])
+            if runs and runs[-1][0] == key:
+                runs[-1][1].append(item)
+            else:
+                runs.append((key, [item]))
+        return [items for _, items in runs]
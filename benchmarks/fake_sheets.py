@@ -0,0 +1,262 @@
+"""
+Simulação local da API do Google Sheets v4 para benchmarks
+
+Implementa o subconjunto usado pelo GoogleSheetsManager (values().get,
+batchGet, update, batchUpdate, append e spreadsheets().get/batchUpdate com
+addSheet, deleteDimension, insertDimension e updateCells)
+sobre listas em memória, com latência e taxa de erros configuráveis. As
+respostas passam por JSON, como as da API real, para que o custo de
+desserialização entre nas medições.
+"""
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from backend.google_sheets import CHANGE_PROBE_SHEET
+
+_RANGE = re.compile(r"^([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$")
+
+
+def _column_letters(index: int) -> str:
+    """Índice (base 0) -> letras da coluna"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _cell_value(cell: Dict[str, Any]) -> Any:
+    """Valor de uma célula de updateCells ('' se vazia)"""
+    for value in cell.get('userEnteredValue', {}).values():
+        return value
+    return ''
+
+
+def _column_index(letters: str) -> int:
+    """'A' -> 0, 'C' -> 2, 'AA' -> 26"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+class FakeRequest:
+    """Requisição preparada, executada só em `execute()` (como a HttpRequest)"""
+
+    def __init__(self, service: 'FakeSheetsService', method_id: str,
+                 handler: Callable[[], Dict[str, Any]], body: Optional[dict] = None):
+        self.service = service
+        self.methodId = f"sheets.spreadsheets.{method_id}"
+        self.body = json.dumps(body) if body is not None else None
+        self._handler = handler
+
+    def execute(self, http=None, num_retries: int = 0) -> Dict[str, Any]:
+        """Executa com latência simulada, falhando segundo a taxa de erros"""
+        for attempt in range(num_retries + 1):
+            self.service.simulate_latency()
+            if random.random() >= self.service.error_rate:
+                break
+            self.service.stats['errors'] += 1
+            if attempt == num_retries:
+                raise HttpError(httplib2.Response({'status': 503}), b'{"error": "simulated"}')
+            self.service.stats['retries'] += 1
+
+        self.service.stats['calls'] += 1
+        with self.service.lock:
+            result = self._handler()
+        payload = json.dumps(result)
+        self.service.stats['response_bytes'] += len(payload)
+        return json.loads(payload)
+
+
+class FakeSheetsService:
+    """Serviço em memória com uma ou mais planilhas
+
+    `latency` é a latência média (segundos) de cada chamada, com variação
+    uniforme de ±`jitter`; `error_rate` é a fração de chamadas que falham
+    com HTTP 503.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.spreadsheets_data: Dict[str, Dict[str, List[List[Any]]]] = {}
+        # Versão de cada aba, usada na assinatura da aba de mudanças
+        self._versions: Dict[str, int] = {}
+        self.stats = {'calls': 0, 'errors': 0, 'retries': 0, 'response_bytes': 0}
+
+    def simulate_latency(self):
+        """Espera o tempo de uma chamada de rede"""
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def load(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]]):
+        """Define o conteúdo de uma aba (a primeira linha é o cabeçalho)"""
+        self.spreadsheets_data.setdefault(spreadsheet_id, {})[sheet_name] = rows
+        self._touch(spreadsheet_id, sheet_name)
+
+    def spreadsheets(self) -> '_Spreadsheets':
+        return _Spreadsheets(self)
+
+    # ----- operações sobre os dados (executadas sob o lock) -----
+
+    def _touch(self, spreadsheet_id: str, sheet_name: str):
+        key = f"{spreadsheet_id}/{sheet_name}"
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def _sheet(self, spreadsheet_id: str, sheet_name: str) -> List[List[Any]]:
+        sheets = self.spreadsheets_data.setdefault(spreadsheet_id, {})
+        if sheet_name not in sheets:
+            raise HttpError(httplib2.Response({'status': 400}),
+                            f'{{"error": "Unable to parse range: {sheet_name}"}}'.encode())
+        return sheets[sheet_name]
+
+    @staticmethod
+    def _split(range_str: str):
+        """'User!A2:C' -> ('User', linha inicial, linha final, coluna inicial, coluna final)"""
+        sheet_name, _, cells = range_str.partition('!')
+        sheet_name = sheet_name.strip("'")
+        if not cells:
+            return sheet_name, 1, None, 0, None
+        match = _RANGE.match(cells)
+        first_col, first_row, last_col, last_row = match.groups()
+        return (sheet_name, int(first_row or 1), int(last_row) if last_row else None,
+                _column_index(first_col), _column_index(last_col or first_col))
+
+    def _signature(self, spreadsheet_id: str, formula: str) -> str:
+        """Valor de uma fórmula de assinatura: depende só da versão da aba"""
+        sheet_name = re.search(r"'([^']+)'!", formula).group(1)
+        rows = self.spreadsheets_data.get(spreadsheet_id, {}).get(sheet_name, [])
+        return f"{max(len(rows) - 1, 0)}|{self._versions.get(f'{spreadsheet_id}/{sheet_name}', 0)}"
+
+    def _read(self, spreadsheet_id: str, range_str: str) -> Dict[str, Any]:
+        sheet_name, first_row, last_row, first_col, last_col = self._split(range_str)
+        rows = self._sheet(spreadsheet_id, sheet_name)[first_row - 1:last_row]
+        stop = None if last_col is None else last_col + 1
+        values = [row[first_col:stop] for row in rows]
+        if sheet_name == CHANGE_PROBE_SHEET:
+            values = [[self._signature(spreadsheet_id, cell)
+                       if isinstance(cell, str) and cell.startswith('=') else cell
+                       for cell in row] for row in values]
+        while values and not any(cell != '' for cell in values[-1]):
+            values.pop()
+        return {'range': range_str, 'values': values} if values else {'range': range_str}
+
+    def _write(self, spreadsheet_id: str, range_str: str, values: List[List[Any]]) -> int:
+        sheet_name, first_row, _, first_col, _ = self._split(range_str)
+        rows = self._sheet(spreadsheet_id, sheet_name)
+        for offset, new_row in enumerate(values):
+            index = first_row - 1 + offset
+            while len(rows) <= index:
+                rows.append([])
+            row = list(rows[index])
+            row.extend([''] * (first_col + len(new_row) - len(row)))
+            row[first_col:first_col + len(new_row)] = new_row
+            rows[index] = row
+        self._touch(spreadsheet_id, sheet_name)
+        return len(values)
+
+
+class _Values:
+    def __init__(self, service: FakeSheetsService):
+        self.service = service
+
+    def get(self, spreadsheetId, range, **kwargs):
+        return FakeRequest(self.service, 'values.get',
+                           lambda: self.service._read(spreadsheetId, range))
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        return FakeRequest(self.service, 'values.batchGet', lambda: {
+            'valueRanges': [self.service._read(spreadsheetId, r) for r in ranges]
+        })
+
+    def update(self, spreadsheetId, range, body, **kwargs):
+        return FakeRequest(self.service, 'values.update', lambda: {
+            'updatedRows': self.service._write(spreadsheetId, range, body['values'])
+        }, body)
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        return FakeRequest(self.service, 'values.batchUpdate', lambda: {
+            'totalUpdatedRows': sum(self.service._write(spreadsheetId, item['range'], item['values'])
+                                    for item in body['data'])
+        }, body)
+
+    def append(self, spreadsheetId, range, body, **kwargs):
+        def handler():
+            sheet_name = FakeSheetsService._split(range)[0]
+            rows = self.service._sheet(spreadsheetId, sheet_name)
+            while rows and not any(cell != '' for cell in rows[-1]):
+                rows.pop()
+            rows.extend(list(row) for row in body['values'])
+            self.service._touch(spreadsheetId, sheet_name)
+            return {'updates': {'updatedRows': len(body['values'])}}
+        return FakeRequest(self.service, 'values.append', handler, body)
+
+
+class _Spreadsheets:
+    def __init__(self, service: FakeSheetsService):
+        self.service = service
+
+    def values(self) -> _Values:
+        return _Values(self.service)
+
+    def get(self, spreadsheetId, **kwargs):
+        return FakeRequest(self.service, 'get', lambda: {'sheets': [
+            {'properties': {'title': title, 'sheetId': index}}
+            for index, title in enumerate(self.service.spreadsheets_data.get(spreadsheetId, {}))
+        ]})
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def handler():
+            sheets = self.service.spreadsheets_data.setdefault(spreadsheetId, {})
+            titles = list(sheets)
+            for request in body['requests']:
+                if 'addSheet' in request:
+                    sheets[request['addSheet']['properties']['title']] = []
+                elif 'deleteDimension' in request:
+                    dimension = request['deleteDimension']['range']
+                    title = titles[dimension['sheetId']]
+                    del sheets[title][dimension['startIndex']:dimension['endIndex']]
+                    self.service._touch(spreadsheetId, title)
+                elif 'insertDimension' in request:
+                    dimension = request['insertDimension']['range']
+                    title = titles[dimension['sheetId']]
+                    rows = sheets[title]
+                    rows[dimension['startIndex']:dimension['startIndex']] = [
+                        [] for _ in range(dimension['endIndex'] - dimension['startIndex'])]
+                    self.service._touch(spreadsheetId, title)
+                elif 'updateCells' in request:
+                    grid = request['updateCells']['range']
+                    title = titles[grid['sheetId']]
+                    values = [[_cell_value(cell) for cell in row['values']]
+                              for row in request['updateCells']['rows']]
+                    self.service._write(spreadsheetId, f"{title}!{_column_letters(grid['startColumnIndex'])}"
+                                        f"{grid['startRowIndex'] + 1}", values)
+            return {'replies': [{} for _ in body['requests']]}
+        return FakeRequest(self.service, 'batchUpdate', handler, body)
+
+
+def generate_rows(table: str, count: int, seed: int = 0) -> List[List[Any]]:
+    """Cabeçalho e `count` linhas sintéticas de 'User' ou 'Product'"""
+    rng = random.Random(seed)
+    if table == 'User':
+        domains = ['gmail.com', 'hotmail.com', 'empresa.com.br', 'yahoo.com.br']
+        rows = [['Nome', 'CPF', 'Email']]
+        rows.extend([f"Usuário {i}", f"{rng.randrange(10**10, 10**11):011d}",
+                     f"usuario{i}@{rng.choice(domains)}"] for i in range(count))
+        return rows
+    rows = [['Nome', 'Preço', 'Descrição']]
+    rows.extend([f"Produto {i}", round(rng.uniform(1, 5000), 2),
+                 f"Descrição do produto {i} para testes"] for i in range(count))
+    return rows
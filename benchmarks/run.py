@@ -0,0 +1,260 @@
+"""
+Benchmark da API Flask sobre uma simulação local do Google Sheets
+
+Uso (na raiz do projeto):
+    python -m benchmarks.run --rows 100 10000 200000 --latency 0.15 --output resultado.json
+
+Cada tamanho roda em um processo separado, para que o tempo de
+inicialização e a memória sejam medidos a partir do zero. O resultado é
+um JSON com vazão e percentis (p50/p95/p99) por operação.
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+SPREADSHEET_ID = 'benchmark'
+
+# Operações medidas, na ordem de execução
+OPERATIONS = ('list_users', 'list_products', 'list_products_page', 'list_products_cold', 'search_products',
+              'dashboard', 'create_product', 'update_product', 'delete_product', 'bulk_create')
+
+
+class RequestFailed(Exception):
+    """Resposta de erro da API durante o benchmark"""
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Percentil pelo método do posto mais próximo"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _summarize(latencies: List[float], total: float, operations: int, errors: int) -> Dict[str, float]:
+    """Vazão e percentis de latência (em milissegundos)"""
+    ordered = sorted(latencies)
+    return {
+        'samples': len(ordered),
+        'errors': errors,
+        'throughput_per_s': round(operations / total, 2) if total else 0.0,
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        'p50_ms': round(_percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(_percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(_percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def _memory_mb() -> float:
+    """Pico de memória residente do processo (MB), se disponível"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _measure(func: Callable[[int], None], iterations: int, operations_per_call: int = 1) -> Dict[str, float]:
+    """Executa `func(i)` `iterations` vezes medindo cada chamada
+
+    Chamadas que falham (ex.: erros simulados) são contadas à parte e não
+    entram nos percentis.
+    """
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        try:
+            func(i)
+        except RequestFailed:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - call_started)
+    total = time.perf_counter() - started
+    return _summarize(latencies, total, (iterations - errors) * operations_per_call, errors)
+
+
+def run_single(args) -> Dict:
+    """Roda todas as operações para um tamanho de planilha (processo atual)"""
+    from .fake_sheets import FakeSheetsService, generate_rows
+
+    service = FakeSheetsService(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    service.load(SPREADSHEET_ID, 'User', generate_rows('User', args.rows, seed=1))
+    service.load(SPREADSHEET_ID, 'Product', generate_rows('Product', args.rows, seed=2))
+
+    journal_dir = tempfile.mkdtemp(prefix='sheets-bench-')
+    os.environ.update({
+        'GOOGLE_SHEETS_SPREADSHEET_ID': SPREADSHEET_ID,
+        'GOOGLE_SHEETS_JOURNAL_FILE': os.path.join(journal_dir, 'journal.jsonl'),
+        'GOOGLE_SHEETS_SNAPSHOT_FILE': os.path.join(journal_dir, 'snapshot.bin'),
+        'GOOGLE_SHEETS_HISTORY_FILE': os.path.join(journal_dir, 'history.bin'),
+        'GOOGLE_SHEETS_WRITE_BEHIND': '1' if args.write_behind else '0',
+        'GOOGLE_SHEETS_CHANGE_PROBE': '1' if args.change_probe else '0',
+        # As leituras a frio são medidas sem o aquecimento da inicialização
+        'STARTUP_WARMUP': '0',
+    })
+
+    # A autenticação é substituída pelo serviço simulado antes de o app
+    # criar o gerenciador
+    from backend.google_sheets import GoogleSheetsManager
+    GoogleSheetsManager._authenticate = lambda manager: setattr(manager, 'service', service)
+
+    started = time.perf_counter()
+    from backend import app as app_module
+    import_time = time.perf_counter() - started
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    client = app_module.app.test_client()
+    manager = app_module.sheets_manager
+
+    def request(method: str, url: str, **kwargs):
+        response = client.open(url, method=method, **kwargs)
+        if response.status_code >= 400:
+            raise RequestFailed(f"{method} {url}: {response.status_code} {response.get_data(as_text=True)[:200]}")
+        return response
+
+    started = time.perf_counter()
+    request('GET', '/api/products')
+    first_read_time = time.perf_counter() - started
+
+    def search(i):
+        # Mesma consulta feita pela tela de produtos (busca e primeira página)
+        term = f"produto {i * 7 % max(args.rows, 1)}"
+        request('GET', '/api/products', query_string={'q': term, 'offset': 0, 'limit': 200})
+
+    def product(i):
+        return {'name': f"Benchmark {i}", 'price': 10.5 + i, 'description': 'Produto criado pelo benchmark'}
+
+    created_rows: List[int] = []
+
+    def create(i):
+        request('POST', '/api/products', json=product(i))
+        created_rows.append(args.rows + 2 + len(created_rows))
+
+    def update(i):
+        request('PUT', f"/api/products/{2 + i * 7 % max(args.rows, 1)}", json=product(i))
+
+    def delete(i):
+        # Remove de baixo para cima, para não deslocar as próximas linhas
+        if created_rows:
+            request('DELETE', f"/api/products/{created_rows.pop()}")
+
+    def bulk(i):
+        for j in range(args.bulk_size):
+            request('POST', '/api/products', json=product(i * args.bulk_size + j))
+
+    def cold(i):
+        manager.cache.invalidate()
+        request('GET', '/api/products')
+
+    operations = {
+        'list_users': lambda i: request('GET', '/api/users'),
+        'list_products': lambda i: request('GET', '/api/products'),
+        'list_products_page': lambda i: request('GET', '/api/products',
+                                                query_string={'offset': 0, 'limit': 200}),
+        'list_products_cold': cold,
+        'search_products': search,
+        'dashboard': lambda i: request('GET', '/api/dashboard'),
+        'create_product': create,
+        'update_product': update,
+        'delete_product': delete,
+    }
+
+    results = {}
+    for name in OPERATIONS:
+        if name == 'bulk_create':
+            results[name] = _measure(bulk, max(1, args.iterations // args.bulk_size), args.bulk_size)
+        else:
+            results[name] = _measure(operations[name], args.iterations)
+
+    if manager.write_behind is not None:
+        started = time.perf_counter()
+        manager.write_behind.flush()
+        results['write_behind_final_flush_ms'] = round((time.perf_counter() - started) * 1000, 3)
+
+    return {
+        'rows': args.rows,
+        'startup': {
+            'import_ms': round(import_time * 1000, 3),
+            'first_read_ms': round(first_read_time * 1000, 3),
+        },
+        'operations': results,
+        'sheets_api': dict(service.stats),
+        'peak_rss_mb': _memory_mb(),
+    }
+
+
+def main():
+    """Executa o benchmark para cada tamanho e grava o JSON consolidado"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 10_000, 200_000],
+                        help='linhas por tabela (um processo por valor)')
+    parser.add_argument('--iterations', type=int, default=30, help='repetições por operação')
+    parser.add_argument('--bulk-size', type=int, default=10, help='inclusões por lote em bulk_create')
+    parser.add_argument('--latency', type=float, default=0.0, help='latência simulada por chamada (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='variação da latência (± s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fração de chamadas com HTTP 503')
+    parser.add_argument('--write-behind', action='store_true', help='ativa a gravação assíncrona')
+    parser.add_argument('--no-change-probe', dest='change_probe', action='store_false',
+                        help='desativa a aba de detecção de mudanças')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--verbose', action='store_true', help='mantém os logs do app')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        args.rows = args.rows[0]
+        json.dump(run_single(args), sys.stdout)
+        return
+
+    runs = []
+    for rows in args.rows:
+        command = [
+            sys.executable, '-m', 'benchmarks.run', '--single', '--rows', str(rows),
+            '--iterations', str(args.iterations), '--bulk-size', str(args.bulk_size),
+            '--latency', str(args.latency), '--jitter', str(args.jitter),
+            '--error-rate', str(args.error_rate),
+        ]
+        if args.write_behind:
+            command.append('--write-behind')
+        if not args.change_probe:
+            command.append('--no-change-probe')
+        print(f"Executando benchmark com {rows} linhas...", file=sys.stderr)
+        output = subprocess.run(command, check=True, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        runs.append(json.loads(output.stdout))
+
+    report = {
+        'config': {
+            'iterations': args.iterations,
+            'bulk_size': args.bulk_size,
+            'latency_s': args.latency,
+            'jitter_s': args.jitter,
+            'error_rate': args.error_rate,
+            'write_behind': args.write_behind,
+            'change_probe': args.change_probe,
+        },
+        'runs': runs,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(text)
+        print(f"Resultado gravado em {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
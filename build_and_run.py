@@ -122,6 +122,12 @@ def build_react():
     print("🏗️ Fazendo build do React...")
     return run_command("npm run build", cwd="frontend")
 
+def compress_build():
+    """Gera as variantes brotli/gzip dos arquivos do build"""
+    print("🗜️ Comprimindo arquivos do build...")
+    python_cmd = get_python_executable()
+    return run_command(f"{python_cmd} -m backend.static_assets frontend/build")
+
 def run_application():
     """Executa a aplicação usando o ambiente virtual"""
     print("🚀 Iniciando aplicação...")
@@ -172,6 +178,10 @@ def main():
         print("❌ Build do React não foi criado")
         return 1
     
+    # Pré-comprime o build (sem as variantes, os arquivos são servidos sem compressão)
+    if not compress_build():
+        print("⚠️ Falha ao comprimir o build; os arquivos serão servidos sem compressão")
+    
     print("✅ Build concluído com sucesso!")
     print("\n" + "="*50)
     print("🎯 CONFIGURAÇÃO COMPLETA!")
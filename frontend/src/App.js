@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, lazy, Suspense } from "react";
 import {
   BrowserRouter as Router,
   Routes,
@@ -9,12 +9,26 @@ import {
 import { ToastContainer, toast } from "react-toastify";
 import "react-toastify/dist/ReactToastify.css";
 import { Users, Package, Home, Settings } from "lucide-react";
-import UserManagement from "./components/UserManagement";
-import ProductManagement from "./components/ProductManagement";
-import Dashboard from "./components/Dashboard";
-import SettingsPage from "./components/SettingsPage";
 import "./App.css";
 
+// Cada página vira um chunk separado, carregado ao ser visitada
+const Dashboard = lazy(() => import("./components/Dashboard"));
+const UserManagement = lazy(() => import("./components/UserManagement"));
+const ProductManagement = lazy(() => import("./components/ProductManagement"));
+const SettingsPage = lazy(() => import("./components/SettingsPage"));
+
+// Intervalo (ms) entre as consultas ao aquecimento do servidor
+const WARMUP_POLL_INTERVAL = 500;
+
+function PageLoading() {
+  return (
+    <div className="loading">
+      <div className="spinner"></div>
+      <span>Carregando...</span>
+    </div>
+  );
+}
+
 function Navigation() {
   const location = useLocation();
 
@@ -55,6 +69,8 @@ function Navigation() {
 function App() {
   const [isOnline, setIsOnline] = useState(navigator.onLine);
   const [apiStatus, setApiStatus] = useState("checking");
+  // Progresso do aquecimento do servidor ({ done, total }); null quando pronto
+  const [warmup, setWarmup] = useState(null);
 
   useEffect(() => {
     // Verifica status da API
@@ -92,6 +108,33 @@ function App() {
     };
   }, []);
 
+  useEffect(() => {
+    // Acompanha o aquecimento do servidor até os dados estarem em memória
+    let timer;
+    const checkReady = async () => {
+      try {
+        const response = await fetch("/api/ready");
+        const data = await response.json();
+        if (data.ready) {
+          setWarmup(null);
+          return;
+        }
+        setWarmup({
+          done: data.tasks.filter(
+            task => !["pending", "running"].includes(task.status)
+          ).length,
+          total: data.tasks.length,
+        });
+      } catch (error) {
+        // Servidor ainda subindo: tenta de novo
+      }
+      timer = setTimeout(checkReady, WARMUP_POLL_INTERVAL);
+    };
+
+    checkReady();
+    return () => clearTimeout(timer);
+  }, []);
+
   const getStatusMessage = () => {
     if (!isOnline) {
       return { type: "error", message: "Sem conexão com a internet" };
@@ -99,6 +142,12 @@ function App() {
 
     switch (apiStatus) {
       case "connected":
+        if (warmup) {
+          return {
+            type: "info",
+            message: `Preparando dados (${warmup.done}/${warmup.total})...`,
+          };
+        }
         return { type: "success", message: "Conectado ao Google Sheets" };
       case "disconnected":
         return {
@@ -128,12 +177,14 @@ function App() {
           </div>
 
           <div className="container">
-            <Routes>
-              <Route path="/" element={<Dashboard />} />
-              <Route path="/users" element={<UserManagement />} />
-              <Route path="/products" element={<ProductManagement />} />
-              <Route path="/settings" element={<SettingsPage />} />
-            </Routes>
+            <Suspense fallback={<PageLoading />}>
+              <Routes>
+                <Route path="/" element={<Dashboard />} />
+                <Route path="/users" element={<UserManagement />} />
+                <Route path="/products" element={<ProductManagement />} />
+                <Route path="/settings" element={<SettingsPage />} />
+              </Routes>
+            </Suspense>
           </div>
         </main>
 
@@ -1,51 +1,42 @@
 import React, { useState, useEffect } from "react";
 import { Users, Package, TrendingUp, Activity } from "lucide-react";
 import { Link } from "react-router-dom";
-import api from "../services/api";
+import { dashboardResource, subscribe } from "../services/cache";
 
 function Dashboard() {
-  const [stats, setStats] = useState({
-    users: 0,
-    products: 0,
-    loading: true,
-  });
-
-  const [recentUsers, setRecentUsers] = useState([]);
-  const [recentProducts, setRecentProducts] = useState([]);
+  // Dados em cache aparecem na hora; a revalidação ocorre em segundo plano
+  const [data, setData] = useState(() => dashboardResource.peek());
+  const [failed, setFailed] = useState(false);
 
   useEffect(() => {
-    loadDashboardData();
-  }, []);
+    const loadDashboardData = () =>
+      dashboardResource.load().catch(error => {
+        console.error("Erro ao carregar dados do dashboard:", error);
+        setFailed(true);
+      });
 
-  const loadDashboardData = async () => {
-    try {
-      setStats(prev => ({ ...prev, loading: true }));
+    if (dashboardResource.isStale()) loadDashboardData();
 
-      // Carrega dados em paralelo
-      const [usersResponse, productsResponse] = await Promise.all([
-        api.get("/users"),
-        api.get("/products"),
-      ]);
+    return subscribe(() => {
+      setData(dashboardResource.peek());
+      if (dashboardResource.isStale()) loadDashboardData();
+    });
+  }, []);
 
-      const users = usersResponse.data.data || [];
-      const products = productsResponse.data.data || [];
+  const users = data?.users || [];
+  const products = data?.products || [];
 
-      setStats({
-        users: users.length,
-        products: products.length,
-        loading: false,
-      });
+  const stats = {
+    users: users.length,
+    products: products.length,
+    loading: !data && !failed,
+  };
 
-      // Usuários mais recentes (últimos 5)
-      setRecentUsers(users.slice(-5).reverse());
+  // Usuários mais recentes (últimos 5)
+  const recentUsers = users.slice(-5).reverse();
 
-      // Produtos mais recentes (últimos 5)
-      setRecentProducts(products.slice(-5).reverse());
-    } catch (error) {
-      console.error("Erro ao carregar dados do dashboard:", error);
-      setStats(prev => ({ ...prev, loading: false }));
-    }
-  };
+  // Produtos mais recentes (últimos 5)
+  const recentProducts = products.slice(-5).reverse();
 
   const formatCurrency = value => {
     return new Intl.NumberFormat("pt-BR", {
@@ -0,0 +1,151 @@
+import React, { useState, useEffect, useCallback } from "react";
+import { History, Undo2, Redo2 } from "lucide-react";
+import { toast } from "react-toastify";
+import { historyService } from "../services/api";
+import { invalidateAll } from "../services/cache";
+
+const OPERATION_LABELS = {
+  append: "Inclusão",
+  update: "Alteração",
+  delete: "Remoção",
+};
+
+// Primeira coluna da linha (nome do registro) antes ou depois da alteração
+const describe = entry => (entry.after || entry.before || [])[0] || "";
+
+// Valor para o campo datetime-local (horário local, sem segundos)
+const localDateTime = date =>
+  new Date(date.getTime() - date.getTimezoneOffset() * 60000)
+    .toISOString()
+    .slice(0, 16);
+
+function HistoryPanel() {
+  const [history, setHistory] = useState(null);
+  const [busy, setBusy] = useState(false);
+  const [restoreAt, setRestoreAt] = useState(() => localDateTime(new Date()));
+
+  const load = useCallback(async () => {
+    try {
+      const response = await historyService.list();
+      setHistory(response.data.data);
+    } catch (error) {
+      // Histórico desativado ou indisponível: o painel não é exibido
+      setHistory(null);
+    }
+  }, []);
+
+  useEffect(() => {
+    load();
+  }, [load]);
+
+  const run = async request => {
+    try {
+      setBusy(true);
+      const response = await request();
+      toast.success(response.data.message);
+      // As listagens em cache no cliente não refletem mais a planilha
+      invalidateAll();
+    } catch (error) {
+      toast.error(error.message);
+    } finally {
+      setBusy(false);
+      load();
+    }
+  };
+
+  if (!history) return null;
+
+  return (
+    <div className="content-section">
+      <div className="section-header">
+        <h2 className="section-title">
+          <History size={20} style={{ marginRight: "0.5rem" }} />
+          Histórico de Alterações
+        </h2>
+        <div style={{ display: "flex", gap: "0.5rem" }}>
+          <button
+            onClick={() => run(() => historyService.undo())}
+            className="btn btn-secondary btn-sm"
+            disabled={busy || !history.can_undo}
+          >
+            <Undo2 size={16} />
+            Desfazer
+          </button>
+          <button
+            onClick={() => run(() => historyService.redo())}
+            className="btn btn-secondary btn-sm"
+            disabled={busy || !history.can_redo}
+          >
+            <Redo2 size={16} />
+            Refazer
+          </button>
+        </div>
+      </div>
+      <div className="section-content">
+        <div
+          style={{
+            display: "flex",
+            alignItems: "center",
+            gap: "0.5rem",
+            marginBottom: "1rem",
+          }}
+        >
+          <span style={{ fontSize: "0.875rem", color: "#6b7280" }}>
+            Voltar os dados para:
+          </span>
+          <input
+            type="datetime-local"
+            className="form-input"
+            style={{ width: "auto" }}
+            value={restoreAt}
+            onChange={event => setRestoreAt(event.target.value)}
+          />
+          <button
+            onClick={() =>
+              run(() =>
+                historyService.restore(new Date(restoreAt).toISOString())
+              )
+            }
+            className="btn btn-secondary btn-sm"
+            disabled={busy || !restoreAt || !history.can_undo}
+          >
+            Restaurar
+          </button>
+        </div>
+        {history.entries.length === 0 ? (
+          <div style={{ fontSize: "0.875rem", color: "#6b7280" }}>
+            Nenhuma alteração registrada.
+          </div>
+        ) : (
+          <div style={{ display: "grid", gap: "0.5rem" }}>
+            {history.entries.map(entry => (
+              <div
+                key={entry.seq}
+                style={{
+                  display: "flex",
+                  justifyContent: "space-between",
+                  padding: "0.5rem 0.75rem",
+                  border: "1px solid #e5e7eb",
+                  borderRadius: "0.5rem",
+                  fontSize: "0.875rem",
+                  opacity: entry.undone ? 0.5 : 1,
+                  textDecoration: entry.undone ? "line-through" : "none",
+                }}
+              >
+                <span>
+                  {OPERATION_LABELS[entry.op]} em {entry.table}:{" "}
+                  {describe(entry)}
+                </span>
+                <span style={{ color: "#6b7280" }}>
+                  {new Date(entry.ts * 1000).toLocaleString("pt-BR")}
+                </span>
+              </div>
+            ))}
+          </div>
+        )}
+      </div>
+    </div>
+  );
+}
+
+export default HistoryPanel;
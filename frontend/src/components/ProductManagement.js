@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState } from "react";
 import {
   Plus,
   Edit,
@@ -9,32 +9,36 @@ import {
   FileText,
 } from "lucide-react";
 import { toast } from "react-toastify";
-import { productService } from "../services/api";
+import { productsResource } from "../services/cache";
 import ProductModal from "./ProductModal";
+import VirtualTable from "./VirtualTable";
+import usePagedList from "../hooks/usePagedList";
+import useDebouncedValue from "../hooks/useDebouncedValue";
+
+// Campos considerados pela busca
+const SEARCH_FIELDS = ["name", "description"];
 
 function ProductManagement() {
-  const [products, setProducts] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState("");
   const [showModal, setShowModal] = useState(false);
   const [editingProduct, setEditingProduct] = useState(null);
 
-  useEffect(() => {
-    loadProducts();
-  }, []);
+  // A busca só é feita depois de uma pausa na digitação
+  const debouncedSearch = useDebouncedValue(searchTerm.trim());
 
-  const loadProducts = async () => {
-    try {
-      setLoading(true);
-      const response = await productService.getAll();
-      setProducts(response.data.data || []);
-    } catch (error) {
-      console.error("Erro ao carregar produtos:", error);
-      toast.error(error.message || "Erro ao carregar produtos");
-    } finally {
-      setLoading(false);
-    }
-  };
+  // Busca (local ou no backend) e carrega páginas conforme a rolagem
+  const {
+    items: products,
+    loading,
+    loadingMore,
+    hasMore,
+    loadMore,
+  } = usePagedList(
+    productsResource,
+    debouncedSearch,
+    "Erro ao carregar produtos",
+    SEARCH_FIELDS
+  );
 
   const handleCreateProduct = () => {
     setEditingProduct(null);
@@ -56,9 +60,8 @@ function ProductManagement() {
     }
 
     try {
-      await productService.delete(product.row_index);
+      await productsResource.remove(product.row_index);
       toast.success("Produto removido com sucesso");
-      loadProducts();
     } catch (error) {
       console.error("Erro ao remover produto:", error);
       toast.error(error.message || "Erro ao remover produto");
@@ -73,14 +76,13 @@ function ProductManagement() {
   const handleModalSave = async productData => {
     try {
       if (editingProduct) {
-        await productService.update(editingProduct.row_index, productData);
+        await productsResource.update(editingProduct.row_index, productData);
         toast.success("Produto atualizado com sucesso");
       } else {
-        await productService.create(productData);
+        await productsResource.create(productData);
         toast.success("Produto criado com sucesso");
       }
 
-      loadProducts();
       handleModalClose();
     } catch (error) {
       console.error("Erro ao salvar produto:", error);
@@ -88,12 +90,6 @@ function ProductManagement() {
     }
   };
 
-  const filteredProducts = products.filter(
-    product =>
-      product.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      product.description.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   const formatCurrency = value => {
     return new Intl.NumberFormat("pt-BR", {
       style: "currency",
@@ -151,7 +147,7 @@ function ProductManagement() {
               <div className="spinner"></div>
               <span>Carregando produtos...</span>
             </div>
-          ) : filteredProducts.length === 0 ? (
+          ) : products.length === 0 ? (
             <div
               style={{ textAlign: "center", padding: "3rem", color: "#6b7280" }}
             >
@@ -171,110 +167,107 @@ function ProductManagement() {
               </p>
             </div>
           ) : (
-            <div className="table-container" style={{ overflowX: "auto" }}>
-              <table className="table">
-                <thead>
-                  <tr>
-                    <th>Produto</th>
-                    <th>Descrição</th>
-                    <th>Preço</th>
-                    <th style={{ width: "120px" }}>Ações</th>
-                  </tr>
-                </thead>
-                <tbody>
-                  {filteredProducts.map((product, index) => (
-                    <tr key={index}>
-                      <td>
-                        <div
-                          style={{
-                            display: "flex",
-                            alignItems: "center",
-                            gap: "0.75rem",
-                          }}
-                        >
-                          <div
-                            style={{
-                              width: "40px",
-                              height: "40px",
-                              borderRadius: "0.5rem",
-                              backgroundColor: "#10b981",
-                              display: "flex",
-                              alignItems: "center",
-                              justifyContent: "center",
-                              color: "white",
-                              fontWeight: "600",
-                              fontSize: "0.875rem",
-                            }}
-                          >
-                            <Package size={20} />
-                          </div>
-                          <div>
-                            <div
-                              style={{ fontWeight: "500", color: "#111827" }}
-                            >
-                              {product.name}
-                            </div>
-                          </div>
-                        </div>
-                      </td>
-                      <td>
-                        <div
-                          style={{
-                            display: "flex",
-                            alignItems: "center",
-                            gap: "0.5rem",
-                          }}
-                        >
-                          <FileText size={16} style={{ color: "#6b7280" }} />
-                          <span
-                            style={{
-                              maxWidth: "200px",
-                              overflow: "hidden",
-                              textOverflow: "ellipsis",
-                              whiteSpace: "nowrap",
-                            }}
-                          >
-                            {product.description}
-                          </span>
+            <VirtualTable
+              columns={[
+                { key: "name", label: "Produto" },
+                { key: "description", label: "Descrição" },
+                { key: "price", label: "Preço" },
+                { key: "actions", label: "Ações", style: { width: "120px" } },
+              ]}
+              items={products}
+              rowKey={product => product.row_index}
+              hasMore={hasMore}
+              loadingMore={loadingMore}
+              onEndReached={loadMore}
+              renderRow={product => (
+                <>
+                  <td>
+                    <div
+                      style={{
+                        display: "flex",
+                        alignItems: "center",
+                        gap: "0.75rem",
+                      }}
+                    >
+                      <div
+                        style={{
+                          width: "40px",
+                          height: "40px",
+                          borderRadius: "0.5rem",
+                          backgroundColor: "#10b981",
+                          display: "flex",
+                          alignItems: "center",
+                          justifyContent: "center",
+                          color: "white",
+                          fontWeight: "600",
+                          fontSize: "0.875rem",
+                        }}
+                      >
+                        <Package size={20} />
+                      </div>
+                      <div>
+                        <div style={{ fontWeight: "500", color: "#111827" }}>
+                          {product.name}
                         </div>
-                      </td>
-                      <td>
-                        <div
-                          style={{
-                            display: "flex",
-                            alignItems: "center",
-                            gap: "0.5rem",
-                          }}
-                        >
-                          <DollarSign size={16} style={{ color: "#10b981" }} />
-                          <span style={{ fontWeight: "600", color: "#10b981" }}>
-                            {formatCurrency(product.price)}
-                          </span>
-                        </div>
-                      </td>
-                      <td>
-                        <div style={{ display: "flex", gap: "0.5rem" }}>
-                          <button
-                            onClick={() => handleEditProduct(product)}
-                            className="btn btn-secondary btn-sm"
-                            title="Editar produto"
-                          >
-                            <Edit size={16} />
-                          </button>
-                          <button
-                            onClick={() => handleDeleteProduct(product)}
-                            className="btn btn-danger btn-sm"
-                            title="Remover produto"
-                          >
-                            <Trash2 size={16} />
-                          </button>
-                        </div>
-                      </td>
-                    </tr>
-                  ))}
-                </tbody>
-              </table>
-            </div>
+                      </div>
+                    </div>
+                  </td>
+                  <td>
+                    <div
+                      style={{
+                        display: "flex",
+                        alignItems: "center",
+                        gap: "0.5rem",
+                      }}
+                    >
+                      <FileText size={16} style={{ color: "#6b7280" }} />
+                      <span
+                        style={{
+                          maxWidth: "200px",
+                          overflow: "hidden",
+                          textOverflow: "ellipsis",
+                          whiteSpace: "nowrap",
+                        }}
+                      >
+                        {product.description}
+                      </span>
+                    </div>
+                  </td>
+                  <td>
+                    <div
+                      style={{
+                        display: "flex",
+                        alignItems: "center",
+                        gap: "0.5rem",
+                      }}
+                    >
+                      <DollarSign size={16} style={{ color: "#10b981" }} />
+                      <span style={{ fontWeight: "600", color: "#10b981" }}>
+                        {formatCurrency(product.price)}
+                      </span>
+                    </div>
+                  </td>
+                  <td>
+                    <div style={{ display: "flex", gap: "0.5rem" }}>
+                      <button
+                        onClick={() => handleEditProduct(product)}
+                        className="btn btn-secondary btn-sm"
+                        title="Editar produto"
+                      >
+                        <Edit size={16} />
+                      </button>
+                      <button
+                        onClick={() => handleDeleteProduct(product)}
+                        className="btn btn-danger btn-sm"
+                        title="Remover produto"
+                      >
+                        <Trash2 size={16} />
+                      </button>
+                    </div>
+                  </td>
+                </>
+              )}
+            />
           )}
         </div>
       </div>
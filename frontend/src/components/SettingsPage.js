@@ -10,6 +10,7 @@ import {
 } from "lucide-react";
 import { toast } from "react-toastify";
 import { systemService } from "../services/api";
+import HistoryPanel from "./HistoryPanel";
 
 function SettingsPage() {
   const [apiStatus, setApiStatus] = useState("checking");
@@ -196,6 +197,9 @@ function SettingsPage() {
         </div>
       </div>
 
+      {/* Histórico de alterações (desfazer, refazer e restaurar) */}
+      <HistoryPanel />
+
       {/* Informações do Sistema */}
       <div className="content-section">
         <div className="section-header">
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState } from "react";
 import {
   Plus,
   Edit,
@@ -9,32 +9,36 @@ import {
   CreditCard,
 } from "lucide-react";
 import { toast } from "react-toastify";
-import { userService } from "../services/api";
+import { usersResource } from "../services/cache";
 import UserModal from "./UserModal";
+import VirtualTable from "./VirtualTable";
+import usePagedList from "../hooks/usePagedList";
+import useDebouncedValue from "../hooks/useDebouncedValue";
+
+// Campos considerados pela busca
+const SEARCH_FIELDS = ["name", "email", "cpf"];
 
 function UserManagement() {
-  const [users, setUsers] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState("");
   const [showModal, setShowModal] = useState(false);
   const [editingUser, setEditingUser] = useState(null);
 
-  useEffect(() => {
-    loadUsers();
-  }, []);
+  // A busca só é feita depois de uma pausa na digitação
+  const debouncedSearch = useDebouncedValue(searchTerm.trim());
 
-  const loadUsers = async () => {
-    try {
-      setLoading(true);
-      const response = await userService.getAll();
-      setUsers(response.data.data || []);
-    } catch (error) {
-      console.error("Erro ao carregar usuários:", error);
-      toast.error(error.message || "Erro ao carregar usuários");
-    } finally {
-      setLoading(false);
-    }
-  };
+  // Busca (local ou no backend) e carrega páginas conforme a rolagem
+  const {
+    items: users,
+    loading,
+    loadingMore,
+    hasMore,
+    loadMore,
+  } = usePagedList(
+    usersResource,
+    debouncedSearch,
+    "Erro ao carregar usuários",
+    SEARCH_FIELDS
+  );
 
   const handleCreateUser = () => {
     setEditingUser(null);
@@ -56,9 +60,8 @@ function UserManagement() {
     }
 
     try {
-      await userService.delete(user.row_index);
+      await usersResource.remove(user.row_index);
       toast.success("Usuário removido com sucesso");
-      loadUsers();
     } catch (error) {
       console.error("Erro ao remover usuário:", error);
       toast.error(error.message || "Erro ao remover usuário");
@@ -73,14 +76,13 @@ function UserManagement() {
   const handleModalSave = async userData => {
     try {
       if (editingUser) {
-        await userService.update(editingUser.row_index, userData);
+        await usersResource.update(editingUser.row_index, userData);
         toast.success("Usuário atualizado com sucesso");
       } else {
-        await userService.create(userData);
+        await usersResource.create(userData);
         toast.success("Usuário criado com sucesso");
       }
 
-      loadUsers();
       handleModalClose();
     } catch (error) {
       console.error("Erro ao salvar usuário:", error);
@@ -88,13 +90,6 @@ function UserManagement() {
     }
   };
 
-  const filteredUsers = users.filter(
-    user =>
-      user.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      user.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      user.cpf.includes(searchTerm)
-  );
-
   const formatCPF = cpf => {
     return cpf.replace(/(\d{3})(\d{3})(\d{3})(\d{2})/, "$1.$2.$3-$4");
   };
@@ -149,7 +144,7 @@ function UserManagement() {
               <div className="spinner"></div>
               <span>Carregando usuários...</span>
             </div>
-          ) : filteredUsers.length === 0 ? (
+          ) : users.length === 0 ? (
             <div
               style={{ textAlign: "center", padding: "3rem", color: "#6b7280" }}
             >
@@ -166,99 +161,96 @@ function UserManagement() {
               </p>
             </div>
           ) : (
-            <div className="table-container" style={{ overflowX: "auto" }}>
-              <table className="table">
-                <thead>
-                  <tr>
-                    <th>Nome</th>
-                    <th>Email</th>
-                    <th>CPF</th>
-                    <th style={{ width: "120px" }}>Ações</th>
-                  </tr>
-                </thead>
-                <tbody>
-                  {filteredUsers.map((user, index) => (
-                    <tr key={index}>
-                      <td>
-                        <div
-                          style={{
-                            display: "flex",
-                            alignItems: "center",
-                            gap: "0.75rem",
-                          }}
-                        >
-                          <div
-                            style={{
-                              width: "40px",
-                              height: "40px",
-                              borderRadius: "50%",
-                              backgroundColor: "#3b82f6",
-                              display: "flex",
-                              alignItems: "center",
-                              justifyContent: "center",
-                              color: "white",
-                              fontWeight: "600",
-                              fontSize: "0.875rem",
-                            }}
-                          >
-                            {user.name.charAt(0).toUpperCase()}
-                          </div>
-                          <div>
-                            <div
-                              style={{ fontWeight: "500", color: "#111827" }}
-                            >
-                              {user.name}
-                            </div>
-                          </div>
-                        </div>
-                      </td>
-                      <td>
-                        <div
-                          style={{
-                            display: "flex",
-                            alignItems: "center",
-                            gap: "0.5rem",
-                          }}
-                        >
-                          <Mail size={16} style={{ color: "#6b7280" }} />
-                          <span>{user.email}</span>
+            <VirtualTable
+              columns={[
+                { key: "name", label: "Nome" },
+                { key: "email", label: "Email" },
+                { key: "cpf", label: "CPF" },
+                { key: "actions", label: "Ações", style: { width: "120px" } },
+              ]}
+              items={users}
+              rowKey={user => user.row_index}
+              hasMore={hasMore}
+              loadingMore={loadingMore}
+              onEndReached={loadMore}
+              renderRow={user => (
+                <>
+                  <td>
+                    <div
+                      style={{
+                        display: "flex",
+                        alignItems: "center",
+                        gap: "0.75rem",
+                      }}
+                    >
+                      <div
+                        style={{
+                          width: "40px",
+                          height: "40px",
+                          borderRadius: "50%",
+                          backgroundColor: "#3b82f6",
+                          display: "flex",
+                          alignItems: "center",
+                          justifyContent: "center",
+                          color: "white",
+                          fontWeight: "600",
+                          fontSize: "0.875rem",
+                        }}
+                      >
+                        {user.name.charAt(0).toUpperCase()}
+                      </div>
+                      <div>
+                        <div style={{ fontWeight: "500", color: "#111827" }}>
+                          {user.name}
                         </div>
-                      </td>
-                      <td>
-                        <div
-                          style={{
-                            display: "flex",
-                            alignItems: "center",
-                            gap: "0.5rem",
-                          }}
-                        >
-                          <CreditCard size={16} style={{ color: "#6b7280" }} />
-                          <span>{formatCPF(user.cpf)}</span>
-                        </div>
-                      </td>
-                      <td>
-                        <div style={{ display: "flex", gap: "0.5rem" }}>
-                          <button
-                            onClick={() => handleEditUser(user)}
-                            className="btn btn-secondary btn-sm"
-                            title="Editar usuário"
-                          >
-                            <Edit size={16} />
-                          </button>
-                          <button
-                            onClick={() => handleDeleteUser(user)}
-                            className="btn btn-danger btn-sm"
-                            title="Remover usuário"
-                          >
-                            <Trash2 size={16} />
-                          </button>
-                        </div>
-                      </td>
-                    </tr>
-                  ))}
-                </tbody>
-              </table>
-            </div>
+                      </div>
+                    </div>
+                  </td>
+                  <td>
+                    <div
+                      style={{
+                        display: "flex",
+                        alignItems: "center",
+                        gap: "0.5rem",
+                      }}
+                    >
+                      <Mail size={16} style={{ color: "#6b7280" }} />
+                      <span>{user.email}</span>
+                    </div>
+                  </td>
+                  <td>
+                    <div
+                      style={{
+                        display: "flex",
+                        alignItems: "center",
+                        gap: "0.5rem",
+                      }}
+                    >
+                      <CreditCard size={16} style={{ color: "#6b7280" }} />
+                      <span>{formatCPF(user.cpf)}</span>
+                    </div>
+                  </td>
+                  <td>
+                    <div style={{ display: "flex", gap: "0.5rem" }}>
+                      <button
+                        onClick={() => handleEditUser(user)}
+                        className="btn btn-secondary btn-sm"
+                        title="Editar usuário"
+                      >
+                        <Edit size={16} />
+                      </button>
+                      <button
+                        onClick={() => handleDeleteUser(user)}
+                        className="btn btn-danger btn-sm"
+                        title="Remover usuário"
+                      >
+                        <Trash2 size={16} />
+                      </button>
+                    </div>
+                  </td>
+                </>
+              )}
+            />
           )}
         </div>
       </div>
@@ -0,0 +1,116 @@
+import React, { useEffect, useRef, useState } from "react";
+
+// Linhas extras montadas acima e abaixo da área visível
+const OVERSCAN = 8;
+
+// Tabela virtualizada: só as linhas visíveis (mais a margem OVERSCAN) ficam
+// no DOM; o restante é representado por linhas espaçadoras com a altura
+// equivalente. Todas as linhas têm a mesma altura (rowHeight).
+function VirtualTable({
+  columns,
+  items,
+  rowKey,
+  renderRow,
+  rowHeight = 65,
+  height = "calc(100vh - 280px)",
+  hasMore = false,
+  loadingMore = false,
+  onEndReached,
+}) {
+  const containerRef = useRef(null);
+  const frameRef = useRef(null);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [viewportHeight, setViewportHeight] = useState(window.innerHeight);
+
+  useEffect(() => {
+    const container = containerRef.current;
+    if (!container) return undefined;
+
+    const updateViewport = () => setViewportHeight(container.clientHeight);
+    updateViewport();
+    window.addEventListener("resize", updateViewport);
+    return () => {
+      window.removeEventListener("resize", updateViewport);
+      if (frameRef.current) cancelAnimationFrame(frameRef.current);
+    };
+  }, []);
+
+  // Atualiza a posição no máximo uma vez por quadro
+  const handleScroll = event => {
+    const { scrollTop: position } = event.currentTarget;
+    if (frameRef.current) return;
+    frameRef.current = requestAnimationFrame(() => {
+      frameRef.current = null;
+      setScrollTop(position);
+    });
+  };
+
+  const start = Math.max(0, Math.floor(scrollTop / rowHeight) - OVERSCAN);
+  const end = Math.min(
+    items.length,
+    Math.ceil((scrollTop + viewportHeight) / rowHeight) + OVERSCAN
+  );
+
+  // Pede a próxima página quando a área visível se aproxima do fim
+  useEffect(() => {
+    const nearEnd = end >= items.length - OVERSCAN;
+    if (hasMore && !loadingMore && onEndReached && nearEnd) {
+      onEndReached();
+    }
+  }, [end, items.length, hasMore, loadingMore, onEndReached]);
+
+  const spacerCell = { padding: 0, border: 0 };
+
+  return (
+    <div
+      ref={containerRef}
+      className="table-container virtual-table"
+      style={{ height, overflow: "auto" }}
+      onScroll={handleScroll}
+    >
+      <table className="table">
+        <thead>
+          <tr>
+            {columns.map(column => (
+              <th key={column.key} style={column.style}>
+                {column.label}
+              </th>
+            ))}
+          </tr>
+        </thead>
+        <tbody>
+          {start > 0 && (
+            <tr aria-hidden="true" style={{ height: start * rowHeight }}>
+              <td colSpan={columns.length} style={spacerCell} />
+            </tr>
+          )}
+          {items.slice(start, end).map((item, offset) => (
+            <tr key={rowKey(item)} style={{ height: rowHeight }}>
+              {renderRow(item, start + offset)}
+            </tr>
+          ))}
+          {end < items.length && (
+            <tr
+              aria-hidden="true"
+              style={{ height: (items.length - end) * rowHeight }}
+            >
+              <td colSpan={columns.length} style={spacerCell} />
+            </tr>
+          )}
+          {loadingMore && (
+            <tr>
+              <td
+                colSpan={columns.length}
+                style={{ textAlign: "center", color: "#6b7280" }}
+              >
+                Carregando mais...
+              </td>
+            </tr>
+          )}
+        </tbody>
+      </table>
+    </div>
+  );
+}
+
+export default VirtualTable;
@@ -0,0 +1,15 @@
+import { useEffect, useState } from "react";
+
+// Valor atualizado só depois de `delay` ms sem novas mudanças
+function useDebouncedValue(value, delay = 250) {
+  const [debounced, setDebounced] = useState(value);
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebounced(value), delay);
+    return () => clearTimeout(timer);
+  }, [value, delay]);
+
+  return debounced;
+}
+
+export default useDebouncedValue;
@@ -0,0 +1,48 @@
+import { useEffect, useRef, useState } from "react";
+import { createSearcher, searchableText } from "../services/search";
+
+// Filtra `items` pelo termo em um Web Worker
+//
+// O índice (campos `fields` normalizados) é montado uma vez por carga de
+// dados, na primeira busca sobre um novo array de registros. `fields` deve
+// ser estável (constante do módulo). Retorna os registros encontrados, ou
+// null enquanto a primeira busca não termina ou sem termo.
+function useLocalSearch(items, fields, term) {
+  const searcherRef = useRef(null);
+  const indexedRef = useRef(null);
+  const [matches, setMatches] = useState(null);
+
+  useEffect(() => {
+    searcherRef.current = createSearcher();
+    indexedRef.current = null;
+    return () => searcherRef.current.terminate();
+  }, []);
+
+  useEffect(() => {
+    if (!items || !term) {
+      setMatches(null);
+      return undefined;
+    }
+
+    const searcher = searcherRef.current;
+    if (indexedRef.current !== items) {
+      searcher.setRecords(items.map(item => searchableText(item, fields)));
+      indexedRef.current = items;
+    }
+
+    let active = true;
+    searcher.search(term).then(positions => {
+      // Mantém o resultado anterior enquanto a busca atual não termina
+      if (active && positions) {
+        setMatches(positions.map(position => items[position]));
+      }
+    });
+    return () => {
+      active = false;
+    };
+  }, [items, fields, term]);
+
+  return matches;
+}
+
+export default useLocalSearch;
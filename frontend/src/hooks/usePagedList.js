@@ -0,0 +1,106 @@
+import { useCallback, useEffect, useState } from "react";
+import { toast } from "react-toastify";
+import { subscribe } from "../services/cache";
+import useLocalSearch from "./useLocalSearch";
+
+// Registros pedidos ao backend por página
+export const PAGE_SIZE = 200;
+
+// Listagem paginada servida pelo cache compartilhado (services/cache.js)
+//
+// Mostra na hora os registros já em cache e só vai ao backend quando a
+// listagem não existe, está antiga ou foi invalidada por uma alteração.
+// As páginas seguintes são acrescentadas com `loadMore`.
+//
+// Com `searchFields`, se a listagem completa já está no cliente a busca é
+// feita localmente (em um Web Worker) sobre esses campos; caso contrário,
+// o termo vai para o backend (?q=).
+function usePagedList(
+  resource,
+  query = "",
+  errorMessage = "Erro ao carregar dados",
+  searchFields = null
+) {
+  const [, setVersion] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Falha ao carregar mais: evita novas tentativas até recarregar
+  const [failed, setFailed] = useState(false);
+  const [loadFailed, setLoadFailed] = useState(false);
+
+  // Redesenha a cada mudança no cache
+  useEffect(() => subscribe(() => setVersion(version => version + 1)), []);
+
+  const base = resource.peek("");
+  const local = Boolean(
+    query && searchFields && base && base.items.length >= base.total
+  );
+  const listQuery = local ? "" : query;
+  const snapshot = local ? base : resource.peek(listQuery);
+  const matches = useLocalSearch(
+    local ? base.items : null,
+    searchFields,
+    local ? query : ""
+  );
+
+  const reportError = useCallback(
+    error => {
+      console.error(errorMessage, error);
+      toast.error(error.message || errorMessage);
+    },
+    [errorMessage]
+  );
+
+  const reload = useCallback(() => {
+    setFailed(false);
+    setLoadFailed(false);
+    return resource.load(listQuery, PAGE_SIZE).catch(error => {
+      reportError(error);
+      setLoadFailed(true);
+    });
+  }, [resource, listQuery, reportError]);
+
+  // Carrega ou revalida quando a listagem está ausente, antiga ou invalidada
+  const stale = resource.isStale(listQuery);
+  useEffect(() => {
+    if (stale) reload();
+  }, [stale, reload]);
+
+  const loadMore = useCallback(async () => {
+    setLoadingMore(true);
+    try {
+      await resource.loadMore(listQuery, PAGE_SIZE);
+    } catch (error) {
+      reportError(error);
+      setFailed(true);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [resource, listQuery, reportError]);
+
+  if (local) {
+    return {
+      items: matches || [],
+      total: matches ? matches.length : 0,
+      loading: !matches,
+      loadingMore: false,
+      hasMore: false,
+      loadMore,
+      reload,
+    };
+  }
+
+  const items = snapshot ? snapshot.items : [];
+  const total = snapshot ? snapshot.total : 0;
+
+  return {
+    items,
+    total,
+    loading: !snapshot && !loadFailed,
+    loadingMore,
+    hasMore: !failed && items.length < total,
+    loadMore,
+    reload,
+  };
+}
+
+export default usePagedList;
@@ -1,4 +1,5 @@
 import axios from "axios";
+import { toast } from "react-toastify";
 
 // Configuração base da API
 const api = axios.create({
@@ -9,26 +10,23 @@ const api = axios.create({
   },
 });
 
-// Interceptor para requisições
-api.interceptors.request.use(
-  config => {
-    // Adiciona timestamp para evitar cache
-    if (config.method === "get") {
-      config.params = {
-        ...config.params,
-        _t: Date.now(),
-      };
-    }
-    return config;
-  },
-  error => {
-    return Promise.reject(error);
-  }
-);
+// Intervalo mínimo (ms) entre avisos de dados desatualizados
+const STALE_WARNING_INTERVAL = 30000;
+let lastStaleWarning = 0;
 
 // Interceptor para respostas
 api.interceptors.response.use(
   response => {
+    // Google Sheets indisponível: o servidor respondeu com dados do cache
+    if (response.data?.stale) {
+      const now = Date.now();
+      if (now - lastStaleWarning > STALE_WARNING_INTERVAL) {
+        lastStaleWarning = now;
+        toast.warn(
+          "Google Sheets indisponível no momento. Exibindo os últimos dados salvos."
+        );
+      }
+    }
     return response;
   },
   error => {
@@ -54,52 +52,114 @@ api.interceptors.response.use(
         throw new Error("Acesso negado.");
       case 404:
         throw new Error("Recurso não encontrado.");
+      case 409: {
+        // Conflito: o registro atual acompanha o erro
+        const conflict = new Error(message);
+        conflict.current = error.response.data?.current ?? null;
+        throw conflict;
+      }
       case 500:
         throw new Error(`Erro interno do servidor: ${message}`);
+      case 503: {
+        // Servidor sobrecarregado: recusou a requisição em vez de deixá-la esperando
+        const retryAfter = error.response.headers["retry-after"];
+        throw new Error(
+          retryAfter
+            ? `Servidor ocupado. Tente novamente em ${retryAfter} s.`
+            : "Servidor ocupado. Tente novamente em instantes."
+        );
+      }
       default:
         throw new Error(`Erro ${status}: ${message}`);
     }
   }
 );
 
+// Cabeçalho If-Match com a versão lida do registro: o backend responde 409
+// se outra pessoa alterou o registro nesse meio tempo
+const ifMatch = version =>
+  version ? { headers: { "If-Match": `"${version}"` } } : undefined;
+
 // Serviços específicos
 export const userService = {
   // Lista todos os usuários
   getAll: () => api.get("/users"),
 
+  // Lista uma página de usuários ({ offset, limit, q })
+  getPage: params => api.get("/users", { params }),
+
   // Obtém usuário por ID
   getById: id => api.get(`/users/${id}`),
 
   // Cria novo usuário
   create: userData => api.post("/users", userData),
 
-  // Atualiza usuário
-  update: (id, userData) => api.put(`/users/${id}`, userData),
+  // Atualiza usuário (version: versão lida, opcional)
+  update: (id, userData, version) =>
+    api.put(`/users/${id}`, userData, ifMatch(version)),
 
-  // Remove usuário
-  delete: id => api.delete(`/users/${id}`),
+  // Remove usuário (version: versão lida, opcional)
+  delete: (id, version) => api.delete(`/users/${id}`, ifMatch(version)),
 };
 
 export const productService = {
   // Lista todos os produtos
   getAll: () => api.get("/products"),
 
+  // Lista uma página de produtos ({ offset, limit, q })
+  getPage: params => api.get("/products", { params }),
+
   // Obtém produto por ID
   getById: id => api.get(`/products/${id}`),
 
   // Cria novo produto
   create: productData => api.post("/products", productData),
 
-  // Atualiza produto
-  update: (id, productData) => api.put(`/products/${id}`, productData),
+  // Atualiza produto (version: versão lida, opcional)
+  update: (id, productData, version) =>
+    api.put(`/products/${id}`, productData, ifMatch(version)),
+
+  // Remove produto (version: versão lida, opcional)
+  delete: (id, version) => api.delete(`/products/${id}`, ifMatch(version)),
+};
 
-  // Remove produto
-  delete: id => api.delete(`/products/${id}`),
+export const dashboardService = {
+  // Lista usuários e produtos em uma única requisição
+  get: () => api.get("/dashboard"),
+};
+
+export const reportService = {
+  // Lista relatórios disponíveis
+  list: () => api.get("/reports"),
+
+  // Executa relatório em JSON
+  run: (name, params = {}) => api.get(`/reports/${name}`, { params }),
+
+  // URL para download do relatório em CSV, Excel ou PDF
+  downloadUrl: (name, format, params = {}) =>
+    `/api/reports/${name}?${new URLSearchParams({ ...params, format })}`,
+};
+
+export const historyService = {
+  // Lista as alterações mais recentes
+  list: (limit = 20) => api.get("/history", { params: { limit } }),
+
+  // Desfaz as últimas alterações
+  undo: (steps = 1) => api.post("/history/undo", { steps }),
+
+  // Refaz alterações desfeitas
+  redo: (steps = 1) => api.post("/history/redo", { steps }),
+
+  // Volta os dados a um instante (data ISO 8601)
+  restore: timestamp => api.post("/history/restore", { timestamp }),
 };
 
 export const systemService = {
   // Verifica saúde da API
   health: () => api.get("/health"),
+
+  // Confere mudanças na planilha e retorna a revisão dos dados
+  changes: () => api.get("/changes"),
 };
 
 export default api;
@@ -0,0 +1,298 @@
+import { userService, productService, dashboardService } from "./api";
+
+// Tempo (ms) em que uma listagem em cache é usada sem revalidar
+export const STALE_AFTER = 30000;
+
+// Chave da listagem completa (dashboard), sem busca nem paginação
+const ALL = "all";
+
+// Camada de dados compartilhada entre as telas
+//
+// Os registros ficam normalizados por tabela (row_index -> registro) e cada
+// listagem guarda apenas os ids, o total e quando foi carregada. Requisições
+// iguais em andamento são compartilhadas; ao voltar a uma tela, os dados em
+// cache aparecem na hora e são revalidados em segundo plano se estiverem
+// antigos (stale-while-revalidate). Inclusões, alterações e remoções são
+// aplicadas localmente antes da resposta e desfeitas em caso de erro.
+const records = { users: new Map(), products: new Map() };
+const queries = { users: new Map(), products: new Map() };
+const inflight = new Map();
+const listeners = new Set();
+// Versão dos registros de cada tabela e listagens já materializadas
+const versions = { users: 0, products: 0 };
+const materialized = new WeakMap();
+let temporaryId = 0;
+
+const TEMPORARY_PREFIX = "tmp-";
+const PENDING_MESSAGE = "Registro ainda sendo salvo. Tente novamente.";
+
+const notify = () => listeners.forEach(listener => listener());
+
+const queryKey = (query = "") => (query ? `q:${query}` : "q:");
+
+const pageParams = (offset, limit, query) => ({
+  offset,
+  limit,
+  ...(query ? { q: query } : {}),
+});
+
+// Registros de uma listagem, na ordem do backend. O mesmo array é devolvido
+// enquanto a listagem e os registros da tabela não mudam.
+const materialize = (table, entry) => {
+  const cached = materialized.get(entry.ids);
+  if (cached && cached.version === versions[table]) return cached.items;
+  const items = entry.ids.map(id => records[table].get(id)).filter(Boolean);
+  materialized.set(entry.ids, { version: versions[table], items });
+  return items;
+};
+
+// Guarda os registros e devolve seus ids
+const normalize = (table, items) => {
+  versions[table] += 1;
+  return items.map(item => {
+    records[table].set(item.row_index, item);
+    return item.row_index;
+  });
+};
+
+// Compartilha a promessa de uma requisição igual ainda em andamento
+const dedupe = (key, request) => {
+  if (!inflight.has(key)) {
+    const promise = request().finally(() => inflight.delete(key));
+    inflight.set(key, promise);
+  }
+  return inflight.get(key);
+};
+
+const isStale = entry =>
+  !entry || entry.invalidated || Date.now() - entry.fetchedAt > STALE_AFTER;
+
+// Marca as listagens da tabela para revalidação (todas ou só as de busca)
+const invalidate = (table, onlySearches = false) => {
+  queries[table].forEach((entry, key) => {
+    if (!onlySearches || key !== queryKey()) entry.invalidated = true;
+  });
+};
+
+// Cópia das listagens e dos registros para desfazer uma alteração otimista
+const snapshot = table => ({
+  records: new Map(records[table]),
+  queries: new Map(
+    [...queries[table]].map(([key, entry]) => [key, { ...entry }])
+  ),
+});
+
+// Volta ao estado anterior e revalida, pois outras respostas podem ter
+// chegado enquanto a alteração estava pendente
+const restore = (table, saved) => {
+  records[table] = saved.records;
+  queries[table] = saved.queries;
+  versions[table] += 1;
+  invalidate(table);
+  notify();
+};
+
+// Em um conflito (409), mostra o registro como está no servidor
+const keepCurrent = (table, id, error) => {
+  if (error.current !== undefined) {
+    if (error.current) records[table].set(id, error.current);
+    versions[table] += 1;
+    notify();
+  }
+  throw error;
+};
+
+// Registro incluído localmente cuja linha na planilha ainda não é conhecida
+const isTemporary = id => String(id).startsWith(TEMPORARY_PREFIX);
+
+// Aplica `change` localmente, envia `request` e desfaz em caso de erro
+const optimistic = async (table, change, request, onSuccess) => {
+  const saved = snapshot(table);
+  change();
+  versions[table] += 1;
+  notify();
+  try {
+    const response = await request();
+    onSuccess(response);
+    versions[table] += 1;
+    notify();
+    return response;
+  } catch (error) {
+    restore(table, saved);
+    throw error;
+  }
+};
+
+function createResource(table, service) {
+  const entryFor = (query = "") => {
+    const key = queryKey(query);
+    // A listagem completa do dashboard serve de primeira página sem busca
+    if (!queries[table].has(key) && !query && queries[table].has(ALL)) {
+      queries[table].set(key, { ...queries[table].get(ALL) });
+    }
+    return queries[table].get(key);
+  };
+
+  return {
+    // Dados em cache da listagem, sem requisição ({ items, total } ou null)
+    peek: query => {
+      const entry = entryFor(query);
+      return entry
+        ? { items: materialize(table, entry), total: entry.total }
+        : null;
+    },
+
+    // Indica se a listagem precisa ser (re)carregada
+    isStale: query => isStale(entryFor(query)),
+
+    // Carrega a primeira página da listagem, substituindo a anterior
+    load: (query = "", pageSize) => {
+      const key = queryKey(query);
+      const current = queries[table].get(key);
+      if (current) current.invalidated = false;
+      return dedupe(`${table}|${key}|0`, () =>
+        service
+          .getPage(pageParams(0, pageSize, query))
+          .then(response => {
+            const previous = queries[table].get(key);
+            queries[table].set(key, {
+              ids: normalize(table, response.data.data || []),
+              total: response.data.total ?? response.data.count ?? 0,
+              fetchedAt: Date.now(),
+              invalidated: previous ? previous.invalidated : false,
+              generation: (previous?.generation || 0) + 1,
+            });
+            notify();
+          })
+      );
+    },
+
+    // Acrescenta a próxima página à listagem já carregada
+    loadMore: (query = "", pageSize) => {
+      const key = queryKey(query);
+      const entry = queries[table].get(key);
+      if (!entry || entry.ids.length >= entry.total) return Promise.resolve();
+      const { generation } = entry;
+      const offset = entry.ids.length;
+      return dedupe(`${table}|${key}|${offset}`, () =>
+        service
+          .getPage(pageParams(offset, pageSize, query))
+          .then(response => {
+            const current = queries[table].get(key);
+            // A listagem foi recarregada enquanto a página chegava
+            if (!current || current.generation !== generation) return;
+            queries[table].set(key, {
+              ...current,
+              ids: current.ids.concat(
+                normalize(table, response.data.data || [])
+              ),
+              total: response.data.total ?? current.total,
+            });
+            notify();
+          })
+      );
+    },
+
+    create: data => {
+      const id = `${TEMPORARY_PREFIX}${++temporaryId}`;
+      return optimistic(
+        table,
+        () => {
+          records[table].set(id, { ...data, row_index: id });
+          queries[table].forEach((entry, key) => {
+            if (key === ALL || key === queryKey()) {
+              entry.ids = entry.ids.concat(id);
+              entry.total += 1;
+            }
+          });
+        },
+        () => service.create(data),
+        // A linha real só é conhecida relendo a listagem
+        () => invalidate(table)
+      );
+    },
+
+    update: (id, data) => {
+      if (isTemporary(id)) return Promise.reject(new Error(PENDING_MESSAGE));
+      const version = records[table].get(id)?.version;
+      return optimistic(
+        table,
+        () => records[table].set(id, { ...records[table].get(id), ...data }),
+        () => service.update(id, data, version),
+        response => {
+          const saved = response.data.data || data;
+          records[table].set(id, { ...records[table].get(id), ...saved });
+          invalidate(table, true);
+        }
+      ).catch(error => keepCurrent(table, id, error));
+    },
+
+    remove: id => {
+      if (isTemporary(id)) return Promise.reject(new Error(PENDING_MESSAGE));
+      const version = records[table].get(id)?.version;
+      return optimistic(
+        table,
+        () =>
+          queries[table].forEach(entry => {
+            if (entry.ids.includes(id)) {
+              entry.ids = entry.ids.filter(other => other !== id);
+              entry.total -= 1;
+            }
+          }),
+        () => service.delete(id, version),
+        // As linhas abaixo da removida mudam de row_index
+        () => invalidate(table)
+      ).catch(error => keepCurrent(table, id, error));
+    },
+  };
+}
+
+export const usersResource = createResource("users", userService);
+export const productsResource = createResource("products", productService);
+
+export const dashboardResource = {
+  // Listagens completas em cache ({ users, products } ou null)
+  peek: () => {
+    const users = queries.users.get(ALL);
+    const products = queries.products.get(ALL);
+    if (!users || !products) return null;
+    return {
+      users: materialize("users", users),
+      products: materialize("products", products),
+    };
+  },
+
+  isStale: () =>
+    isStale(queries.users.get(ALL)) || isStale(queries.products.get(ALL)),
+
+  // Carrega usuários e produtos em uma única requisição
+  load: () =>
+    dedupe("dashboard", () =>
+      dashboardService.get().then(response => {
+        const data = response.data.data || {};
+        ["users", "products"].forEach(table => {
+          const items = data[table] || [];
+          queries[table].set(ALL, {
+            ids: normalize(table, items),
+            total: items.length,
+            fetchedAt: Date.now(),
+            invalidated: false,
+            generation: 0,
+          });
+        });
+        notify();
+      })
+    ),
+};
+
+// Marca todas as listagens para recarregar (ex.: após desfazer alterações)
+export const invalidateAll = () => {
+  Object.keys(queries).forEach(table => invalidate(table));
+  notify();
+};
+
+// Registra uma função chamada a cada mudança no cache
+export const subscribe = listener => {
+  listeners.add(listener);
+  return () => listeners.delete(listener);
+};
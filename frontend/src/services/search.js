@@ -0,0 +1,81 @@
+// Busca local sobre listagens completas já carregadas no cliente
+//
+// O texto pesquisável de cada registro é normalizado uma única vez por
+// carga de dados (minúsculas e sem acentos). A filtragem roda em um Web
+// Worker para não bloquear a digitação; sem suporte a Worker, roda na
+// thread principal.
+
+// Separador entre campos, para que a busca não case através de dois campos
+const FIELD_SEPARATOR = "\n";
+
+// Minúsculas e sem acentos: "Ação" -> "acao"
+export const fold = text =>
+  String(text ?? "")
+    .normalize("NFD")
+    .replace(/[\u0300-\u036f]/g, "")
+    .toLowerCase();
+
+// Texto normalizado de cada registro, na ordem da listagem
+export const buildIndex = texts => texts.map(fold);
+
+// Posições dos registros que contêm o termo
+export const searchIndex = (index, term) => {
+  const folded = fold(term).trim();
+  const matches = [];
+  for (let position = 0; position < index.length; position++) {
+    if (index[position].includes(folded)) matches.push(position);
+  }
+  return matches;
+};
+
+// Texto pesquisável de um registro: os campos indicados, concatenados
+export const searchableText = (record, fields) =>
+  fields.map(field => record[field] ?? "").join(FIELD_SEPARATOR);
+
+// Cria um buscador com `setRecords(texts)` e `search(term)` (Promise com as
+// posições encontradas). Respostas de buscas já superadas são descartadas.
+export function createSearcher() {
+  let worker = null;
+  try {
+    worker = new Worker(
+      new URL("../workers/search.worker.js", import.meta.url)
+    );
+  } catch (error) {
+    console.warn("Web Worker indisponível; busca local na thread principal");
+  }
+
+  let index = [];
+  let lastRequest = 0;
+  const pending = new Map();
+
+  if (worker) {
+    worker.onmessage = ({ data }) => {
+      const resolve = pending.get(data.id);
+      pending.delete(data.id);
+      if (resolve) resolve(data.id === lastRequest ? data.matches : null);
+    };
+  }
+
+  return {
+    setRecords: texts => {
+      if (worker) worker.postMessage({ type: "index", texts });
+      else index = buildIndex(texts);
+    },
+
+    // Resolve com null quando uma busca mais recente foi feita
+    search: term => {
+      const id = ++lastRequest;
+      if (!worker) return Promise.resolve(searchIndex(index, term));
+      return new Promise(resolve => {
+        pending.set(id, resolve);
+        worker.postMessage({ type: "search", id, term });
+      });
+    },
+
+    terminate: () => {
+      if (worker) worker.terminate();
+      pending.forEach(resolve => resolve(null));
+      pending.clear();
+    },
+  };
+}
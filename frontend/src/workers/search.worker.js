@@ -0,0 +1,13 @@
+/* eslint-disable no-restricted-globals */
+import { buildIndex, searchIndex } from "../services/search";
+
+// Índice da listagem atual, reconstruído a cada carga de dados
+let index = [];
+
+self.onmessage = ({ data }) => {
+  if (data.type === "index") {
+    index = buildIndex(data.texts);
+  } else if (data.type === "search") {
+    self.postMessage({ id: data.id, matches: searchIndex(index, data.term) });
+  }
+};
@@ -1,16 +1,46 @@
 """
 Aplicação principal PyWebView + React + Google Sheets
+
+Os módulos pesados (Flask, PyWebView, cliente da API do Google) só são
+importados quando usados. `python main.py --startup-check` mede a
+inicialização sem abrir a janela e confere o orçamento de tempo (CI).
 """
+import time
+
+# Início da medição da inicialização: antes de qualquer outra importação
+STARTED = time.perf_counter()
+
+import argparse
+import importlib.util
 import os
 import sys
-import sys
 import threading
-import time
-import webbrowser
-from flask import Flask
-import webview
-from backend.app import app as flask_app
-from webview_config import create_window, start_webview
+
+from backend.startup import StartupTimer, format_report, write_report
+
+startup = StartupTimer(STARTED)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Endereço de um servidor já em execução na rede (python -m backend.server);
+# vazio, a API roda dentro da própria aplicação
+SERVER_URL = os.getenv('SERVER_URL', '').rstrip('/')
+LOCAL_HOST = '127.0.0.1'
+LOCAL_PORT = 5001
+LOCAL_URL = f'http://{LOCAL_HOST}:{LOCAL_PORT}'
+
+# Módulos necessários, conferidos sem importá-los; os da API só rodando localmente
+REQUIRED_MODULES = ['webview', 'dotenv']
+LOCAL_API_MODULES = ['flask', 'flask_cors', 'googleapiclient', 'google_auth_oauthlib',
+                     'google_auth_httplib2', 'numpy']
+
+# Orçamento (segundos) de --startup-check: até a API responder com os dados em memória
+DEFAULT_STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET', '5'))
+
+# Espera máxima (segundos) pelo aquecimento em --startup-check
+STARTUP_CHECK_WARMUP_TIMEOUT = 30.0
 
 def get_resource_path(relative_path):
     """Obtém caminho correto para recursos empacotados pelo PyInstaller"""
@@ -20,26 +50,44 @@ def get_resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+def missing_modules():
+    """Dependências não instaladas, verificadas sem importar os módulos"""
+    required = REQUIRED_MODULES + ([] if SERVER_URL else LOCAL_API_MODULES)
+    return [name for name in required if importlib.util.find_spec(name) is None]
+
 class PyWebViewApp:
     """Classe principal da aplicação PyWebView"""
     
-    def __init__(self):
+    def __init__(self, timer: StartupTimer = None):
         self.window = None
+        self.server = None
         self.flask_thread = None
-        self.flask_app = flask_app
+        self.flask_app = None
+        self.url = SERVER_URL or LOCAL_URL
+        self.startup = timer or StartupTimer(measure_imports=False)
     
     def start_flask_server(self):
-        """Inicia servidor Flask em thread separada"""
+        """Inicia servidor Flask em thread separada
+        
+        O socket é aberto antes de a thread começar: ao retornar, o servidor
+        já aceita conexões e a janela pode ser criada sem esperar por ele.
+        """
+        from werkzeug.serving import make_server
         try:
-            self.flask_app.run(debug=False, host='127.0.0.1', port=5001, use_reloader=False)
-        except Exception as e:
+            self.server = make_server(LOCAL_HOST, LOCAL_PORT, self.flask_app, threaded=True)
+        except OSError as e:
             print(f"Erro ao iniciar servidor Flask: {e}")
+            return False
+        self.flask_thread = threading.Thread(target=self.server.serve_forever,
+                                             name='flask-server', daemon=True)
+        self.flask_thread.start()
+        return True
     
     def check_flask_ready(self):
         """Verifica se o Flask está pronto"""
         import requests
         try:
-            response = requests.get('http://127.0.0.1:5001/api/health', timeout=2)
+            response = requests.get(f'{self.url}/api/health', timeout=2)
             return response.status_code == 200
         except:
             return False
@@ -50,31 +98,51 @@ class PyWebViewApp:
         while time.time() - start_time < timeout:
             if self.check_flask_ready():
                 return True
-            time.sleep(0.5)
+            time.sleep(0.1)
         return False
     
+    def start_backend(self):
+        """Sobe a API local ou aguarda o servidor remoto; retorna se está pronto"""
+        if SERVER_URL:
+            with self.startup.phase('server'):
+                if not self.wait_for_flask():
+                    print(f"Erro: servidor em {self.url} não respondeu a tempo")
+                    return False
+            return True
+        
+        # Importar o app já dispara o aquecimento (token, conexão e dados),
+        # que segue em paralelo com a subida do servidor e o carregamento da janela
+        with self.startup.phase('backend'):
+            from backend.app import app as flask_app
+        self.flask_app = flask_app
+        with self.startup.phase('server'):
+            return self.start_flask_server()
+    
     def create_window(self):
         """Cria janela PyWebView"""
-        # Inicia Flask em thread separada
-        self.flask_thread = threading.Thread(target=self.start_flask_server, daemon=True)
-        self.flask_thread.start()
-        
-        # Aguarda Flask ficar pronto
-        if not self.wait_for_flask():
-            print("Erro: Flask não iniciou a tempo")
+        if not self.start_backend():
             return
         
-        # Exemplo de uso do get_resource_path para acessar o build do frontend
-        frontend_build_path = get_resource_path('frontend/build')
-        # Cria janela PyWebView com configurações otimizadas
-        self.window = create_window(
-            title='Sistema de Gerenciamento - PyWebView + React + Google Sheets',
-            url='http://127.0.0.1:5001',
-            width=1200,
-            height=800
-        )
+        with self.startup.phase('window'):
+            from webview_config import create_window
+            # Exemplo de uso do get_resource_path para acessar o build do frontend
+            frontend_build_path = get_resource_path('frontend/build')
+            # Cria janela PyWebView com configurações otimizadas
+            self.window = create_window(
+                title='Sistema de Gerenciamento - PyWebView + React + Google Sheets',
+                url=self.url,
+                width=1200,
+                height=800
+            )
+    
+    def close(self):
+        """Grava as alterações pendentes da API local antes de sair"""
+        # O servidor Flask roda em thread daemon e morre com a janela
+        if self.flask_app is not None:
+            from backend.app import sheets_manager
+            sheets_manager.close()
     
-    def run(self):
+    def run(self, show_report=False, report_path=None):
         """Executa a aplicação"""
         try:
             print("Iniciando aplicação PyWebView...")
@@ -83,33 +151,99 @@ class PyWebViewApp:
             self.create_window()
             
             if self.window:
+                self.startup.finish()
+                report = self.startup.report()
+                print(format_report(report) if show_report
+                      else f"Janela criada em {report['total_ms']:.0f} ms")
+                if report_path:
+                    write_report(report, report_path)
+                
+                from webview_config import start_webview
                 print("Iniciando interface PyWebView...")
                 print("Aplicação rodando! Feche a janela para sair.")
                 start_webview(debug=True)
             else:
                 print("Erro: Não foi possível criar a janela")
-                
+        
         except KeyboardInterrupt:
             print("\nAplicação interrompida pelo usuário")
         except Exception as e:
             print(f"Erro na aplicação: {e}")
         finally:
             print("Encerrando aplicação...")
+            self.close()
+
+def check_startup(budget, report_path=None):
+    """Mede a inicialização sem abrir a janela e confere o orçamento de tempo
+    
+    Segue os passos da aplicação (backend, servidor, importação do
+    PyWebView), faz a primeira requisição e aguarda o aquecimento. Retorna
+    o código de saída: 0 dentro do orçamento, 1 acima dele e 2 se a
+    inicialização falhou.
+    """
+    app_instance = PyWebViewApp(startup)
+    try:
+        if not app_instance.start_backend():
+            return 2
+        with startup.phase('webview'):
+            # Só mede a importação do PyWebView; a janela não é aberta
+            importlib.import_module('webview_config')
+        with startup.phase('first_request'):
+            if not app_instance.check_flask_ready():
+                print(f"Erro: servidor em {app_instance.url} não respondeu")
+                return 2
+        if not SERVER_URL:
+            from backend.app import warmup
+            if not warmup.wait(timeout=STARTUP_CHECK_WARMUP_TIMEOUT):
+                print("Aviso: o aquecimento não terminou no tempo máximo")
+            if warmup.started is not None:
+                elapsed = warmup.status()['elapsed_ms'] / 1000
+                startup.add_phase('warmup', warmup.started, warmup.started + elapsed)
+    except Exception as e:
+        print(f"Erro na inicialização: {e}")
+        return 2
+    finally:
+        startup.finish()
+        app_instance.close()
+    
+    report = startup.report()
+    report['budget_ms'] = round(budget * 1000, 1)
+    print(format_report(report))
+    if report_path:
+        write_report(report, report_path)
+    if report['total_ms'] > report['budget_ms']:
+        print(f"ERRO: inicialização acima do orçamento de {report['budget_ms']:.0f} ms")
+        return 1
+    print(f"OK: dentro do orçamento de {report['budget_ms']:.0f} ms")
+    return 0
 
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description='Sistema de Gerenciamento - PyWebView + React + Google Sheets')
+    parser.add_argument('--startup-check', action='store_true',
+                        help='mede a inicialização sem abrir a janela; sai com 1 se passar do orçamento')
+    parser.add_argument('--budget', type=float, default=DEFAULT_STARTUP_BUDGET,
+                        help=f'orçamento de --startup-check em segundos (padrão: {DEFAULT_STARTUP_BUDGET:g})')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='mostra as fases e importações mais lentas ao abrir a janela')
+    parser.add_argument('--report', metavar='ARQUIVO',
+                        help='grava o relatório de inicialização em JSON')
+    args = parser.parse_args()
+    
     # Verifica se as dependências estão instaladas
-    try:
-        import flask
-        import webview
-        from backend.app import app
-    except ImportError as e:
-        print(f"Erro: Dependência não encontrada: {e}")
+    missing = missing_modules()
+    if missing:
+        print(f"Erro: Dependência não encontrada: {', '.join(missing)}")
         print("Execute: pip install -r requirements.txt")
-        return
+        return 2
     
-    # Verifica se o arquivo de credenciais existe
-    if not os.path.exists('credentials.json'):
+    if args.startup_check:
+        return check_startup(args.budget, args.report)
+    
+    # Verifica se o arquivo de credenciais existe (só a API local usa; a
+    # conta de serviço dispensa o credentials.json)
+    if (not SERVER_URL and not os.path.exists('credentials.json')
+            and not os.getenv('GOOGLE_SHEETS_SERVICE_ACCOUNT_FILE')):
         print("AVISO: Arquivo 'credentials.json' não encontrado!")
         print("Configure suas credenciais do Google Sheets API primeiro.")
         print("Veja o README.md para instruções detalhadas.")
@@ -117,11 +251,12 @@ def main():
         # Pergunta se quer continuar mesmo assim
         response = input("Deseja continuar mesmo assim? (s/N): ").lower()
         if response != 's':
-            return
+            return 0
     
     # Inicia aplicação
-    app_instance = PyWebViewApp()
-    app_instance.run()
+    app_instance = PyWebViewApp(startup)
+    app_instance.run(show_report=args.startup_report, report_path=args.report)
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Fixtures dos testes: gerenciador do Google Sheets sobre a API simulada
+
+Os testes não acessam a rede: o serviço do Sheets é o FakeSheetsService
+dos benchmarks (benchmarks/fake_sheets.py), em memória e sem latência.
+"""
+import os
+
+import pytest
+
+SPREADSHEET_ID = 'planilha-teste'
+
+# A aplicação Flask lê a configuração ao ser importada: journal, snapshot,
+# histórico e aquecimento ficam desligados e cada teste monta o seu gerenciador
+os.environ.update({
+    'GOOGLE_SHEETS_SPREADSHEET_ID': SPREADSHEET_ID,
+    'GOOGLE_SHEETS_CREDENTIALS_FILE': os.path.join(os.path.dirname(__file__), 'sem-credenciais.json'),
+    'GOOGLE_SHEETS_CHANGE_PROBE': '0',
+    'GOOGLE_SHEETS_JOURNAL_FILE': '',
+    'GOOGLE_SHEETS_SNAPSHOT_FILE': '',
+    'GOOGLE_SHEETS_HISTORY_FILE': '',
+    'STARTUP_WARMUP': '0',
+    'LOG_LEVEL': 'WARNING',
+    'LOG_FORMAT': 'text',
+})
+
+from backend.google_sheets import GoogleSheetsManager  # noqa: E402
+from backend.reports import ReportEngine  # noqa: E402
+from benchmarks.fake_sheets import FakeSheetsService, generate_rows  # noqa: E402
+
+
+def _fake_authenticate(service):
+    return lambda manager: setattr(manager, 'service', service)
+
+
+@pytest.fixture
+def service():
+    """Planilha simulada com 5 usuários e 5 produtos"""
+    service = FakeSheetsService()
+    service.load(SPREADSHEET_ID, 'User', generate_rows('User', 5, seed=1))
+    service.load(SPREADSHEET_ID, 'Product', generate_rows('Product', 5, seed=2))
+    return service
+
+
+@pytest.fixture
+def make_manager(service, tmp_path, monkeypatch):
+    """Cria gerenciadores sobre a planilha simulada, fechados ao fim do teste
+
+    `journal`, `write_behind` e `history` ativam os recursos com arquivos
+    em `tmp_path`; a gravação assíncrona usa um intervalo longo, para que os
+    testes chamem `flush()` quando quiserem.
+    """
+    monkeypatch.setattr(GoogleSheetsManager, '_authenticate', _fake_authenticate(service))
+    managers = []
+
+    def make(journal=False, write_behind=False, history=False):
+        manager = GoogleSheetsManager(spreadsheet_id=SPREADSHEET_ID, change_probe=False)
+        managers.append(manager)
+        if journal or write_behind:
+            manager.enable_journal(str(tmp_path / 'journal.jsonl'))
+        if write_behind:
+            manager.enable_write_behind(flush_interval=3600)
+        if history:
+            manager.enable_history(str(tmp_path / 'history.bin'))
+        return manager
+
+    yield make
+    # As alterações pendentes são gravadas ao fechar
+    service.error_rate = 0.0
+    for manager in managers:
+        try:
+            manager.close()
+        except Exception:
+            pass
+
+
+@pytest.fixture
+def manager(make_manager):
+    """Gerenciador com histórico de alterações"""
+    return make_manager(history=True)
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """Módulo da aplicação Flask, importado uma vez com a planilha simulada"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(GoogleSheetsManager, '_authenticate', _fake_authenticate(FakeSheetsService()))
+        from backend import app
+    return app
+
+
+@pytest.fixture
+def client(app_module, manager, monkeypatch):
+    """Cliente HTTP da API usando o gerenciador do teste"""
+    monkeypatch.setattr(app_module, 'sheets_manager', manager)
+    monkeypatch.setattr(app_module, 'report_engine', ReportEngine(manager))
+    return app_module.app.test_client()
@@ -0,0 +1,39 @@
+"""
+Testes do controle de admissão: 503 com Retry-After e dados do cache desatualizado
+"""
+from backend.admission import AdmissionController
+
+
+def test_overloaded_sheets_returns_503_with_retry_after(client, manager):
+    manager.admission = AdmissionController(max_concurrent=1, max_queue=0)
+
+    # A única vaga está ocupada e não há fila: sem dados em cache, a leitura é recusada
+    with manager.admission.slot():
+        response = client.get('/api/products')
+
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_overloaded_sheets_serves_stale_cache(client, manager):
+    assert client.get('/api/products').get_json()['stale'] is False
+    manager.cache.ttl = 0
+    manager.admission = AdmissionController(max_concurrent=1, max_queue=0)
+
+    with manager.admission.slot():
+        response = client.get('/api/products')
+
+    assert response.status_code == 200
+    assert response.get_json()['stale'] is True
+    assert response.headers['Warning'] == '110 - "Response is Stale"'
+    assert len(response.get_json()['data']) == 5
+
+
+def test_report_returns_503_when_overloaded(client, manager):
+    manager.admission = AdmissionController(max_concurrent=1, max_queue=0)
+
+    with manager.admission.slot():
+        response = client.get('/api/reports/products_summary')
+
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
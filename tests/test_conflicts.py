@@ -0,0 +1,59 @@
+"""
+Testes da detecção de conflitos: versão das linhas e If-Match
+"""
+from backend.schema import row_version
+
+from .conftest import SPREADSHEET_ID
+
+PRODUCT = {'name': 'Caneta', 'price': 2.5, 'description': 'Caneta azul'}
+
+
+def _first_product(client):
+    return client.get('/api/products').get_json()['data'][0]
+
+
+def test_row_version_ignores_trailing_blanks_and_integer_floats():
+    assert row_version(['Mesa', 10.0, 'Mesa de jantar', '']) == row_version(['Mesa', 10, 'Mesa de jantar'])
+    assert row_version(['Mesa', 10, 'Mesa de jantar']) != row_version(['Mesa', 11, 'Mesa de jantar'])
+
+
+def test_update_with_current_version_succeeds(client, service):
+    product = _first_product(client)
+
+    response = client.put(f"/api/products/{product['row_index']}", json=PRODUCT,
+                          headers={'If-Match': f'"{product["version"]}"'})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{response.get_json()["data"]["version"]}"'
+    assert service.spreadsheets_data[SPREADSHEET_ID]['Product'][1] == ['Caneta', 2.5, 'Caneta azul']
+
+
+def test_update_with_old_version_conflicts(client):
+    product = _first_product(client)
+    client.put(f"/api/products/{product['row_index']}", json=PRODUCT)
+
+    response = client.put(f"/api/products/{product['row_index']}", json={**PRODUCT, 'price': 3.0},
+                          headers={'If-Match': f'"{product["version"]}"'})
+
+    assert response.status_code == 409
+    current = response.get_json()['current']
+    assert current['price'] == 2.5
+    assert response.headers['ETag'] == f'"{current["version"]}"'
+
+
+def test_delete_with_old_version_conflicts(client, service):
+    product = _first_product(client)
+    client.put(f"/api/products/{product['row_index']}", json=PRODUCT)
+    count = len(service.spreadsheets_data[SPREADSHEET_ID]['Product'])
+
+    response = client.delete(f"/api/products/{product['row_index']}",
+                             headers={'If-Match': f'"{product["version"]}"'})
+
+    assert response.status_code == 409
+    assert len(service.spreadsheets_data[SPREADSHEET_ID]['Product']) == count
+
+
+def test_decoded_record_carries_row_version(client, service):
+    product = _first_product(client)
+
+    assert product['version'] == row_version(service.spreadsheets_data[SPREADSHEET_ID]['Product'][1])
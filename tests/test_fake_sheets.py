@@ -0,0 +1,38 @@
+"""
+Testes da simulação local do Google Sheets usada pelos testes e benchmarks
+"""
+import pytest
+from googleapiclient.errors import HttpError
+
+from .conftest import SPREADSHEET_ID
+
+PRODUCT = {'name': 'Produto novo', 'price': 10.0, 'description': 'Descrição do produto'}
+
+
+def test_manager_reads_the_simulated_sheet(make_manager, service):
+    manager = make_manager()
+
+    products = manager.get_products()
+
+    assert len(products) == 5
+    assert products[0]['name'] == service.spreadsheets_data[SPREADSHEET_ID]['Product'][1][0]
+
+
+def test_manager_writes_to_the_simulated_sheet(make_manager, service):
+    manager = make_manager()
+    manager.get_products()
+
+    manager.add_record('Product', PRODUCT)
+
+    assert service.spreadsheets_data[SPREADSHEET_ID]['Product'][-1] == ['Produto novo', 10.0,
+                                                                      'Descrição do produto']
+
+
+def test_error_rate_fails_calls_with_503(service):
+    service.error_rate = 1.0
+
+    with pytest.raises(HttpError) as error:
+        service.spreadsheets().values().get(spreadsheetId=SPREADSHEET_ID, range='Product').execute()
+
+    assert error.value.resp.status == 503
+    assert service.stats['errors'] == 1
@@ -0,0 +1,37 @@
+"""
+Testes do histórico de alterações: desfazer, refazer e restauração
+"""
+import pytest
+
+from .conftest import SPREADSHEET_ID
+
+PRODUCT = {'name': 'Caneta', 'price': 2.5, 'description': 'Caneta azul'}
+
+
+def test_undo_redo_and_restore(client, service):
+    rows = service.spreadsheets_data[SPREADSHEET_ID]['Product']
+    original = list(rows[1])
+    product = client.get('/api/products').get_json()['data'][0]
+    client.put(f"/api/products/{product['row_index']}", json=PRODUCT)
+    client.post('/api/products', json={**PRODUCT, 'name': 'Lápis'})
+    assert rows[1] == ['Caneta', 2.5, 'Caneta azul'] and rows[-1][0] == 'Lápis'
+
+    response = client.post('/api/history/undo', json={'steps': 1})
+    assert response.status_code == 200
+    assert rows[-1][0] != 'Lápis'
+
+    assert client.post('/api/history/redo').status_code == 200
+    assert rows[-1][0] == 'Lápis'
+
+    response = client.post('/api/history/restore', json={'timestamp': 0})
+    assert response.get_json()['count'] == 2
+    assert rows[1] == original
+    assert all(row[0] != 'Lápis' for row in rows)
+
+
+@pytest.mark.parametrize('steps', ['abc', -1, 0, 1.5, True, None])
+def test_history_rejects_invalid_steps(client, steps):
+    response = client.post('/api/history/undo', json={'steps': steps})
+
+    assert response.status_code == 400
+    assert 'steps' in response.get_json()['error']
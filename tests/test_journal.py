@@ -0,0 +1,119 @@
+"""
+Testes do journal de alterações: recuperação, compactação e reaplicação
+"""
+import json
+
+from backend.journal import MutationJournal
+from backend.write_behind import Mutation
+
+from .conftest import SPREADSHEET_ID
+
+
+def _mutation(op='append', row=7, values=None):
+    return Mutation(op, 'Product', 0, row, values or ['Produto novo', 10.0, 'Descrição do produto']).to_dict()
+
+
+def test_pending_mutations_survive_reopening(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = MutationJournal(path)
+    first, second = _mutation(row=7), _mutation(row=8)
+    journal.append(first)
+    journal.append(second)
+    journal.ack([first['id']])
+    journal.close()
+
+    assert [mutation['id'] for mutation in MutationJournal(path).pending()] == [second['id']]
+
+
+def test_truncated_line_is_ignored(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = MutationJournal(path)
+    mutation = _mutation()
+    journal.append(mutation)
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as journal_file:
+        journal_file.write('{"type": "mutation", "id": "incomp')
+
+    assert [pending['id'] for pending in MutationJournal(path).pending()] == [mutation['id']]
+
+
+def test_compact_keeps_only_pending(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = MutationJournal(str(path))
+    done = [_mutation(row=row) for row in range(2, 50)]
+    for mutation in done:
+        journal.append(mutation)
+    journal.ack([mutation['id'] for mutation in done])
+    pending = _mutation(row=60)
+    journal.append(pending)
+    size = path.stat().st_size
+
+    journal.compact()
+    journal.close()
+
+    assert path.stat().st_size < size
+    assert [mutation['id'] for mutation in MutationJournal(str(path)).pending()] == [pending['id']]
+
+
+def test_replay_writes_missing_and_skips_applied(make_manager, service, tmp_path):
+    rows = service.spreadsheets_data[SPREADSHEET_ID]['Product']
+    journal = MutationJournal(str(tmp_path / 'journal.jsonl'))
+    # Uma inclusão já gravada no Sheets (o processo parou antes da confirmação) e uma não
+    applied = _mutation(row=len(rows) + 1, values=['Produto gravado', 4.0, 'Chegou ao Sheets'])
+    rows.append(list(applied['values']))
+    missing = _mutation(row=len(rows) + 1, values=['Produto perdido', 5.0, 'Gravado só no journal'])
+    journal.append(applied)
+    journal.append(missing)
+    journal.close()
+    count = len(rows)
+
+    manager = make_manager(journal=True)
+
+    assert len(rows) == count + 1
+    assert rows[-2:] == [['Produto gravado', 4.0, 'Chegou ao Sheets'],
+                         ['Produto perdido', 5.0, 'Gravado só no journal']]
+    assert manager.journal.pending() == []
+
+
+def test_replay_writes_append_identical_to_an_existing_row(make_manager, service, tmp_path):
+    rows = service.spreadsheets_data[SPREADSHEET_ID]['Product']
+    journal = MutationJournal(str(tmp_path / 'journal.jsonl'))
+    # Registros repetidos são válidos: a linha igual já existia antes da inclusão
+    duplicate = _mutation(row=len(rows) + 1, values=list(rows[1]))
+    journal.append(duplicate)
+    journal.close()
+    count = len(rows)
+
+    make_manager(journal=True)
+
+    assert len(rows) == count + 1
+    assert rows[-1] == rows[1]
+
+
+def test_replay_finds_append_moved_down_by_other_inclusions(make_manager, service, tmp_path):
+    rows = service.spreadsheets_data[SPREADSHEET_ID]['Product']
+    journal = MutationJournal(str(tmp_path / 'journal.jsonl'))
+    applied = _mutation(row=len(rows) + 1, values=['Produto gravado', 4.0, 'Chegou ao Sheets'])
+    # Outra pessoa incluiu uma linha antes: a nossa foi parar uma linha abaixo
+    rows.append(['Produto de outra pessoa', 1.0, 'Incluído em outra janela'])
+    rows.append(list(applied['values']))
+    journal.append(applied)
+    journal.close()
+    count = len(rows)
+
+    make_manager(journal=True)
+
+    assert len(rows) == count
+
+
+def test_synchronous_append_records_its_target_row(make_manager, service, tmp_path):
+    manager = make_manager(journal=True)
+    manager.get_products()
+    count = len(service.spreadsheets_data[SPREADSHEET_ID]['Product'])
+
+    manager.add_record('Product', {'name': 'Produto novo', 'price': 10.0,
+                                   'description': 'Descrição do produto'})
+
+    with open(tmp_path / 'journal.jsonl', encoding='utf-8') as journal_file:
+        records = [json.loads(line) for line in journal_file]
+    assert [record['sheet_row'] for record in records if record['type'] == 'mutation'] == [count + 1]
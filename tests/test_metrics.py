@@ -0,0 +1,68 @@
+"""
+Testes das métricas: histogramas por rota e por chamada ao Sheets exportação e soma dos valores de outros processos
+"""
+import re
+
+from backend.metrics import MetricsRegistry
+
+
+def _registry():
+    registry = MetricsRegistry()
+    counter = registry.counter('calls_total', 'Chamadas', ('route',))
+    histogram = registry.histogram('duration_seconds', 'Duração', (), buckets=(0.1, 1.0))
+    return registry, counter, histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    registry, _, histogram = _registry()
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+
+    lines = registry.render().splitlines()
+
+    assert 'duration_seconds_bucket{le="0.1"} 1' in lines
+    assert 'duration_seconds_bucket{le="1"} 2' in lines
+    assert 'duration_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'duration_seconds_count 3' in lines
+
+
+def test_metrics_endpoint_records_route_and_sheets_calls(client):
+    client.get('/api/products')
+
+    response = client.get('/api/metrics')
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/products",status="200"}' in text
+    assert re.search(r'^sheets_request_duration_seconds_count\{operation="[^"]+",sheet="Product"\} [1-9][0-9]*$',
+                     text, re.MULTILINE)
+
+
+def test_render_sums_snapshots_from_other_processes():
+    coordinator, counter, histogram = _registry()
+    counter.inc(route='/a')
+    histogram.observe(0.5)
+    worker, worker_counter, worker_histogram = _registry()
+    worker_counter.inc(2, route='/a')
+    worker_counter.inc(route='/b')
+    worker_histogram.observe(0.05)
+
+    lines = worker.render([coordinator.snapshot()]).splitlines()
+
+    assert 'calls_total{route="/a"} 3' in lines
+    assert 'calls_total{route="/b"} 1' in lines
+    assert 'duration_seconds_bucket{le="0.1"} 1' in lines
+    assert 'duration_seconds_bucket{le="1"} 2' in lines
+    assert 'duration_seconds_count 2' in lines
+
+
+def test_render_does_not_change_local_values():
+    registry, counter, _ = _registry()
+    counter.inc(route='/a')
+    other, other_counter, _ = _registry()
+    other_counter.inc(route='/a')
+
+    registry.render([other.snapshot()])
+
+    assert 'calls_total{route="/a"} 1' in registry.render().splitlines()
@@ -0,0 +1,73 @@
+"""
+Testes do perfilador de requisições: arquivos gerados e requisições simultâneas
+"""
+import cProfile
+import os
+import threading
+
+import pytest
+from flask import Flask
+
+from backend.profiling import RequestProfiler
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    """App mínimo com o perfilador em formato pstats e uma rota que espera um evento"""
+    app = Flask(__name__)
+    entered, release = threading.Event(), threading.Event()
+
+    @app.route('/fast')
+    def fast():
+        return 'ok'
+
+    @app.route('/slow')
+    def slow():
+        entered.set()
+        release.wait(5)
+        return 'ok'
+
+    RequestProfiler(str(tmp_path), fmt='pstats').install(app)
+    return app, entered, release
+
+
+def test_request_writes_pstats_file(profiled, tmp_path):
+    app, _, _ = profiled
+
+    response = app.test_client().get('/fast')
+
+    assert response.status_code == 200
+    assert response.headers['X-Profile-File'].endswith('.prof')
+    assert os.listdir(tmp_path / 'GET_fast')
+
+
+def test_concurrent_request_falls_back_to_sampling(profiled):
+    app, entered, release = profiled
+    responses = []
+    slow = threading.Thread(target=lambda: responses.append(app.test_client().get('/slow')))
+    slow.start()
+    assert entered.wait(5)
+
+    # O cProfile está em uso pela outra requisição
+    concurrent = app.test_client().get('/fast')
+    release.set()
+    slow.join(5)
+
+    assert concurrent.status_code == 200
+    assert concurrent.headers['X-Profile-File'].endswith('.collapsed')
+    assert responses[0].headers['X-Profile-File'].endswith('.prof')
+    assert app.test_client().get('/fast').headers['X-Profile-File'].endswith('.prof')
+
+
+def test_profiler_unavailable_does_not_fail_request(profiled, monkeypatch):
+    app, _, _ = profiled
+
+    class ActiveTool(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+    monkeypatch.setattr(cProfile, 'Profile', ActiveTool)
+
+    response = app.test_client().get('/fast')
+
+    assert response.status_code == 200
+    assert response.headers['X-Profile-File'].endswith('.collapsed')
@@ -0,0 +1,23 @@
+"""
+Testes do relatório: propagação de erros e dados do cache desatualizado
+"""
+
+
+def test_report_without_data_propagates_sheets_error(client, service):
+    service.error_rate = 1.0
+
+    response = client.get('/api/reports/products_summary')
+
+    assert response.status_code == 500
+
+
+def test_report_served_from_stale_cache(client, manager, service):
+    assert client.get('/api/reports/products_summary').status_code == 200
+    manager.cache.ttl = 0
+    service.error_rate = 1.0
+
+    response = client.get('/api/reports/products_summary')
+
+    assert response.status_code == 200
+    assert response.get_json()['stale'] is True
+    assert response.get_json()['data']['rows'][0] == ['Quantidade', 5]
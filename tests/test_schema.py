@@ -0,0 +1,50 @@
+"""
+Testes dos esquemas das tabelas: leitura, gravação e validação
+"""
+import pytest
+
+from backend.models import PRODUCT_SCHEMA, USER_SCHEMA
+from backend.schema import SchemaError
+from backend.sharding import encode_row_index
+
+
+def test_encode_and_decode_round_trip():
+    record = PRODUCT_SCHEMA.validate({'name': 'Caneta', 'price': '2,50', 'description': 'Caneta azul'})
+    row = PRODUCT_SCHEMA.encode(record)
+
+    decoded = PRODUCT_SCHEMA.decode_rows([row])[0]
+
+    assert row == ['Caneta', 2.5, 'Caneta azul']
+    assert {name: decoded[name] for name in PRODUCT_SCHEMA.field_names} == record
+    assert decoded['row_index'] == 2
+
+
+def test_decode_converts_locale_numbers_and_skips_incomplete_rows():
+    rows = [['Cadeira', '1.234,5', 'Cadeira de escritório'], [], ['Sem preço']]
+
+    decoded = PRODUCT_SCHEMA.decode_rows(rows, shard_index=1)
+
+    assert [record['price'] for record in decoded] == [1234.5]
+    assert decoded[0]['row_index'] == encode_row_index(1, 2)
+
+
+def test_decode_uses_default_for_invalid_numbers():
+    decoded = PRODUCT_SCHEMA.decode_rows([['Mesa', 'abc', 'Mesa de jantar']])
+
+    assert decoded[0]['price'] == 0.0
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'name': 'Ana', 'cpf': '123', 'email': 'ana@example.com'}, 'CPF inválido'),
+    ({'name': 'Ana', 'cpf': '123.456.789-01', 'email': 'ana'}, 'Email inválido'),
+    ({'cpf': '12345678901', 'email': 'ana@example.com'}, 'obrigatório'),
+])
+def test_validate_rejects_invalid_users(data, message):
+    with pytest.raises(SchemaError, match=message):
+        USER_SCHEMA.validate(data)
+
+
+def test_validate_rejects_negative_price():
+    with pytest.raises(SchemaError, match='negativo'):
+        PRODUCT_SCHEMA.validate({'name': 'Caneta', 'price': -1, 'description': 'Caneta azul'})
+
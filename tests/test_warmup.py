@@ -0,0 +1,37 @@
+"""
+Testes do aquecimento na inicialização: prontidão e espera das requisições
+"""
+import threading
+
+from backend.warmup import WarmupScheduler, WarmupTask
+
+
+def test_scheduler_not_started_is_ready():
+    scheduler = WarmupScheduler([WarmupTask('prefetch', 'Dados', lambda: None)])
+
+    assert scheduler.ready is True
+    assert scheduler.status()['ready'] is True
+
+
+def test_scheduler_is_ready_after_its_tasks_finish():
+    release = threading.Event()
+    scheduler = WarmupScheduler([WarmupTask('prefetch', 'Dados', release.wait),
+                                 WarmupTask('reports', 'Relatórios', lambda: 1 / 0, after=('prefetch',))])
+    scheduler.start()
+
+    assert scheduler.ready is False
+    assert scheduler.status()['ready'] is False
+    release.set()
+    assert scheduler.wait(timeout=5)
+    assert scheduler.ready is True
+
+
+def test_disabled_warmup_reports_ready_and_does_not_delay_requests(client, app_module, monkeypatch):
+    # Nos testes STARTUP_WARMUP=0: o aquecimento nunca é iniciado
+    def fail_wait(*args, **kwargs):
+        raise AssertionError("requisição esperou por um aquecimento que não foi iniciado")
+    monkeypatch.setattr(app_module.warmup, 'wait', fail_wait)
+
+    assert client.get('/api/health').get_json()['ready'] is True
+    assert client.get('/api/ready').get_json()['ready'] is True
+    assert client.get('/api/products').status_code == 200
@@ -0,0 +1,151 @@
+"""
+Testes da gravação assíncrona (write-behind): mesclagem, novas tentativas e descarte
+"""
+import json
+
+import pytest
+
+from backend import metrics
+from backend.write_behind import RETRY_MAX_DELAY, Mutation, coalesce
+
+from .conftest import SPREADSHEET_ID
+
+PRODUCT = {'name': 'Produto novo', 'price': 10.0, 'description': 'Descrição do produto'}
+USER = {'name': 'Usuária nova', 'cpf': '123.456.789-01', 'email': 'nova@example.com'}
+
+
+def _dead_letters():
+    return metrics.SHEETS_WRITE_DEAD_LETTERS.snapshot().get(('Product', 'append', '400'), 0)
+
+
+def _ids(items):
+    return [ids for _, ids in items]
+
+
+def test_coalesce_merges_updates_of_the_same_row():
+    first = Mutation('update', 'Product', 0, 3, ['A', 1, 'x'])
+    second = Mutation('update', 'Product', 0, 3, ['B', 2, 'y'])
+    other = Mutation('update', 'Product', 0, 4, ['C', 3, 'z'])
+
+    effective, cancelled = coalesce([first, second, other])
+
+    assert [mutation.values for mutation, _ in effective] == [['B', 2, 'y'], ['C', 3, 'z']]
+    assert _ids(effective) == [[first.id, second.id], [other.id]]
+    assert cancelled == []
+
+
+def test_coalesce_cancels_append_followed_by_delete():
+    append = Mutation('append', 'Product', 0, 7, ['A', 1, 'x'])
+    update = Mutation('update', 'Product', 0, 7, ['B', 2, 'y'])
+    delete = Mutation('delete', 'Product', 0, 7)
+
+    effective, cancelled = coalesce([append, update, delete])
+
+    assert effective == []
+    assert sorted(cancelled) == sorted([append.id, update.id, delete.id])
+
+
+def test_coalesce_stops_merging_after_delete_in_the_shard():
+    before = Mutation('update', 'Product', 0, 5, ['A', 1, 'x'])
+    delete = Mutation('delete', 'Product', 0, 3)
+    after = Mutation('update', 'Product', 0, 5, ['B', 2, 'y'])
+
+    effective, _ = coalesce([before, delete, after])
+
+    # A remoção desloca as linhas: a atualização seguinte é outra linha
+    assert _ids(effective) == [[before.id], [delete.id], [after.id]]
+
+
+def test_flush_writes_coalesced_edits(make_manager, service):
+    manager = make_manager(write_behind=True)
+    manager.get_products()
+    manager.add_record('Product', PRODUCT)
+    row_index = manager.get_products()[-1]['row_index']
+    manager.update_record('Product', row_index, {**PRODUCT, 'price': 20.0})
+    manager.update_record('Product', row_index, {**PRODUCT, 'price': 30.0})
+    calls = service.stats['calls']
+
+    manager.write_behind.flush()
+
+    assert service.stats['calls'] - calls == 1
+    assert service.spreadsheets_data[SPREADSHEET_ID]['Product'][-1] == ['Produto novo', 30.0,
+                                                                      'Descrição do produto']
+    assert manager.write_behind.pending_count == 0
+    assert manager.journal.pending() == []
+
+
+def test_failed_batch_stays_pending_and_waits_for_backoff(make_manager, service):
+    manager = make_manager(write_behind=True)
+    manager.get_products()
+    manager.add_record('Product', PRODUCT)
+    service.error_rate = 1.0
+
+    manager.write_behind.flush(respect_backoff=True)
+    errors = service.stats['errors']
+    # Dentro da espera o lote não é tentado de novo
+    manager.write_behind.flush(respect_backoff=True)
+
+    assert service.stats['errors'] == errors
+    assert manager.write_behind.pending_count == 1
+    assert len(manager.journal.pending()) == 1
+    assert [attempts for attempts, _ in manager.write_behind._failures.values()] == [1]
+
+
+def test_failed_batch_is_never_discarded(make_manager, service):
+    manager = make_manager(write_behind=True)
+    manager.get_products()
+    manager.add_record('Product', PRODUCT)
+    service.error_rate = 1.0
+
+    for _ in range(10):
+        with pytest.raises(Exception):
+            manager.write_behind.flush()
+    assert len(manager.journal.pending()) == 1
+
+    service.error_rate = 0.0
+    manager.write_behind.flush()
+
+    assert manager.journal.pending() == []
+    assert manager.write_behind._failures == {}
+    assert service.spreadsheets_data[SPREADSHEET_ID]['Product'][-1][0] == 'Produto novo'
+
+
+def test_retry_delay_doubles_up_to_the_limit(make_manager):
+    queue = make_manager(write_behind=True).write_behind
+
+    assert [queue.retry_delay(attempts) for attempts in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 8.0]
+    assert queue.retry_delay(50) == RETRY_MAX_DELAY
+
+
+def test_rejected_batch_is_discarded_and_the_queue_drains(make_manager, service):
+    manager = make_manager(write_behind=True)
+    manager.get_users_and_products()
+    manager.add_record('Product', PRODUCT)
+    manager.add_record('User', USER)
+    rejected = _dead_letters()
+    # Aba removida na planilha: o Sheets responde 400 a toda tentativa
+    del service.spreadsheets_data[SPREADSHEET_ID]['Product']
+
+    manager.write_behind.flush()
+
+    assert service.spreadsheets_data[SPREADSHEET_ID]['User'][-1][0] == 'Usuária nova'
+    assert manager.write_behind.pending_count == 0
+    assert manager.journal.pending() == []
+    assert all(entry.pending == 0 for entry in manager.cache.export().values())
+    with open(manager.journal.dead_letter_path, encoding='utf-8') as dead_letter_file:
+        discarded = [json.loads(line) for line in dead_letter_file]
+    assert [(record['op'], record['table'], record['values'][0]) for record in discarded] == [
+        ('append', 'Product', 'Produto novo')]
+    assert _dead_letters() == rejected + 1
+
+
+def test_rejected_batch_does_not_wait_for_backoff(make_manager, service):
+    manager = make_manager(write_behind=True)
+    manager.get_products()
+    manager.add_record('Product', PRODUCT)
+    del service.spreadsheets_data[SPREADSHEET_ID]['Product']
+
+    manager.write_behind.flush(respect_backoff=True)
+
+    assert manager.write_behind._failures == {}
+    assert manager.journal.pending() == []